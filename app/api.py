@@ -3,32 +3,40 @@ import logging
 import flask
 
 import auth
+import db.macros
 import db.settings
 import db.users
 import debug_logs
 import env
-import execute
 import hostname
+import iso8601
 import json_response
 import local_system
+import macro_player
+import macros
 import network
+import password as password_check
+import paste_engine
 import request_parsers.create_user
 import request_parsers.credentials
 import request_parsers.delete_user
 import request_parsers.errors
 import request_parsers.hostname
+import request_parsers.macro
 import request_parsers.network
 import request_parsers.password
 import request_parsers.paste
 import request_parsers.requires_https
 import request_parsers.video_settings
 import session
+import socket_api
 import update.launcher
 import update.settings
 import update.status
 import version
 import video_service
 from hid import keyboard as fake_keyboard
+from hid import write_metrics as hid_write_metrics
 
 api_blueprint = flask.Blueprint('api', __name__, url_prefix='/api')
 
@@ -229,7 +237,8 @@ def auth_get():
     """Checks whether the user is authenticated.
 
     This is an internal endpoint queried by our NGINX proxy to check for the
-    authentication state of the backend.
+    authentication state of the backend. Only queries that are subject to the
+    HTTPS redirect get here, because `auth_subrequest` answers all others.
     """
     return json_response.success()
 
@@ -250,7 +259,11 @@ def auth_post():
             flask.request)
     except request_parsers.errors.Error as e:
         return json_response.error(e), 400
-    if auth.can_authenticate(username, password):
+    try:
+        is_authenticated = auth.can_authenticate(username, password)
+    except password_check.TooManyVerificationsError as e:
+        return json_response.error(e), 429
+    if is_authenticated:
         session.login(username)
         return json_response.success()
     return json_response.error(
@@ -283,6 +296,78 @@ def debug_logs_get():
         return flask.Response(f'Failed to retrieve debug logs: {e}', status=500)
 
 
+@api_blueprint.route('/hidMetrics', methods=['GET'])
+@required_auth(auth.Role.ADMIN)
+def hid_metrics_get():
+    """Returns statistics about the writes to the keyboard and mouse interfaces.
+
+    The statistics cover the lifetime of the server process. Latencies are
+    estimated from a histogram, so they are accurate within about 25%.
+
+    Returns:
+        A JSON data structure with a `keyboard` and a `mouse` property. Each of
+        them is an object with the following properties:
+        path: string.
+        reportsWritten: int.
+        bytesWritten: int.
+        reportsRejected: int, the number of reports that the interface rejected
+            because it would have blocked.
+        writeErrors: int, the number of failed writes (including timeouts).
+        timeouts: int.
+        latencyMs: object with the properties p50, p95, p99, and max (as
+            floats, or null if there were no writes).
+
+        Example:
+        {
+            "keyboard": {
+                "path": "/dev/hidg0",
+                "reportsWritten": 1204,
+                "bytesWritten": 9632,
+                "reportsRejected": 0,
+                "writeErrors": 2,
+                "timeouts": 2,
+                "latencyMs": {
+                    "p50": 0.3,
+                    "p95": 0.9,
+                    "p99": 1.8,
+                    "max": 500.6
+                }
+            },
+            "mouse": {...}
+        }
+    """
+    return json_response.success({
+        'keyboard': _hid_metrics_to_dict(env.KEYBOARD_PATH),
+        'mouse': _hid_metrics_to_dict(env.MOUSE_PATH),
+    })
+
+
+def _hid_metrics_to_dict(hid_path):
+    metrics = hid_write_metrics.get(hid_path)
+    latency = metrics.latency
+    latency_ms = {
+        'p50': _seconds_to_ms(latency.percentile(0.5)),
+        'p95': _seconds_to_ms(latency.percentile(0.95)),
+        'p99': _seconds_to_ms(latency.percentile(0.99)),
+        'max': _seconds_to_ms(latency.max_seconds) if latency.count else None,
+    }
+    return {
+        'path': hid_path,
+        'reportsWritten': metrics.reports_written,
+        'bytesWritten': metrics.bytes_written,
+        'reportsRejected': metrics.reports_rejected,
+        'writeErrors': metrics.write_errors,
+        'timeouts': metrics.timeouts,
+        'latencyMs': latency_ms,
+    }
+
+
+def _seconds_to_ms(seconds):
+    if seconds is None:
+        return None
+    return round(seconds * 1000, 3)
+
+
 @api_blueprint.route('/shutdown', methods=['POST'])
 @required_auth(auth.Role.ADMIN)
 def shutdown_post():
@@ -845,26 +930,277 @@ def settings_video_apply_post():
 @api_blueprint.route('/paste', methods=['POST'])
 @required_auth(auth.Role.OPERATOR)
 def paste_post():
-    """Pastes text onto the target machine.
+    """Submits a job for pasting text onto the target machine.
+
+    The paste jobs run one after the other, in the order in which they were
+    submitted. Whenever a job starts or finishes, and periodically while it's
+    running, the server emits a `paste-progress` event via Socket.IO. The
+    payload of the events has the same structure as the response of this
+    endpoint.
 
     Expects a JSON data structure in the request body that contains the
     following parameters:
     - text: string
     - language: string as an IETF language tag
+    - pacing: (optional) string, the name of a pacing profile for the target
+        system: `default`, `windows`, `macos`, or `bios`.
+    - reportsPerSecond: (optional) number between 1 and 1000, the maximum
+        number of keyboard reports to write per second. Takes precedence over
+        `pacing`.
 
     Example of request body:
     {
         "text": "Hello, World!",
-        "language": "en-US"
+        "language": "en-US",
+        "pacing": "bios"
     }
+
+    Returns:
+        A JSON data structure that describes the paste job:
+        id: string.
+        status: string, one of `queued`, `running`, `done`, `failed`, or
+            `cancelled`.
+        submittedAt: string, the submission time as ISO-8601 timestamp.
+        waitMs: float, the time that the job spent (so far) in the queue.
+        runMs: float, the time that the job spent (so far) writing, or null if
+            the job hasn't started writing.
+        reportsWritten: int.
+        reportsTotal: int.
+
+        Example:
+        {
+            "id": "2f1b7ed8c6f24a5a9cb3a4d2e0c8f9a1",
+            "status": "queued",
+            "submittedAt": "2024-02-10T085735Z",
+            "waitMs": 0.021,
+            "runMs": null,
+            "reportsWritten": 0,
+            "reportsTotal": 26
+        }
     """
     try:
         keystrokes = request_parsers.paste.parse_keystrokes(flask.request)
+        reports_per_second = request_parsers.paste.parse_reports_per_second(
+            flask.request)
+    except request_parsers.errors.Error as e:
+        return json_response.error(e), 400
+
+    job = paste_engine.submit(env.KEYBOARD_PATH,
+                              fake_keyboard.compile_keystrokes(keystrokes),
+                              reports_per_second,
+                              on_progress=_emit_paste_progress)
+
+    return json_response.success(_paste_job_to_dict(job))
+
+
+@api_blueprint.route('/paste/job', methods=['GET'])
+@required_auth(auth.Role.OPERATOR)
+def paste_job_get():
+    """Retrieves a paste job, optionally waiting for it to finish.
+
+    Expects the following URL parameters:
+    - id: string, the ID of the paste job.
+    - waitSeconds: (optional) number between 0 and 60. If the job hasn't
+        finished yet, the request waits up to this long for the job to finish.
+
+    Example: /api/paste/job?id=2f1b7ed8c6f24a5a9cb3a4d2e0c8f9a1&waitSeconds=30
+
+    Returns:
+        The paste job, in the same structure as the response of `POST /paste`.
+        Note that the server only remembers a limited number of finished jobs.
+    """
+    try:
+        job_id, wait_seconds = request_parsers.paste.parse_job_query(
+            flask.request)
+    except request_parsers.errors.Error as e:
+        return json_response.error(e), 400
+
+    try:
+        job = paste_engine.get(job_id)
+    except paste_engine.NoSuchJobError as e:
+        return json_response.error(e), 404
+
+    if wait_seconds:
+        job.wait(wait_seconds)
+
+    return json_response.success(_paste_job_to_dict(job))
+
+
+@api_blueprint.route('/paste/jobs', methods=['GET'])
+@required_auth(auth.Role.OPERATOR)
+def paste_jobs_get():
+    """Retrieves all queued, running, and recently finished paste jobs.
+
+    Returns:
+        A JSON data structure with a `jobs` property, which is a list of paste
+        jobs in the order of submission. Each job has the same structure as the
+        response of `POST /paste`.
+    """
+    return json_response.success(
+        {'jobs': [_paste_job_to_dict(job) for job in paste_engine.jobs()]})
+
+
+@api_blueprint.route('/paste/cancel', methods=['POST'])
+@required_auth(auth.Role.OPERATOR)
+def paste_cancel_post():
+    """Cancels a queued or running paste job.
+
+    Cancelling a job that has already finished has no effect.
+
+    Expects a JSON data structure in the request body that contains the
+    following parameters:
+    - id: string, the ID of the paste job.
+
+    Example of request body:
+    {
+        "id": "2f1b7ed8c6f24a5a9cb3a4d2e0c8f9a1"
+    }
+
+    Returns:
+        The paste job, in the same structure as the response of `POST /paste`.
+    """
+    try:
+        job_id = request_parsers.paste.parse_job_id(flask.request)
+    except request_parsers.errors.Error as e:
+        return json_response.error(e), 400
+
+    try:
+        job = paste_engine.cancel(job_id)
+    except paste_engine.NoSuchJobError as e:
+        return json_response.error(e), 404
+
+    return json_response.success(_paste_job_to_dict(job))
+
+
+@api_blueprint.route('/macros', methods=['GET'])
+@required_auth(auth.Role.OPERATOR)
+def macros_get():
+    """Lists all recorded macros.
+
+    Clients record macros via the `macro-record-start` and `macro-record-stop`
+    Socket.IO events.
+
+    Returns:
+        A JSON data structure with a `macros` property, which is a list of
+        macros in the order of recording. Each macro has the following
+        properties:
+        id: int.
+        name: string.
+        createdAt: string, the recording time as ISO-8601 timestamp.
+        reportCount: int, the number of HID reports in the macro.
+        durationMs: int, the time from the first to the last report.
+
+        Example:
+        {
+            "macros": [{
+                "id": 1,
+                "name": "Boot menu",
+                "createdAt": "2024-02-10T085735Z",
+                "reportCount": 12,
+                "durationMs": 3250
+            }]
+        }
+    """
+    return json_response.success({
+        'macros': [
+            _macro_info_to_dict(macro_info)
+            for macro_info in db.macros.Macros().get_all()
+        ]
+    })
+
+
+@api_blueprint.route('/macros/play', methods=['POST'])
+@required_auth(auth.Role.OPERATOR)
+def macros_play_post():
+    """Submits a job for playing back a recorded macro on the target machine.
+
+    Playback jobs run in the same queue as paste jobs, so they can be followed
+    and cancelled via `GET /paste/job` and `POST /paste/cancel`, and they emit
+    `paste-progress` events.
+
+    Expects a JSON data structure in the request body that contains the
+    following parameters:
+    - id: int, the ID of the macro.
+    - speed: (optional) number between 0.1 and 100, the factor by which to
+        speed up the recorded delays. Defaults to 1.
+
+    Example of request body:
+    {
+        "id": 1,
+        "speed": 2
+    }
+
+    Returns:
+        The job, in the same structure as the response of `POST /paste`.
+    """
+    try:
+        macro_id = request_parsers.macro.parse_macro_id(flask.request)
+        speed = request_parsers.macro.parse_speed(flask.request)
+    except request_parsers.errors.Error as e:
+        return json_response.error(e), 400
+
+    try:
+        records = macros.decode(db.macros.Macros().get_data(macro_id))
+    except db.macros.MacroDoesNotExistError as e:
+        return json_response.error(e), 404
+    except macros.InvalidMacroError as e:
+        return json_response.error(e), 500
+
+    job = macro_player.play(env.KEYBOARD_PATH,
+                            env.MOUSE_PATH,
+                            records,
+                            speed,
+                            on_progress=_emit_paste_progress)
+
+    return json_response.success(_paste_job_to_dict(job))
+
+
+@api_blueprint.route('/macros', methods=['DELETE'])
+@required_auth(auth.Role.OPERATOR)
+def macros_delete():
+    """Deletes a recorded macro.
+
+    Expects a JSON data structure in the request body that contains the
+    following parameters:
+    - id: int, the ID of the macro.
+
+    Returns:
+        Empty response on success, error object otherwise.
+    """
+    try:
+        macro_id = request_parsers.macro.parse_macro_id(flask.request)
     except request_parsers.errors.Error as e:
         return json_response.error(e), 400
 
-    keyboard_path = env.KEYBOARD_PATH
-    execute.background_thread(fake_keyboard.send_keystrokes,
-                              args=(keyboard_path, keystrokes))
+    try:
+        db.macros.Macros().delete(macro_id)
+    except db.macros.MacroDoesNotExistError as e:
+        return json_response.error(e), 404
 
     return json_response.success()
+
+
+def _paste_job_to_dict(job):
+    return {
+        'id': job.job_id,
+        'status': job.status.value,
+        'submittedAt': iso8601.to_string(job.submitted_at),
+        'waitMs': _seconds_to_ms(job.wait_seconds),
+        'runMs': _seconds_to_ms(job.run_seconds),
+        'reportsWritten': job.reports_written,
+        'reportsTotal': job.reports_total,
+    }
+
+
+def _macro_info_to_dict(macro_info):
+    return {
+        'id': macro_info.macro_id,
+        'name': macro_info.name,
+        'createdAt': iso8601.to_string(macro_info.created_at),
+        'reportCount': macro_info.report_count,
+        'durationMs': macro_info.duration_ms,
+    }
+
+
+def _emit_paste_progress(job):
+    socket_api.socketio.emit('paste-progress', _paste_job_to_dict(job))
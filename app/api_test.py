@@ -0,0 +1,55 @@
+import datetime
+import unittest
+from unittest import mock
+
+import flask
+
+import api
+import db.macros
+
+
+class MacrosApiTest(unittest.TestCase):
+
+    def setUp(self):
+        app = flask.Flask(__name__)
+        app.register_blueprint(api.api_blueprint)
+        self.client = app.test_client()
+        patcher = mock.patch.object(api.session,
+                                    'is_auth_valid',
+                                    return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(db.macros, 'Macros')
+        self.mock_macros = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lists_macros_with_iso8601_creation_time(self):
+        self.mock_macros.return_value.get_all.return_value = [
+            db.macros.MacroInfo(macro_id=1,
+                                name='Boot menu',
+                                created_at=datetime.datetime(
+                                    2024,
+                                    2,
+                                    10,
+                                    8,
+                                    57,
+                                    35,
+                                    123456,
+                                    tzinfo=datetime.timezone.utc),
+                                report_count=12,
+                                duration_ms=3250)
+        ]
+
+        response = self.client.get('/api/macros')
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            {
+                'macros': [{
+                    'id': 1,
+                    'name': 'Boot menu',
+                    'createdAt': '2024-02-10T085735Z',
+                    'reportCount': 12,
+                    'durationMs': 3250,
+                }]
+            }, response.get_json())
@@ -9,6 +9,12 @@ re-authenticate. This is necessary, because otherwise connected clients would
 still be able to retrieve the video stream (until they close their browser),
 even when their credentials had been revoked. However, they actually should lose
 access to the video stream immediately.
+
+Auth checks run on every HTTP request and whenever a socket connects, so this
+module keeps all accounts in memory (see `_AccountCache`). All changes to
+accounts must go through this module, so that the cache never serves stale
+accounts, and so that the credentials listeners can revoke the sessions of
+connected sockets (see `add_credentials_listener`).
 """
 import dataclasses
 import datetime
@@ -50,7 +56,7 @@ class Role(enum.IntEnum):
     OPERATOR = 2
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True)
 class User:
     username: str
     role: Role
@@ -75,6 +81,44 @@ class OneAdminRequiredError(Error):
     """
 
 
+class _AccountCache:
+    """Keeps all accounts in memory, so that lookups don't query the database.
+
+    Every change to an account increments the generation of the cache, which
+    discards the cached accounts. The accounts only get cached if no change
+    happened while they were being loaded, so a load that raced with a change
+    can't reinstate outdated accounts.
+    """
+
+    def __init__(self):
+        self._generation = 0
+        # A mapping of usernames to `User` objects, in the order of creation,
+        # or `None` if the accounts need to be loaded from the database.
+        self._accounts = None
+
+    def invalidate(self):
+        self._generation += 1
+        self._accounts = None
+
+    def get_all(self):
+        """Returns all accounts, as a mapping of usernames to `User` objects."""
+        accounts = self._accounts
+        if accounts is None:
+            generation = self._generation
+            users = [_user_from_strings(*u) for u in db.users.Users().get_all()]
+            accounts = {user.username: user for user in users}
+            if generation == self._generation:
+                self._accounts = accounts
+        return accounts
+
+
+_account_cache = _AccountCache()
+
+# Functions to call after credentials have changed (see
+# `add_credentials_listener`).
+_credentials_listeners = []
+
+
 def _user_from_strings(username, role, credentials_last_changed):
     """Reinstates a User object from string values (e.g., as of the DB)."""
     return User(username, Role[role],
@@ -99,11 +143,16 @@ def register(username, password, role):
             'The very first user account on the system must have admin role.')
 
     logger.info_sensitive('Adding user %s with role %s', username, role)
-    db.users.Users().add(username=username,
-                         password_hash=password_check.generate_hash(password),
-                         credentials_change_time=utc.now(),
-                         role=role)
+    try:
+        db.users.Users().add(
+            username=username,
+            password_hash=password_check.generate_hash(password),
+            credentials_change_time=utc.now(),
+            role=role)
+    finally:
+        _account_cache.invalidate()
     logger.info_sensitive('Created user %s with role %s', username, role)
+    _notify_credentials_listeners(username)
     video_service.restart()
 
 
@@ -118,14 +167,18 @@ def change_password(username, new_password):
         db.users.UserDoesNotExistError: If a user with the given username
             does not exist on the system.
     """
-    db.users.Users().change_password(
-        username=username,
-        new_password_hash=password_check.generate_hash(new_password),
-        credentials_change_time=utc.now())
+    try:
+        db.users.Users().change_password(
+            username=username,
+            new_password_hash=password_check.generate_hash(new_password),
+            credentials_change_time=utc.now())
+    finally:
+        _account_cache.invalidate()
     # We're knowingly logging a user's username, which is sensitive, but we've
     # also marked the log as sensitive that can later be scrubbed.
     logger.info_sensitive(  # nosemgrep: python-logger-credential-disclosure
         'Changed password of user %s', username)
+    _notify_credentials_listeners(username)
     video_service.restart()
 
 
@@ -148,10 +201,14 @@ def change_role(username, new_role):
             'Cannot change the role of last remaining admin user on the system.'
         )
 
-    db.users.Users().change_role(username=username,
-                                 new_role=new_role,
-                                 credentials_change_time=utc.now())
+    try:
+        db.users.Users().change_role(username=username,
+                                     new_role=new_role,
+                                     credentials_change_time=utc.now())
+    finally:
+        _account_cache.invalidate()
     logger.info_sensitive('Changed role of user %s', username)
+    _notify_credentials_listeners(username)
     video_service.restart()
 
 
@@ -174,18 +231,45 @@ def delete_account(username):
         raise OneAdminRequiredError(
             'Cannot delete last remaining admin user on the system.')
 
-    db.users.Users().delete(username)
+    try:
+        db.users.Users().delete(username)
+    finally:
+        _account_cache.invalidate()
     logger.info_sensitive('Deleted user %s', username)
+    _notify_credentials_listeners(username)
     video_service.restart()
 
 
 def delete_all_accounts():
     """Deletes all accounts from the system."""
-    db.users.Users().delete_all()
+    try:
+        db.users.Users().delete_all()
+    finally:
+        _account_cache.invalidate()
     logger.info('Deleted all users')
+    _notify_credentials_listeners(None)
     video_service.restart()
 
 
+def add_credentials_listener(listener):
+    """Registers a function to call whenever credentials have changed.
+
+    That's the case when an account gets created, deleted, or when its
+    password or role changes. Sessions of the affected account (and, after the
+    first account got created, all anonymous sessions) aren't valid anymore.
+
+    Args:
+        listener: A function that takes the username of the affected account
+            as its only argument, or `None` if all accounts are affected.
+    """
+    _credentials_listeners.append(listener)
+
+
+def _notify_credentials_listeners(username):
+    for listener in _credentials_listeners:
+        listener(username)
+
+
 def get_account(username):
     """Looks up a user account by their username.
 
@@ -195,8 +279,11 @@ def get_account(username):
     Raises:
         db.users.UserDoesNotExistError
     """
-    user_data = db.users.Users().get(username)
-    return _user_from_strings(*user_data)
+    try:
+        return _account_cache.get_all()[username]
+    except KeyError as e:
+        raise db.users.UserDoesNotExistError(
+            f'User does not exist: {username}') from e
 
 
 def get_all_accounts():
@@ -205,7 +292,7 @@ def get_all_accounts():
     Returns:
         A list of all accounts (as `User` objects).
     """
-    return [_user_from_strings(*u) for u in db.users.Users().get_all()]
+    return list(_account_cache.get_all().values())
 
 
 def can_authenticate(username, password):
@@ -217,6 +304,10 @@ def can_authenticate(username, password):
 
     Returns:
         True, if username and password match.
+
+    Raises:
+        password.TooManyVerificationsError: If too many other login attempts
+            are in progress.
     """
     logger.info_sensitive('Checking authentication for user %s', username)
     password_hash = db.users.Users().get_password_hash(username)
@@ -242,4 +333,4 @@ def is_authentication_required():
     Returns:
         True if users are required to authenticate.
     """
-    return len(get_all_accounts()) > 0
+    return len(_account_cache.get_all()) > 0
@@ -0,0 +1,100 @@
+"""Answers the auth subrequests of our NGINX proxy outside of Flask.
+
+NGINX authenticates every request for the video stream, for video snapshots,
+and for the Janus WebSocket via a subrequest to `GET /api/auth` (see the
+`auth_request` directives in `tinypilot.conf.j2`). Clients poll snapshots and
+reconnect to streams frequently, and running each subrequest through the
+regular Flask request handling (with all its hooks and the session handling)
+adds up. So we answer these subrequests at the WSGI level instead: we verify
+the signed session cookie ourselves, and check its auth state against the
+in-memory account cache (see `auth`), so there are no database queries either.
+
+Successful checks of logged-in sessions carry an `X-Accel-Expires` header, so
+that NGINX caches them for a short time (`env.AUTH_CACHE_SECONDS`), keyed on
+the session cookie. Cached results outlive credential changes until they
+expire, so the time has to be short.
+
+If HTTPS is required, subrequests over plain HTTP take the regular path,
+because they're subject to the HTTPS redirect (see
+`main.check_proxy_https_redirect`). The settings are kept in memory (see
+`db.settings`), so that check doesn't require a database query either.
+"""
+import itsdangerous
+import werkzeug.http
+
+import auth
+import db.settings
+import env
+import session
+
+_AUTH_PATH = '/api/auth'
+
+
+class Middleware:
+    """WSGI middleware that answers auth subrequests before Flask does."""
+
+    def __init__(self, app):
+        """Wraps the WSGI app of a Flask app.
+
+        Args:
+            app: The `flask.Flask` app, which must be fully configured already.
+        """
+        self._app = app
+        self._wsgi_app = app.wsgi_app
+        self._serializer = app.session_interface.get_signing_serializer(app)
+        self._session_max_age_seconds = int(
+            app.permanent_session_lifetime.total_seconds())
+
+    def __call__(self, environ, start_response):
+        if not _is_auth_subrequest(environ):
+            return self._wsgi_app(environ, start_response)
+
+        if _requires_https_redirect(environ):
+            return self._wsgi_app(environ, start_response)
+
+        session_data = self._load_session_data(environ)
+        is_valid = session.is_auth_valid(satisfies_role=auth.Role.OPERATOR,
+                                         session_data=session_data)
+        cache_seconds = 0
+        if not is_valid:
+            status = '401 UNAUTHORIZED'
+        else:
+            status = '200 OK'
+            # Anonymous sessions don't have a cookie to use as cache key.
+            if session.get_username(session_data):
+                cache_seconds = env.AUTH_CACHE_SECONDS
+        start_response(status, [
+            ('Content-Length', '0'),
+            ('X-Accel-Expires', str(cache_seconds)),
+        ])
+        return [b'']
+
+    def _load_session_data(self, environ):
+        """Decodes the session cookie in the same way that Flask does.
+
+        Returns:
+            The session data as dictionary, which is empty if the cookie is
+            missing or invalid.
+        """
+        cookie = werkzeug.http.parse_cookie(environ).get(
+            self._app.config['SESSION_COOKIE_NAME'])
+        if not cookie or self._serializer is None:
+            return {}
+        try:
+            return self._serializer.loads(cookie,
+                                          max_age=self._session_max_age_seconds)
+        except itsdangerous.BadSignature:
+            return {}
+
+
+def _is_auth_subrequest(environ):
+    return (environ.get('REQUEST_METHOD') == 'GET' and
+            environ.get('PATH_INFO') == _AUTH_PATH)
+
+
+def _requires_https_redirect(environ):
+    # Requests without the header get rejected on the regular path.
+    proxy_protocol = environ.get('HTTP_X_FORWARDED_PROTO')
+    if not proxy_protocol:
+        return True
+    return proxy_protocol != 'https' and db.settings.Settings().requires_https()
@@ -0,0 +1,114 @@
+import unittest
+from unittest import mock
+
+import flask
+import werkzeug.test
+
+import auth_subrequest
+import db.settings
+import env
+import session
+
+
+def wsgi_app_stub(_, start_response):
+    start_response('200 OK', [])
+    return [b'from flask']
+
+
+class MiddlewareTest(unittest.TestCase):
+
+    def setUp(self):
+        app = flask.Flask(__name__)
+        app.config.update(SECRET_KEY='s3cr3t')  # noqa: S106
+        self.wsgi_app = mock.Mock(side_effect=wsgi_app_stub)
+        app.wsgi_app = self.wsgi_app
+        self.cookie_serializer = app.session_interface.get_signing_serializer(
+            app)
+        self.client = werkzeug.test.Client(auth_subrequest.Middleware(app))
+        patcher = mock.patch.object(session, 'is_auth_valid')
+        self.mock_is_auth_valid = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_auth(self, cookie=None, protocol='https'):
+        if cookie is not None:
+            self.client.set_cookie('session', cookie)
+        return self.client.get('/api/auth',
+                               headers={'X-Forwarded-Proto': protocol})
+
+    def test_caches_valid_session(self):
+        self.mock_is_auth_valid.return_value = True
+
+        response = self.get_auth(
+            self.cookie_serializer.dumps({'username': 'pilot'}))
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(str(env.AUTH_CACHE_SECONDS),
+                         response.headers['X-Accel-Expires'])
+        self.assertEqual(
+            {'username': 'pilot'},
+            self.mock_is_auth_valid.call_args.kwargs['session_data'])
+        self.wsgi_app.assert_not_called()
+
+    def test_does_not_cache_anonymous_session(self):
+        self.mock_is_auth_valid.return_value = True
+
+        response = self.get_auth()
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('0', response.headers['X-Accel-Expires'])
+
+    def test_rejects_invalid_session(self):
+        self.mock_is_auth_valid.return_value = False
+
+        response = self.get_auth(
+            self.cookie_serializer.dumps({'username': 'pilot'}))
+
+        self.assertEqual(401, response.status_code)
+        self.assertEqual('0', response.headers['X-Accel-Expires'])
+
+    def test_ignores_cookie_with_invalid_signature(self):
+        self.mock_is_auth_valid.return_value = False
+        other_app = flask.Flask(__name__)
+        other_app.config.update(SECRET_KEY='0th3r')  # noqa: S106
+        other_serializer = other_app.session_interface.get_signing_serializer(
+            other_app)
+
+        response = self.get_auth(other_serializer.dumps({'username': 'pilot'}))
+
+        self.assertEqual(401, response.status_code)
+        self.assertEqual(
+            {}, self.mock_is_auth_valid.call_args.kwargs['session_data'])
+
+    @mock.patch.object(db.settings, 'Settings')
+    def test_passes_plain_http_subrequest_on_to_flask_if_https_is_required(
+            self, mock_settings):
+        mock_settings.return_value.requires_https.return_value = True
+
+        response = self.get_auth(protocol='http')
+
+        self.assertEqual(b'from flask', response.data)
+        self.mock_is_auth_valid.assert_not_called()
+
+    @mock.patch.object(db.settings, 'Settings')
+    def test_answers_plain_http_subrequest_if_https_is_not_required(
+            self, mock_settings):
+        mock_settings.return_value.requires_https.return_value = False
+        self.mock_is_auth_valid.return_value = True
+
+        response = self.get_auth(protocol='http')
+
+        self.assertEqual(200, response.status_code)
+        self.wsgi_app.assert_not_called()
+
+    def test_passes_subrequest_without_protocol_on_to_flask(self):
+        response = self.client.get('/api/auth')
+
+        self.assertEqual(b'from flask', response.data)
+        self.mock_is_auth_valid.assert_not_called()
+
+    def test_passes_other_requests_on_to_flask(self):
+        response = self.client.post('/api/auth',
+                                    headers={'X-Forwarded-Proto': 'https'})
+
+        self.assertEqual(b'from flask', response.data)
+        self.mock_is_auth_valid.assert_not_called()
@@ -32,6 +32,19 @@ class RoleTest(unittest.TestCase):
 
 class AuthTest(unittest.TestCase):
 
+    def setUp(self):
+        # Every test has its own database, so the accounts of a previous test
+        # must not be cached anymore.
+        # pylint: disable=protected-access
+        patcher = mock.patch.object(auth, '_account_cache',
+                                    auth._AccountCache())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Don't notify listeners that other modules have registered.
+        patcher = mock.patch.object(auth, '_credentials_listeners', [])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
     @mock.patch.object(video_service, 'restart', do_nothing)
     @mock.patch.object(db.users.db_connection, 'get')
     def test_can_authenticate_with_valid_credentials(self, mock_get_db):
@@ -409,3 +422,95 @@ class AuthTest(unittest.TestCase):
 
             auth.delete_all_accounts()
             self.assertEqual(mock_video_service_restart.call_count, 6)
+
+    @mock.patch.object(video_service, 'restart', do_nothing)
+    @mock.patch.object(db.users.db_connection, 'get')
+    def test_notifies_listeners_after_credentials_change(self, mock_get_db):
+        with tempfile.NamedTemporaryFile() as temp_file:
+            db_conn = db.store.create_or_open(temp_file.name)
+            mock_get_db.return_value = db_conn
+            self.addCleanup(db_conn.close)
+            mock_listener = mock.Mock()
+            auth.add_credentials_listener(mock_listener)
+
+            auth.register('dummy-admin', '12345', auth.Role.ADMIN)
+            mock_listener.assert_called_with('dummy-admin')
+
+            auth.register('pilot', 'p4assw0rd', auth.Role.ADMIN)
+            mock_listener.assert_called_with('pilot')
+
+            auth.change_password('dummy-admin', 'pa55word')
+            mock_listener.assert_called_with('dummy-admin')
+
+            auth.change_role('pilot', auth.Role.OPERATOR)
+            mock_listener.assert_called_with('pilot')
+
+            auth.delete_account('pilot')
+            mock_listener.assert_called_with('pilot')
+
+            auth.delete_all_accounts()
+            mock_listener.assert_called_with(None)
+            self.assertEqual(6, mock_listener.call_count)
+
+    @mock.patch.object(video_service, 'restart', do_nothing)
+    @mock.patch.object(db.users.db_connection, 'get')
+    def test_does_not_notify_listeners_if_credentials_change_fails(
+            self, mock_get_db):
+        with tempfile.NamedTemporaryFile() as temp_file:
+            db_conn = db.store.create_or_open(temp_file.name)
+            mock_get_db.return_value = db_conn
+            self.addCleanup(db_conn.close)
+            mock_listener = mock.Mock()
+            auth.add_credentials_listener(mock_listener)
+
+            with self.assertRaises(db.users.UserDoesNotExistError):
+                auth.change_password('pilot', 'pa55word')
+            mock_listener.assert_not_called()
+
+    @mock.patch.object(video_service, 'restart', do_nothing)
+    @mock.patch.object(db.users.db_connection, 'get')
+    def test_looks_up_accounts_without_querying_database_again(
+            self, mock_get_db):
+        with tempfile.NamedTemporaryFile() as temp_file:
+            db_conn = db.store.create_or_open(temp_file.name)
+            mock_get_db.return_value = db_conn
+            self.addCleanup(db_conn.close)
+            auth.register('pilot', 'p4ssw0rd', auth.Role.ADMIN)
+
+            with mock.patch.object(
+                    db.users.Users,
+                    'get_all',
+                    autospec=True,
+                    side_effect=db.users.Users.get_all) as mock_get_all:
+                self.assertTrue(auth.is_authentication_required())
+                self.assertEqual('pilot', auth.get_account('pilot').username)
+                self.assertEqual(1, len(auth.get_all_accounts()))
+
+            self.assertEqual(1, mock_get_all.call_count)
+
+    @mock.patch.object(video_service, 'restart', do_nothing)
+    @mock.patch.object(db.users.db_connection, 'get')
+    def test_looks_up_current_accounts_after_credentials_change(
+            self, mock_get_db):
+        with tempfile.NamedTemporaryFile() as temp_file:
+            db_conn = db.store.create_or_open(temp_file.name)
+            mock_get_db.return_value = db_conn
+            self.addCleanup(db_conn.close)
+            auth.register('dummy-admin', '12345', auth.Role.ADMIN)
+            auth.register('pilot', 'p4ssw0rd', auth.Role.ADMIN)
+            credentials_last_changed = auth.get_account(
+                'pilot').credentials_last_changed
+
+            auth.change_password('pilot', 'pa55word')
+            self.assertLess(credentials_last_changed,
+                            auth.get_account('pilot').credentials_last_changed)
+
+            auth.change_role('pilot', auth.Role.OPERATOR)
+            self.assertEqual(auth.Role.OPERATOR, auth.get_account('pilot').role)
+
+            auth.delete_account('pilot')
+            with self.assertRaises(db.users.UserDoesNotExistError):
+                auth.get_account('pilot')
+
+            auth.delete_all_accounts()
+            self.assertFalse(auth.is_authentication_required())
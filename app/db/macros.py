@@ -0,0 +1,102 @@
+import dataclasses
+import datetime
+import sqlite3
+
+import db_connection
+
+
+class Error(Exception):
+    pass
+
+
+class MacroAlreadyExistsError(Error):
+    pass
+
+
+class MacroDoesNotExistError(Error):
+    pass
+
+
+@dataclasses.dataclass
+class MacroInfo:
+    macro_id: int
+    name: str
+    created_at: datetime.datetime
+    report_count: int
+    duration_ms: int
+
+
+class Macros:
+
+    def __init__(self):
+        self._db_connection = db_connection.get()
+
+    def add(self, name, creation_time, macro):
+        """Stores a recorded macro.
+
+        Args:
+            name: The name of the macro (string), which must be unique.
+            creation_time: The time of the recording (datetime.datetime).
+            macro: A `macros.Macro` object.
+
+        Returns:
+            The ID of the stored macro (int).
+
+        Raises:
+            MacroAlreadyExistsError: If there is a macro with that name already.
+        """
+        try:
+            cursor = self._db_connection.execute(
+                'INSERT'
+                ' INTO macros(name, created_at, report_count, duration_ms,'
+                ' data)'
+                ' VALUES (?, ?, ?, ?, ?)', [
+                    name,
+                    creation_time.isoformat(timespec='microseconds'),
+                    macro.report_count,
+                    round(macro.duration_seconds * 1000), macro.data
+                ])
+        except sqlite3.IntegrityError as e:
+            raise MacroAlreadyExistsError(
+                f'Macro already exists: {name}') from e
+        return cursor.lastrowid
+
+    def delete(self, macro_id):
+        cursor = self._db_connection.execute('DELETE FROM macros WHERE id = ?',
+                                             [macro_id])
+        if cursor.rowcount == 0:
+            raise MacroDoesNotExistError(f'Macro does not exist: {macro_id}')
+
+    def get_all(self):
+        """Retrieves the metadata of all macros, without their data.
+
+        Returns:
+            A list of `MacroInfo` objects, in the order of creation.
+        """
+        cursor = self._db_connection.execute(
+            'SELECT id, name, created_at, report_count, duration_ms'
+            ' FROM macros ORDER BY id')
+        return [
+            MacroInfo(macro_id=macro_id,
+                      name=name,
+                      created_at=datetime.datetime.fromisoformat(created_at),
+                      report_count=report_count,
+                      duration_ms=duration_ms) for macro_id, name, created_at,
+            report_count, duration_ms in cursor.fetchall()
+        ]
+
+    def get_data(self, macro_id):
+        """Retrieves the recorded reports of a macro.
+
+        Returns:
+            The macro in the binary format of `macros` as `bytes`.
+
+        Raises:
+            MacroDoesNotExistError: If there is no macro with that ID.
+        """
+        cursor = self._db_connection.execute(
+            'SELECT data FROM macros WHERE id=? LIMIT 1', [macro_id])
+        row = cursor.fetchone()
+        if not row:
+            raise MacroDoesNotExistError(f'Macro does not exist: {macro_id}')
+        return row[0]
@@ -0,0 +1,64 @@
+import datetime
+import tempfile
+import unittest
+from unittest import mock
+
+import db.macros
+import db.store
+import macros
+
+_CREATION_TIME = datetime.datetime(2024, 1, 2, 3, 4, 5, 6,
+                                   datetime.timezone.utc)
+
+
+def make_macro():
+    recorder = macros.Recorder()
+    recorder.record(macros.Interface.KEYBOARD,
+                    b'\x00\x00\x04\x00\x00\x00\x00\x00')
+    return recorder.finish()
+
+
+class MacrosTest(unittest.TestCase):
+
+    def setUp(self):
+        temp_file = tempfile.NamedTemporaryFile()  # pylint: disable=consider-using-with
+        self.addCleanup(temp_file.close)
+        db_conn = db.store.create_or_open(temp_file.name)
+        self.addCleanup(db_conn.close)
+        patcher = mock.patch.object(db.macros, 'db_connection')
+        self.addCleanup(patcher.stop)
+        patcher.start().get.return_value = db_conn
+
+    def test_stores_and_retrieves_macro(self):
+        macro = make_macro()
+        store = db.macros.Macros()
+
+        macro_id = store.add('Boot menu', _CREATION_TIME, macro)
+
+        self.assertEqual([
+            db.macros.MacroInfo(macro_id=macro_id,
+                                name='Boot menu',
+                                created_at=_CREATION_TIME,
+                                report_count=1,
+                                duration_ms=0)
+        ], store.get_all())
+        self.assertEqual(macro.data, store.get_data(macro_id))
+
+    def test_rejects_duplicate_name(self):
+        store = db.macros.Macros()
+        store.add('Boot menu', _CREATION_TIME, make_macro())
+
+        with self.assertRaises(db.macros.MacroAlreadyExistsError):
+            store.add('Boot menu', _CREATION_TIME, make_macro())
+
+    def test_deletes_macro(self):
+        store = db.macros.Macros()
+        macro_id = store.add('Boot menu', _CREATION_TIME, make_macro())
+
+        store.delete(macro_id)
+
+        self.assertEqual([], store.get_all())
+        with self.assertRaises(db.macros.MacroDoesNotExistError):
+            store.get_data(macro_id)
+        with self.assertRaises(db.macros.MacroDoesNotExistError):
+            store.delete(macro_id)
@@ -0,0 +1,12 @@
+-- Create a table for storing recorded input macros. The `data` column contains
+-- the timestamped HID reports of the macro in the binary format of
+-- `app/macros.py`.
+
+CREATE TABLE IF NOT EXISTS macros (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    created_at TEXT NOT NULL,
+    report_count INTEGER NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
@@ -1,3 +1,4 @@
+import dataclasses
 import enum
 
 import db_connection
@@ -11,21 +12,62 @@ class StreamingMode(enum.Enum):
     H264 = 'H264'
 
 
+@dataclasses.dataclass(frozen=True)
+class _Snapshot:
+    requires_https: bool
+    streaming_mode: StreamingMode
+
+
+class _SnapshotCache:
+    """Keeps a snapshot of the settings in memory.
+
+    Settings get read on every request (e.g., whether HTTPS is required), but
+    they rarely change, and only this process changes them. So we load them
+    from the database once, and update the snapshot after each write (see
+    `Settings`). Snapshots are immutable and get replaced as a whole, so readers
+    never see a partial update.
+    """
+
+    def __init__(self):
+        self._snapshot = None
+
+    def get(self, load_snapshot):
+        """Retrieves the snapshot, and loads it first if necessary.
+
+        Args:
+            load_snapshot: A function that loads the snapshot from the database.
+
+        Returns:
+            A `_Snapshot` object.
+        """
+        if self._snapshot is None:
+            self._snapshot = load_snapshot()
+        return self._snapshot
+
+    def update(self, **changes):
+        # If there is no snapshot yet, the next read loads the changes anyway.
+        if self._snapshot is not None:
+            self._snapshot = dataclasses.replace(self._snapshot, **changes)
+
+
+_snapshot_cache = _SnapshotCache()
+
+
 class Settings:
     # The columns of the settings table should never have a `NON NULL`
     # constraint, otherwise it wouldn’t be possible to selectively set or update
     # individual columns.
 
     def __init__(self):
-        self._db_connection = db_connection.get()
-        # Initialize the table by making sure the “hard-coded” row exists.
-        self._db_connection.execute(
-            'INSERT OR IGNORE INTO settings(id) VALUES (?)', [_ROW_ID])
+        # Reading the settings doesn't require the database, so we only connect
+        # when necessary.
+        self._db_connection = None
 
     def set_requires_https(self, should_be_required):
-        self._db_connection.execute(
+        self._get_db_connection().execute(
             'UPDATE settings SET requires_https=? WHERE id=?',
             [should_be_required, _ROW_ID])
+        _snapshot_cache.update(requires_https=bool(should_be_required))
 
     def requires_https(self):
         """Retrieves the setting whether HTTPS connections are required.
@@ -35,11 +77,7 @@ class Settings:
         Returns:
             bool.
         """
-        cursor = self._db_connection.execute(
-            'SELECT requires_https FROM settings WHERE id=?', [_ROW_ID])
-        # Reminder: the `requires_https` column is of type integer.
-        raw_value = _fetch_single_value(cursor, 1)
-        return raw_value > 0  # Convert integer value to bool.
+        return _snapshot_cache.get(self._load_snapshot).requires_https
 
     def get_streaming_mode(self):
         """Retrieves the preferred streaming mode for the remote screen.
@@ -47,10 +85,7 @@ class Settings:
         Returns:
             A `StreamingMode` value.
         """
-        cursor = self._db_connection.execute(
-            'SELECT streaming_mode FROM settings WHERE id=?', [_ROW_ID])
-        raw_value = _fetch_single_value(cursor, StreamingMode.MJPEG.value)
-        return StreamingMode(raw_value)
+        return _snapshot_cache.get(self._load_snapshot).streaming_mode
 
     def set_streaming_mode(self, streaming_mode):
         """Stores the preferred streaming mode.
@@ -58,14 +93,32 @@ class Settings:
         Args:
             streaming_mode: `StreamingMode` value.
         """
-        self._db_connection.execute(
+        self._get_db_connection().execute(
             'UPDATE settings SET streaming_mode=? WHERE id=?',
             [streaming_mode.value, _ROW_ID])
-
-
-def _fetch_single_value(connection_cursor, default_value):
-    """Helper method to resolve a query for one single value."""
-    row = connection_cursor.fetchone()
-    if not row or row[0] is None:
+        _snapshot_cache.update(streaming_mode=streaming_mode)
+
+    def _get_db_connection(self):
+        if self._db_connection is None:
+            self._db_connection = db_connection.get()
+            # Initialize the table by making sure the “hard-coded” row exists.
+            self._db_connection.execute(
+                'INSERT OR IGNORE INTO settings(id) VALUES (?)', [_ROW_ID])
+        return self._db_connection
+
+    def _load_snapshot(self):
+        cursor = self._get_db_connection().execute(
+            'SELECT requires_https, streaming_mode FROM settings WHERE id=?',
+            [_ROW_ID])
+        requires_https, streaming_mode = cursor.fetchone()
+        return _Snapshot(
+            # Reminder: the `requires_https` column is of type integer.
+            requires_https=_value_or_default(requires_https, 1) > 0,
+            streaming_mode=StreamingMode(
+                _value_or_default(streaming_mode, StreamingMode.MJPEG.value)))
+
+
+def _value_or_default(value, default_value):
+    if value is None:
         return default_value
-    return row[0]
+    return value
@@ -8,6 +8,15 @@ import db.store
 
 class SettingsTest(unittest.TestCase):
 
+    def setUp(self):
+        # Every test has its own database, so the settings of a previous test
+        # must not be cached anymore.
+        # pylint: disable=protected-access
+        patcher = mock.patch.object(db.settings, '_snapshot_cache',
+                                    db.settings._SnapshotCache())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
     # We need this test to make sure that the initialization procedure in the
     # `Settings` constructor doesn’t mess with existing data.
     @mock.patch.object(db.settings, 'db_connection')
@@ -20,9 +29,12 @@ class SettingsTest(unittest.TestCase):
             initial_value = settings.requires_https()
             settings.set_requires_https(not initial_value)
 
-            # Re-initialize and query again.
-            settings = db.settings.Settings()
-            self.assertEqual(not initial_value, settings.requires_https())
+            # Re-initialize and query again, without the cached settings.
+            # pylint: disable=protected-access
+            with mock.patch.object(db.settings, '_snapshot_cache',
+                                   db.settings._SnapshotCache()):
+                settings = db.settings.Settings()
+                self.assertEqual(not initial_value, settings.requires_https())
 
     @mock.patch.object(db.settings, 'db_connection')
     def test_requires_https_by_default(self, mock_db_connection):
@@ -63,3 +75,41 @@ class SettingsTest(unittest.TestCase):
             settings.set_streaming_mode(db.settings.StreamingMode.H264)
             self.assertEqual(db.settings.StreamingMode.H264,
                              settings.get_streaming_mode())
+
+    @mock.patch.object(db.settings, 'db_connection')
+    def test_reads_settings_without_querying_database_again(
+            self, mock_db_connection):
+        with tempfile.NamedTemporaryFile() as temp_file:
+            db_conn = db.store.create_or_open(temp_file.name)
+            mock_db_connection.get.return_value = db_conn
+            self.addCleanup(db_conn.close)
+            db.settings.Settings().requires_https()
+
+            mock_db_connection.get.side_effect = AssertionError(
+                'Unexpected database access')
+            settings = db.settings.Settings()
+            self.assertEqual(True, settings.requires_https())
+            self.assertEqual(db.settings.StreamingMode.MJPEG,
+                             settings.get_streaming_mode())
+
+    @mock.patch.object(db.settings, 'db_connection')
+    def test_writes_settings_through_to_database(self, mock_db_connection):
+        with tempfile.NamedTemporaryFile() as temp_file:
+            db_conn = db.store.create_or_open(temp_file.name)
+            mock_db_connection.get.return_value = db_conn
+            self.addCleanup(db_conn.close)
+            settings = db.settings.Settings()
+            self.assertEqual(True, settings.requires_https())
+
+            settings.set_requires_https(False)
+            settings.set_streaming_mode(db.settings.StreamingMode.H264)
+            self.assertEqual(False, db.settings.Settings().requires_https())
+            self.assertEqual(db.settings.StreamingMode.H264,
+                             db.settings.Settings().get_streaming_mode())
+
+            # pylint: disable=protected-access
+            with mock.patch.object(db.settings, '_snapshot_cache',
+                                   db.settings._SnapshotCache()):
+                self.assertEqual(False, db.settings.Settings().requires_https())
+                self.assertEqual(db.settings.StreamingMode.H264,
+                                 db.settings.Settings().get_streaming_mode())
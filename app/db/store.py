@@ -70,6 +70,21 @@ logger = logging.getLogger(__name__)
 # and lazy load it once.
 _MIGRATIONS = None
 
+# The PRAGMA statements that we apply to every connection.
+_PRAGMAS = [
+    # With write-ahead logging, reads and writes don't block each other (e.g.,
+    # between the app and the CLI), and a write only appends to the log.
+    'journal_mode=WAL',
+    # In WAL mode, this only syncs the log at checkpoints. The database stays
+    # consistent in any case, but the latest writes might get lost on power
+    # loss.
+    'synchronous=NORMAL',
+    # The database is small, so 2 MiB of cache (negative values are in KiB) and
+    # 32 MiB of memory-mapped I/O cover all of it.
+    'cache_size=-2048',
+    'mmap_size=33554432',
+]
+
 
 def create_or_open(db_path):
     """Opens a connection to the database file.
@@ -90,22 +105,25 @@ def create_or_open(db_path):
     if _MIGRATIONS is None:
         _MIGRATIONS = _read_migrations()
 
-    logger.debug('Reading SQLite database from %s', db_path)
-    connection = sqlite3.connect(db_path, isolation_level=None)
+    logger.info('Reading SQLite database from %s', db_path)
+    # The connection may be shared across threads (see `db_connection`).
+    connection = sqlite3.connect(db_path,
+                                 isolation_level=None,
+                                 check_same_thread=False)
 
     try:
+        for pragma in _PRAGMAS:
+            # SQlite doesn’t allow prepared statements for PRAGMA queries.
+            # That’s okay here, since we know our queries are safe.
+            # pylint: disable-next=line-too-long
+            connection.execute(  # nosemgrep: formatted-sql-query, sqlalchemy-execute-raw-query
+                f'PRAGMA {pragma}')
+
         # The `user_version` property tells us how many of the migrations were
         # already run in the past.
         cursor = connection.execute('PRAGMA user_version')
         initial_migrations_counter = cursor.fetchone()[0]
 
-        if initial_migrations_counter == len(_MIGRATIONS):
-            # TODO(jotaen) Remove this early return clause once we use
-            #   a persistent database connection. Currently, this method
-            #   is called on every single request, so it would pollute
-            #   our logs.
-            return connection
-
         logger.info('Migration counter: %s/%s (actual/total)',
                     initial_migrations_counter, len(_MIGRATIONS))
 
@@ -173,3 +173,10 @@ class StoreTest(unittest.TestCase):
             # a single migration defined.
             with self.assertRaises(AssertionError):
                 db.store.create_or_open(temp_file.name)
+
+    def test_enables_write_ahead_logging(self):
+        with tempfile.NamedTemporaryFile() as temp_file:
+            connection = db.store.create_or_open(temp_file.name)
+            self.addCleanup(connection.close)
+            cursor = connection.execute('PRAGMA journal_mode')
+            self.assertEqual('wal', cursor.fetchone()[0])
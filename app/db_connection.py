@@ -1,48 +1,72 @@
-import flask
+"""Provides the connection to the SQlite database.
+
+The process keeps a single connection open for its whole lifetime, instead of
+opening one per request. That way, pending migrations only get applied once
+when the connection is opened (at startup, in the case of the app), and
+sqlite3 can reuse its prepared statements, which it caches per connection.
+
+All greenlets and threads share the connection. That's safe, because SQlite
+serializes the access to a connection (`sqlite3.threadsafety` is 3), because
+we don't yield to other greenlets between executing a query and fetching its
+results, and because the connection is in autocommit mode, so no transaction
+stays open across requests.
+"""
+import threading
 
 import db.store
 import env
 
 _DB_PATH = env.abs_path_in_home_dir('tinypilot.db')
 
+_lock = threading.Lock()
+_CONNECTION = None
+
 
 def get():
-    """Returns a connection to the SQlite database.
+    """Returns the connection to the SQlite database.
 
-    Within a Flask app context, this function applies a caching mechanism to
-    avoid redundant initialization overhead. Outside a Flask app context, it
-    creates a fresh DB connection on every invocation.
+    The first call opens the connection, which creates the database file or
+    migrates it, if necessary.
 
     Returns:
         sqlite3.dbapi2.connection
     """
-    if not flask.has_app_context():
-        return db.store.create_or_open(_DB_PATH)
+    # pylint: disable=global-statement
+    global _CONNECTION
+    with _lock:
+        if _CONNECTION is None:
+            _CONNECTION = db.store.create_or_open(_DB_PATH)
+        return _CONNECTION
 
-    connection = _get_cached_flask_db()
-    if connection is None:
-        connection = db.store.create_or_open(_DB_PATH)
-        _cache_flask_db(connection)
-    return connection
 
+def open_at(db_path):
+    """Opens the connection to another database file than the default one.
 
-def close():
-    """Closes a potentially cached DB connection.
+    Subsequent calls to `get` return that connection until it gets closed. For
+    example, benchmarks use a temporary database, so that they don't depend on
+    the user accounts of the device.
 
-    Noop if no DB connection was cached or if invocation context is not within
-    Flask.
+    Args:
+        db_path: The path to the database file, which gets created or migrated,
+            if necessary.
     """
-    if not flask.has_app_context():
-        return
+    # pylint: disable=global-statement
+    global _CONNECTION
+    with _lock:
+        if _CONNECTION is not None:
+            _CONNECTION.close()
+        _CONNECTION = db.store.create_or_open(db_path)
 
-    connection = _get_cached_flask_db()
-    if connection is not None:
-        connection.close()
-
-
-def _get_cached_flask_db():
-    return getattr(flask.g, '_database', None)
 
+def close():
+    """Closes the connection, e.g., before the process exits.
 
-def _cache_flask_db(flask_db):
-    flask.g._database = flask_db  # pylint: disable=protected-access
+    Noop if the connection isn't open. A subsequent call to `get` opens a new
+    connection.
+    """
+    # pylint: disable=global-statement
+    global _CONNECTION
+    with _lock:
+        if _CONNECTION is not None:
+            _CONNECTION.close()
+            _CONNECTION = None
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import db_connection
+
+
+class DbConnectionTest(unittest.TestCase):
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(temp_dir.cleanup)
+        for name, value in [
+            ('_DB_PATH', os.path.join(temp_dir.name, 'tinypilot.db')),
+            ('_CONNECTION', None),
+        ]:
+            patcher = mock.patch.object(db_connection, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(db_connection.close)
+
+    def test_reuses_connection(self):
+        self.assertIs(db_connection.get(), db_connection.get())
+
+    def test_migrates_database_only_when_opening_connection(self):
+        with mock.patch.object(db_connection.db.store,
+                               'create_or_open',
+                               wraps=db_connection.db.store.create_or_open
+                              ) as mock_create_or_open:
+            db_connection.get()
+            db_connection.get()
+
+        mock_create_or_open.assert_called_once()
+
+    def test_opens_new_connection_after_closing(self):
+        connection = db_connection.get()
+        db_connection.close()
+
+        self.assertIsNot(connection, db_connection.get())
+
+    def test_opens_connection_to_other_database(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, 'other.db')
+
+            db_connection.open_at(db_path)
+
+            self.assertEqual(
+                db_path,
+                db_connection.get().execute('PRAGMA database_list').fetchone()
+                [2])
+            db_connection.close()
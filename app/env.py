@@ -9,6 +9,16 @@ GATEKEEPER_BASE_URL = _config.get('GATEKEEPER_BASE_URL',
                                   'https://gk.tinypilotkvm.com')
 KEYBOARD_PATH = _config.get('KEYBOARD_PATH', '/dev/hidg0')
 MOUSE_PATH = _config.get('MOUSE_PATH', '/dev/hidg1')
+# The strategy for writing to the HID interfaces, either `process` (via a
+# separate writer process) or `nonblocking` (in-process, via non-blocking I/O).
+HID_WRITE_MODE = _config.get('HID_WRITE_MODE', 'process')
+# In key-down/key-up mode, the time after which all keys of a client get
+# released if no input event arrives from it (see `key_state`).
+KEY_WATCHDOG_SECONDS = float(_config.get('KEY_WATCHDOG_SECONDS', '5'))
+# The time for which our NGINX proxy may cache a successful auth check of a
+# logged-in session, in whole seconds (see `auth_subrequest`). `0` disables the
+# caching.
+AUTH_CACHE_SECONDS = int(_config.get('AUTH_CACHE_SECONDS', '5'))
 
 _TINYPILOT_HOME_PATH = pathlib.Path(
     os.environ.get('TINYPILOT_HOME_DIR', '/home/tinypilot'))
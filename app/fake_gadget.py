@@ -0,0 +1,208 @@
+"""Stands in for the HID interfaces of the USB gadget, e.g., for benchmarks.
+
+On a real device, the writers (see `hid.write`) write reports to
+`/dev/hidg0` and `/dev/hidg1`, and the USB host picks them up whenever it polls
+the device. The fake gadget replaces each interface with a named pipe (FIFO),
+which a background thread reads on behalf of the host. The thread records when
+each report arrived, so callers can measure the latency and throughput of the
+whole input path without any hardware.
+
+The fake host can be slowed down (it waits between two reports, like a host
+with a long polling interval) or stalled entirely (it stops reading, like a
+host that is asleep or has no driver for the interface).
+
+Unlike a gadget interface, which only holds a single report, a pipe buffers
+writes. We shrink the pipe buffer to the minimum, but Linux rounds that up to
+one page (4 KiB), which still holds 512 keyboard or 585 mouse reports. So
+against a slow host, writes only start to block once that many reports are
+pending, and until then the writers see a fast host. A stalled host fills the
+buffer up with padding, so that writes block right away.
+"""
+import dataclasses
+import fcntl
+import os
+import select
+import tempfile
+import threading
+import time
+
+import eventlet
+
+from hid import reports
+
+# The interval at which the reader thread checks whether it should stop.
+_SELECT_TIMEOUT_SECONDS = 0.05
+
+# The interval at which `wait_for_reports` checks for new reports. It only
+# affects how soon the caller notices, not the recorded arrival times.
+_POLL_INTERVAL_SECONDS = 0.0005
+
+
+class Error(Exception):
+    pass
+
+
+class ReportTimeoutError(Error):
+    pass
+
+
+@dataclasses.dataclass(frozen=True)
+class Arrival:
+    # The `time.monotonic` timestamp at which the host read the report.
+    timestamp: float
+    report: bytes
+
+
+class FakeInterface:
+    """A named pipe that a background thread reads like a USB host would."""
+
+    def __init__(self, path, report_size, host_delay_seconds):
+        """Creates the named pipe and starts reading from it.
+
+        Args:
+            path: The file path at which to create the named pipe.
+            report_size: The size of a report on this interface in bytes.
+            host_delay_seconds: The time that the fake host waits after reading
+                a report before it reads the next one (as int or float).
+        """
+        self.path = path
+        self._report_size = report_size
+        self._host_delay_seconds = host_delay_seconds
+        os.mkfifo(path)
+        # Open the pipe for reading and writing, so that reads don't signal
+        # end-of-file while no writer has the pipe open.
+        self._fd = os.open(path, os.O_RDWR | os.O_NONBLOCK)
+        # Linux rounds the size up to a page, see the module docstring.
+        fcntl.fcntl(self._fd, fcntl.F_SETPIPE_SZ, 0)
+        self._lock = threading.Lock()
+        self._arrivals = []
+        self._is_reading = threading.Event()
+        self._is_reading.set()
+        self._is_closed = False
+        self._thread = threading.Thread(target=self._read_reports,
+                                        name=f'fake-gadget-{path}',
+                                        daemon=True)
+        self._thread.start()
+
+    @property
+    def arrivals(self):
+        """A list of the `Arrival` of each report, in the order of arrival."""
+        with self._lock:
+            return list(self._arrivals)
+
+    @property
+    def report_count(self):
+        with self._lock:
+            return len(self._arrivals)
+
+    def stall(self):
+        """Stops reading, so that subsequent writes block.
+
+        The pipe buffer gets filled up with padding, which `resume` discards
+        again, so that not even a single report fits in.
+        """
+        self._is_reading.clear()
+        # Wait for the reader to finish a read that might be in progress.
+        with self._lock:
+            while True:
+                try:
+                    os.write(self._fd, b'\x00' * self._report_size)
+                except BlockingIOError:
+                    break
+
+    def resume(self):
+        """Discards the padding from `stall`, and starts reading again."""
+        with self._lock:
+            while True:
+                try:
+                    os.read(self._fd, 65536)
+                except BlockingIOError:
+                    break
+        self._is_reading.set()
+
+    def wait_for_reports(self, count, timeout_seconds):
+        """Waits until the host has read a certain number of reports in total.
+
+        The wait yields to other greenlets, so that they can keep writing.
+
+        Args:
+            count: The total number of reports to wait for.
+            timeout_seconds: The maximum time to wait (as int or float).
+
+        Raises:
+            ReportTimeoutError: If the reports didn't arrive in time.
+        """
+        deadline = time.monotonic() + timeout_seconds
+        while self.report_count < count:
+            if time.monotonic() >= deadline:
+                raise ReportTimeoutError(
+                    f'Received {self.report_count} of {count} reports on'
+                    f' {self.path}')
+            eventlet.sleep(_POLL_INTERVAL_SECONDS)
+
+    def close(self):
+        self._is_closed = True
+        self._is_reading.set()
+        self._thread.join()
+        os.close(self._fd)
+        os.unlink(self.path)
+
+    def _read_reports(self):
+        while not self._is_closed:
+            if not self._is_reading.wait(timeout=_SELECT_TIMEOUT_SECONDS):
+                continue
+            readable, _, _ = select.select([self._fd], [], [],
+                                           _SELECT_TIMEOUT_SECONDS)
+            if not readable:
+                continue
+            with self._lock:
+                if not self._is_reading.is_set():
+                    continue
+                try:
+                    report = os.read(self._fd, self._report_size)
+                except BlockingIOError:
+                    continue
+                self._arrivals.append(
+                    Arrival(timestamp=time.monotonic(), report=report))
+            if self._host_delay_seconds:
+                time.sleep(self._host_delay_seconds)
+
+
+class FakeGadget:
+    """A fake keyboard and mouse interface in a temporary directory.
+
+    Example of usage:
+        with fake_gadget.FakeGadget() as gadget:
+            fake_keyboard.send_keystroke(gadget.keyboard.path, keystroke)
+            gadget.keyboard.wait_for_reports(2, timeout_seconds=1)
+    """
+
+    def __init__(self, host_delay_seconds=0.0):
+        # The directory lives until `close`.
+        # pylint: disable-next=consider-using-with
+        self._directory = tempfile.TemporaryDirectory(prefix='fake-gadget-')
+        self.keyboard = FakeInterface(
+            os.path.join(self._directory.name, 'hidg0'),
+            reports.KEYBOARD_REPORT_SIZE, host_delay_seconds)
+        self.mouse = FakeInterface(os.path.join(self._directory.name, 'hidg1'),
+                                   reports.MOUSE_REPORT_SIZE,
+                                   host_delay_seconds)
+
+    def stall(self):
+        self.keyboard.stall()
+        self.mouse.stall()
+
+    def resume(self):
+        self.keyboard.resume()
+        self.mouse.resume()
+
+    def close(self):
+        self.keyboard.close()
+        self.mouse.close()
+        self._directory.cleanup()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
@@ -0,0 +1,51 @@
+import os
+import unittest
+
+import fake_gadget
+
+KEYBOARD_PRESS_A = b'\x00\x00\x04\x00\x00\x00\x00\x00'
+KEYBOARD_RELEASE = b'\x00\x00\x00\x00\x00\x00\x00\x00'
+
+
+def write_report(path, report):
+    hid_fd = os.open(path, os.O_RDWR | os.O_NONBLOCK)
+    try:
+        os.write(hid_fd, report)
+    finally:
+        os.close(hid_fd)
+
+
+class FakeGadgetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.gadget = fake_gadget.FakeGadget()
+        self.addCleanup(self.gadget.close)
+
+    def test_records_reports_in_order_of_arrival(self):
+        write_report(self.gadget.keyboard.path, KEYBOARD_PRESS_A)
+        write_report(self.gadget.keyboard.path, KEYBOARD_RELEASE)
+
+        self.gadget.keyboard.wait_for_reports(2, timeout_seconds=1)
+
+        arrivals = self.gadget.keyboard.arrivals
+        self.assertEqual([KEYBOARD_PRESS_A, KEYBOARD_RELEASE],
+                         [arrival.report for arrival in arrivals])
+        self.assertLessEqual(arrivals[0].timestamp, arrivals[1].timestamp)
+        self.assertEqual(0, self.gadget.mouse.report_count)
+
+    def test_blocks_writes_while_stalled(self):
+        self.gadget.stall()
+
+        with self.assertRaises(BlockingIOError):
+            write_report(self.gadget.keyboard.path, KEYBOARD_PRESS_A)
+
+        self.gadget.resume()
+        write_report(self.gadget.keyboard.path, KEYBOARD_PRESS_A)
+        self.gadget.keyboard.wait_for_reports(1, timeout_seconds=1)
+        self.assertEqual(
+            [KEYBOARD_PRESS_A],
+            [arrival.report for arrival in self.gadget.keyboard.arrivals])
+
+    def test_times_out_waiting_for_missing_reports(self):
+        with self.assertRaises(fake_gadget.ReportTimeoutError):
+            self.gadget.mouse.wait_for_reports(1, timeout_seconds=0.01)
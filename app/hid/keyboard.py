@@ -1,12 +1,23 @@
+from hid import keycodes as hid
+from hid import reports
 from hid import write as hid_write
 
 
 def send_keystroke(keyboard_path, keystroke):
-    buf = [0] * 8
-    buf[0] = keystroke.modifier
-    buf[2] = keystroke.keycode
-    hid_write.write_to_hid_interface(keyboard_path, buf)
+    for report in keystroke_reports(keystroke):
+        hid_write.write_to_hid_interface(keyboard_path, report)
 
+
+def keystroke_reports(keystroke):
+    """Returns the reports that `send_keystroke` writes for a keystroke.
+
+    Args:
+        keystroke: A HID Keystroke object.
+
+    Returns:
+        A tuple of reports as `bytes`.
+    """
+    report = reports.keyboard_report(keystroke.modifier, keystroke.keycode)
     # If it's a normal keycode (i.e. not a standalone modifier key), add a
     # message indicating that the key should be released after it is sent. We do
     # this to prevent the keystroke from incorrectly repeating on the target
@@ -15,22 +26,50 @@ def send_keystroke(keyboard_path, keystroke):
     # genuinely long key presses (see
     # https://github.com/tiny-pilot/tinypilot/issues/1093).
     if keystroke.keycode:
-        release_keys(keyboard_path)
+        return (report, reports.KEYBOARD_RELEASE_REPORT)
+    return (report,)
 
 
 def release_keys(keyboard_path):
-    hid_write.write_to_hid_interface(keyboard_path, [0] * 8)
+    hid_write.write_to_hid_interface(keyboard_path,
+                                     reports.KEYBOARD_RELEASE_REPORT)
+
+
+def compile_keystrokes(keystrokes):
+    """Compiles keystrokes into the shortest equivalent stream of reports.
 
+    The target system registers a key press whenever a keycode appears in a
+    report that wasn't in the report before, with the modifier keys of that
+    report. So instead of following each key press with a report that releases
+    all keys (like `send_keystroke` does), the stream goes straight from one
+    key to the next. It only contains a release report where the same key is
+    pressed twice in a row, because otherwise the target system wouldn't
+    register the second key press. Any change of the modifier keys is merged
+    into the report of the next key press (or the release report before it).
+    The stream always ends with a report that releases all keys.
 
-def send_keystrokes(keyboard_path, keystrokes):
-    """Sends multiple keystrokes to the HID interface, one after the other.
+    For example, "abc" compiles to four reports (a, b, c, release) instead of
+    six.
 
     Args:
-        keyboard_path: The file path to the keyboard interface.
         keystrokes: A list of HID Keystroke objects.
 
-    Raises:
-        WriteError: If a keystroke fails to be written to the HID interface.
+    Returns:
+        The reports as `bytes`, whose length is a multiple of
+        `reports.KEYBOARD_REPORT_SIZE`.
     """
+    report_stream = bytearray()
+    previous_report = reports.KEYBOARD_RELEASE_REPORT
     for keystroke in keystrokes:
-        send_keystroke(keyboard_path, keystroke)
+        if keystroke.keycode and keystroke.keycode == previous_report[2]:
+            previous_report = reports.keyboard_report(keystroke.modifier,
+                                                      hid.KEYCODE_NONE)
+            report_stream += previous_report
+        report = reports.keyboard_report(keystroke.modifier, keystroke.keycode)
+        # A standalone modifier key might not change anything.
+        if report != previous_report:
+            report_stream += report
+            previous_report = report
+    if previous_report != reports.KEYBOARD_RELEASE_REPORT:
+        report_stream += reports.KEYBOARD_RELEASE_REPORT
+    return bytes(report_stream)
@@ -1,8 +1,46 @@
+import itertools
 import tempfile
 import unittest
 
 from hid import keyboard
 from hid import keycodes as hid
+from hid import reports
+
+
+class HostKeyStateModel:
+    """Models how a USB host registers key presses from keyboard reports.
+
+    For each report, the host first updates the state of the modifier keys.
+    Then, it registers a key press (together with the current modifier state)
+    for each keycode that wasn't in the previous report.
+    """
+
+    def __init__(self):
+        self.modifier = hid.KEYCODE_NONE
+        self.pressed_keycodes = set()
+        # A list of (modifier, keycode) tuples.
+        self.key_presses = []
+
+    def process(self, report_stream):
+        for offset in range(0, len(report_stream),
+                            reports.KEYBOARD_REPORT_SIZE):
+            report = report_stream[offset:offset + reports.KEYBOARD_REPORT_SIZE]
+            self.modifier = report[0]
+            keycodes = {keycode for keycode in report[2:] if keycode}
+            for keycode in sorted(keycodes - self.pressed_keycodes):
+                self.key_presses.append((self.modifier, keycode))
+            self.pressed_keycodes = keycodes
+
+
+def individual_report_stream(keystrokes):
+    """Returns the reports that `send_keystroke` writes for each keystroke."""
+    report_stream = b''
+    for keystroke in keystrokes:
+        report_stream += reports.keyboard_report(keystroke.modifier,
+                                                 keystroke.keycode)
+        if keystroke.keycode:
+            report_stream += reports.KEYBOARD_RELEASE_REPORT
+    return report_stream
 
 
 class KeyboardTest(unittest.TestCase):
@@ -51,18 +89,80 @@ class KeyboardTest(unittest.TestCase):
             self.assertEqual(b'\x00\x00\x00\x00\x00\x00\x00\x00',
                              input_file.read())
 
-    def test_send_multiple_keystrokes_to_hid_interface(self):
-        with tempfile.NamedTemporaryFile() as input_file:
-            keyboard.send_keystrokes(keyboard_path=input_file.name,
-                                     keystrokes=[
-                                         hid.Keystroke(keycode=hid.KEYCODE_A),
-                                         hid.Keystroke(keycode=hid.KEYCODE_B),
-                                         hid.Keystroke(keycode=hid.KEYCODE_C)
-                                     ])
-            self.assertEqual(
-                b'\x00\x00\x04\x00\x00\x00\x00\x00'
-                b'\x00\x00\x00\x00\x00\x00\x00\x00'
-                b'\x00\x00\x05\x00\x00\x00\x00\x00'
-                b'\x00\x00\x00\x00\x00\x00\x00\x00'
-                b'\x00\x00\x06\x00\x00\x00\x00\x00'
-                b'\x00\x00\x00\x00\x00\x00\x00\x00', input_file.read())
+    def test_compiles_distinct_keys_without_intermediate_releases(self):
+        self.assertEqual(
+            b'\x00\x00\x04\x00\x00\x00\x00\x00'
+            b'\x00\x00\x05\x00\x00\x00\x00\x00'
+            b'\x00\x00\x06\x00\x00\x00\x00\x00'
+            b'\x00\x00\x00\x00\x00\x00\x00\x00',
+            keyboard.compile_keystrokes([
+                hid.Keystroke(keycode=hid.KEYCODE_A),
+                hid.Keystroke(keycode=hid.KEYCODE_B),
+                hid.Keystroke(keycode=hid.KEYCODE_C),
+            ]))
+
+    def test_compiles_repeated_key_with_release_in_between(self):
+        self.assertEqual(
+            b'\x00\x00\x04\x00\x00\x00\x00\x00'
+            b'\x00\x00\x00\x00\x00\x00\x00\x00'
+            b'\x00\x00\x04\x00\x00\x00\x00\x00'
+            b'\x00\x00\x00\x00\x00\x00\x00\x00',
+            keyboard.compile_keystrokes([
+                hid.Keystroke(keycode=hid.KEYCODE_A),
+                hid.Keystroke(keycode=hid.KEYCODE_A),
+            ]))
+
+    def test_merges_modifier_changes_into_adjacent_reports(self):
+        self.assertEqual(
+            b'\x00\x00\x04\x00\x00\x00\x00\x00'
+            b'\x02\x00\x05\x00\x00\x00\x00\x00'
+            b'\x02\x00\x00\x00\x00\x00\x00\x00'
+            b'\x02\x00\x05\x00\x00\x00\x00\x00'
+            b'\x00\x00\x00\x00\x00\x00\x00\x00',
+            keyboard.compile_keystrokes([
+                hid.Keystroke(keycode=hid.KEYCODE_A),
+                hid.Keystroke(keycode=hid.KEYCODE_B,
+                              modifier=hid.MODIFIER_LEFT_SHIFT),
+                hid.Keystroke(keycode=hid.KEYCODE_B,
+                              modifier=hid.MODIFIER_LEFT_SHIFT),
+            ]))
+
+    def test_compiles_empty_list_of_keystrokes(self):
+        self.assertEqual(b'', keyboard.compile_keystrokes([]))
+
+    def test_compiled_stream_is_equivalent_to_individual_keystrokes(self):
+        # Cover all sequences of up to four keystrokes, including repeated keys,
+        # modifier changes, and standalone modifier keys.
+        alphabet = [
+            hid.Keystroke(keycode=keycode, modifier=modifier)
+            for keycode in (hid.KEYCODE_A, hid.KEYCODE_B)
+            for modifier in (hid.KEYCODE_NONE, hid.MODIFIER_LEFT_SHIFT,
+                             hid.MODIFIER_ALT_GR)
+        ] + [
+            hid.Keystroke(keycode=hid.KEYCODE_NONE,
+                          modifier=hid.MODIFIER_LEFT_SHIFT)
+        ]
+        for length in range(5):
+            for keystrokes in itertools.product(alphabet, repeat=length):
+                with self.subTest(keystrokes=keystrokes):
+                    individual_stream = individual_report_stream(keystrokes)
+                    # Unlike individual keystrokes, the compiled stream also
+                    # releases a trailing standalone modifier key.
+                    if individual_stream[-reports.
+                                         KEYBOARD_REPORT_SIZE:] not in (
+                                             b'',
+                                             reports.KEYBOARD_RELEASE_REPORT):
+                        individual_stream += reports.KEYBOARD_RELEASE_REPORT
+                    compiled_stream = keyboard.compile_keystrokes(keystrokes)
+
+                    expected_host = HostKeyStateModel()
+                    expected_host.process(individual_stream)
+                    actual_host = HostKeyStateModel()
+                    actual_host.process(compiled_stream)
+
+                    self.assertEqual(expected_host.key_presses,
+                                     actual_host.key_presses)
+                    self.assertEqual(set(), actual_host.pressed_keycodes)
+                    self.assertEqual(0, actual_host.modifier)
+                    self.assertLessEqual(len(compiled_stream),
+                                         len(individual_stream))
@@ -0,0 +1,205 @@
+"""Keeps track of whether the target system is able to receive HID reports.
+
+When the target system is turned off or the USB cable is unplugged, writes to
+the HID interfaces don't fail right away, but only after they've hit their
+deadline. If every keystroke and mouse event has to wait for that, the server
+backs up. So we use two sources of information to fail writes early instead:
+
+- The state of the USB device controller (UDC), which we read from sysfs
+  periodically (see also `scripts/check-usb-data-status`). While the UDC
+  reports that no host is attached, all writes fail immediately.
+- A circuit breaker per HID interface, which trips after several consecutive
+  writes have failed. While it's tripped, writes to that interface fail
+  immediately. After a cooldown period, the breaker lets writes through again,
+  so that we notice when the interface has recovered. We need this in addition
+  to the UDC state, because the target system might be attached but still not
+  read from an interface (e.g., from the mouse interface if it has no GUI).
+"""
+import enum
+import logging
+import time
+
+import eventlet
+
+logger = logging.getLogger(__name__)
+
+# The file that contains the name of the UDC that the USB gadget is bound to.
+_UDC_NAME_PATH = '/sys/kernel/config/usb_gadget/g1/UDC'
+
+# The file that contains the USB device state of a UDC (e.g., `configured`).
+_UDC_STATE_PATH_TEMPLATE = '/sys/class/udc/{udc_name}/state'
+
+# The USB device states in which the host is able to receive reports. A
+# suspended host can still receive reports (e.g., for waking it up).
+_CONNECTED_UDC_STATES = ('configured', 'suspended')
+
+_POLL_INTERVAL_SECONDS = 1.0
+
+# The number of consecutive failed writes after which the circuit breaker of
+# an interface trips.
+_FAILURE_THRESHOLD = 3
+
+# The time for which a tripped circuit breaker rejects all writes.
+_COOLDOWN_SECONDS = 2.0
+
+
+class LinkState(enum.Enum):
+    UNKNOWN = 'unknown'
+    CONNECTED = 'connected'
+    DISCONNECTED = 'disconnected'
+
+
+def read_link_state():
+    """Determines the state of the USB link from the UDC state in sysfs.
+
+    Returns:
+        A `LinkState` value. If the state can't be determined (e.g., on a
+        development system without USB gadget support), it's `UNKNOWN`.
+    """
+    try:
+        with open(_UDC_NAME_PATH, encoding='utf-8') as udc_name_file:
+            udc_name = udc_name_file.read().strip()
+        # If the USB gadget isn't bound to a UDC, it can't send any reports.
+        if not udc_name:
+            return LinkState.DISCONNECTED
+        with open(_UDC_STATE_PATH_TEMPLATE.format(udc_name=udc_name),
+                  encoding='utf-8') as udc_state_file:
+            udc_state = udc_state_file.read().strip()
+    except OSError:
+        return LinkState.UNKNOWN
+    if udc_state in _CONNECTED_UDC_STATES:
+        return LinkState.CONNECTED
+    return LinkState.DISCONNECTED
+
+
+class CircuitBreaker:
+    """Rejects writes to an interface after repeated write failures."""
+
+    def __init__(self):
+        self._consecutive_failures = 0
+        self._tripped_at = None
+
+    def is_tripped(self):
+        return self._consecutive_failures >= _FAILURE_THRESHOLD
+
+    def allows_write(self):
+        # Once the cooldown has passed, let writes through to probe whether the
+        # interface has recovered. If the write fails, the breaker trips again.
+        return (not self.is_tripped() or
+                time.monotonic() - self._tripped_at >= _COOLDOWN_SECONDS)
+
+    def record_success(self):
+        self._consecutive_failures = 0
+        self._tripped_at = None
+
+    def record_failure(self):
+        self._consecutive_failures += 1
+        if self.is_tripped():
+            self._tripped_at = time.monotonic()
+
+
+class Monitor:
+    """Combines the USB link state with the circuit breakers of interfaces."""
+
+    def __init__(self):
+        self.link_state = LinkState.UNKNOWN
+        # A mapping of HID interface paths to `CircuitBreaker` objects.
+        self._circuit_breakers = {}
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """Registers a function to call whenever the USB link state changes.
+
+        Args:
+            listener: A function that takes the new `LinkState` as its only
+                argument.
+        """
+        self._listeners.append(listener)
+
+    def is_write_allowed(self, hid_path):
+        if self.link_state == LinkState.DISCONNECTED:
+            return False
+        circuit_breaker = self._circuit_breakers.get(hid_path)
+        return circuit_breaker is None or circuit_breaker.allows_write()
+
+    def record_write_result(self, hid_path, is_success):
+        circuit_breaker = self._circuit_breakers.get(hid_path)
+        if circuit_breaker is None:
+            circuit_breaker = CircuitBreaker()
+            self._circuit_breakers[hid_path] = circuit_breaker
+        was_tripped = circuit_breaker.is_tripped()
+        if is_success:
+            circuit_breaker.record_success()
+        else:
+            circuit_breaker.record_failure()
+        if circuit_breaker.is_tripped() and not was_tripped:
+            logger.warning(
+                'Rejecting writes to HID interface %s after %d '
+                'consecutive failures', hid_path, _FAILURE_THRESHOLD)
+        elif was_tripped and not circuit_breaker.is_tripped():
+            logger.info('HID interface %s has recovered', hid_path)
+
+    def update_link_state(self, link_state):
+        if link_state == self.link_state:
+            return
+        logger.info('USB link state changed from %s to %s',
+                    self.link_state.value, link_state.value)
+        self.link_state = link_state
+        # A fresh connection deserves a fresh chance.
+        if link_state == LinkState.CONNECTED:
+            self._circuit_breakers.clear()
+        for listener in self._listeners:
+            listener(link_state)
+
+    def run(self):
+        """Polls the USB link state until the process exits."""
+        while True:
+            self.update_link_state(read_link_state())
+            eventlet.sleep(_POLL_INTERVAL_SECONDS)
+
+
+_monitor = Monitor()
+
+
+def get_link_state():
+    """Returns the current `LinkState` of the USB link."""
+    return _monitor.link_state
+
+
+def add_listener(listener):
+    """Registers a function to call whenever the USB link state changes.
+
+    See `Monitor.add_listener` for details.
+    """
+    _monitor.add_listener(listener)
+
+
+def is_write_allowed(hid_path):
+    """Checks whether a write to a HID interface has a chance to succeed.
+
+    Args:
+        hid_path: The path to the HID interface file.
+
+    Returns:
+        False if the USB link is down, or if the circuit breaker of the HID
+        interface has tripped. True otherwise.
+    """
+    return _monitor.is_write_allowed(hid_path)
+
+
+def record_write_result(hid_path, is_success):
+    """Records the outcome of a write for the circuit breaker of an interface.
+
+    Args:
+        hid_path: The path to the HID interface file.
+        is_success: Whether the HID interface accepted the report (bool).
+    """
+    _monitor.record_write_result(hid_path, is_success)
+
+
+def run():
+    """Polls the USB link state until the process exits.
+
+    This function should run in a background greenlet.
+    """
+    _monitor.run()
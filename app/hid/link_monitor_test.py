@@ -0,0 +1,157 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from hid import link_monitor
+
+
+class ReadLinkStateTest(unittest.TestCase):
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(temp_dir.cleanup)
+        self.udc_name_path = os.path.join(temp_dir.name, 'UDC')
+        self.udc_state_dir = os.path.join(temp_dir.name, 'udc')
+
+        for patcher in (
+                mock.patch.object(link_monitor, '_UDC_NAME_PATH',
+                                  self.udc_name_path),
+                mock.patch.object(
+                    link_monitor, '_UDC_STATE_PATH_TEMPLATE',
+                    os.path.join(self.udc_state_dir, '{udc_name}', 'state')),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def make_udc(self, udc_name, udc_state):
+        with open(self.udc_name_path, 'w', encoding='utf-8') as udc_name_file:
+            udc_name_file.write(f'{udc_name}\n')
+        os.makedirs(os.path.join(self.udc_state_dir, udc_name))
+        with open(os.path.join(self.udc_state_dir, udc_name, 'state'),
+                  'w',
+                  encoding='utf-8') as udc_state_file:
+            udc_state_file.write(f'{udc_state}\n')
+
+    def test_reports_connected_link_when_host_has_configured_device(self):
+        self.make_udc('fe980000.usb', 'configured')
+        self.assertEqual(link_monitor.LinkState.CONNECTED,
+                         link_monitor.read_link_state())
+
+    def test_reports_connected_link_when_host_is_suspended(self):
+        self.make_udc('fe980000.usb', 'suspended')
+        self.assertEqual(link_monitor.LinkState.CONNECTED,
+                         link_monitor.read_link_state())
+
+    def test_reports_disconnected_link_when_no_host_is_attached(self):
+        self.make_udc('fe980000.usb', 'not attached')
+        self.assertEqual(link_monitor.LinkState.DISCONNECTED,
+                         link_monitor.read_link_state())
+
+    def test_reports_disconnected_link_when_gadget_is_unbound(self):
+        with open(self.udc_name_path, 'w', encoding='utf-8') as udc_name_file:
+            udc_name_file.write('\n')
+        self.assertEqual(link_monitor.LinkState.DISCONNECTED,
+                         link_monitor.read_link_state())
+
+    def test_reports_unknown_link_state_without_usb_gadget(self):
+        self.assertEqual(link_monitor.LinkState.UNKNOWN,
+                         link_monitor.read_link_state())
+
+
+@mock.patch.object(link_monitor.time, 'monotonic')
+class CircuitBreakerTest(unittest.TestCase):
+
+    def test_allows_writes_until_failure_threshold_is_reached(
+            self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        circuit_breaker = link_monitor.CircuitBreaker()
+
+        circuit_breaker.record_failure()
+        circuit_breaker.record_failure()
+        self.assertTrue(circuit_breaker.allows_write())
+
+        circuit_breaker.record_failure()
+        self.assertFalse(circuit_breaker.allows_write())
+
+    def test_resets_failure_count_on_success(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        circuit_breaker = link_monitor.CircuitBreaker()
+
+        circuit_breaker.record_failure()
+        circuit_breaker.record_failure()
+        circuit_breaker.record_success()
+        circuit_breaker.record_failure()
+        self.assertTrue(circuit_breaker.allows_write())
+
+    def test_lets_writes_through_after_cooldown(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        circuit_breaker = link_monitor.CircuitBreaker()
+        for _ in range(3):
+            circuit_breaker.record_failure()
+
+        mock_monotonic.return_value = 101.9
+        self.assertFalse(circuit_breaker.allows_write())
+        mock_monotonic.return_value = 102.0
+        self.assertTrue(circuit_breaker.allows_write())
+
+        # If the probing write fails, the breaker trips again.
+        circuit_breaker.record_failure()
+        self.assertFalse(circuit_breaker.allows_write())
+
+        # If the probing write succeeds, the breaker closes.
+        mock_monotonic.return_value = 104.0
+        circuit_breaker.record_success()
+        self.assertFalse(circuit_breaker.is_tripped())
+        self.assertTrue(circuit_breaker.allows_write())
+
+
+class MonitorTest(unittest.TestCase):
+
+    def test_allows_writes_while_link_state_is_unknown(self):
+        monitor = link_monitor.Monitor()
+        self.assertTrue(monitor.is_write_allowed('/dev/hidg0'))
+
+    def test_rejects_writes_while_link_is_disconnected(self):
+        monitor = link_monitor.Monitor()
+
+        monitor.update_link_state(link_monitor.LinkState.DISCONNECTED)
+        self.assertFalse(monitor.is_write_allowed('/dev/hidg0'))
+        self.assertFalse(monitor.is_write_allowed('/dev/hidg1'))
+
+        monitor.update_link_state(link_monitor.LinkState.CONNECTED)
+        self.assertTrue(monitor.is_write_allowed('/dev/hidg0'))
+        self.assertTrue(monitor.is_write_allowed('/dev/hidg1'))
+
+    def test_rejects_writes_to_failing_interface_only(self):
+        monitor = link_monitor.Monitor()
+
+        for _ in range(3):
+            monitor.record_write_result('/dev/hidg1', is_success=False)
+
+        self.assertTrue(monitor.is_write_allowed('/dev/hidg0'))
+        self.assertFalse(monitor.is_write_allowed('/dev/hidg1'))
+
+    def test_resets_circuit_breakers_when_link_reconnects(self):
+        monitor = link_monitor.Monitor()
+        for _ in range(3):
+            monitor.record_write_result('/dev/hidg1', is_success=False)
+
+        monitor.update_link_state(link_monitor.LinkState.DISCONNECTED)
+        monitor.update_link_state(link_monitor.LinkState.CONNECTED)
+
+        self.assertTrue(monitor.is_write_allowed('/dev/hidg1'))
+
+    def test_notifies_listeners_of_link_state_changes_only(self):
+        monitor = link_monitor.Monitor()
+        listener = mock.Mock()
+        monitor.add_listener(listener)
+
+        monitor.update_link_state(link_monitor.LinkState.CONNECTED)
+        monitor.update_link_state(link_monitor.LinkState.CONNECTED)
+        monitor.update_link_state(link_monitor.LinkState.DISCONNECTED)
+
+        self.assertEqual([
+            mock.call(link_monitor.LinkState.CONNECTED),
+            mock.call(link_monitor.LinkState.DISCONNECTED),
+        ], listener.call_args_list)
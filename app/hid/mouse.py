@@ -1,20 +1,24 @@
+from hid import reports
 from hid import write as hid_write
 
 
 def send_mouse_event(mouse_path, buttons, relative_x, relative_y,
                      vertical_wheel_delta, horizontal_wheel_delta):
-    # pylint: disable=invalid-name,too-many-positional-arguments
-    x, y = _scale_mouse_coordinates(relative_x, relative_y)
+    # pylint: disable=too-many-positional-arguments
+    hid_write.write_to_hid_interface(
+        mouse_path,
+        mouse_event_report(buttons, relative_x, relative_y,
+                           vertical_wheel_delta, horizontal_wheel_delta))
+
 
-    buf = [0] * 7
-    buf[0] = buttons
-    buf[1] = x & 0xff
-    buf[2] = (x >> 8) & 0xff
-    buf[3] = y & 0xff
-    buf[4] = (y >> 8) & 0xff
-    buf[5] = _translate_vertical_wheel_delta(vertical_wheel_delta) & 0xff
-    buf[6] = horizontal_wheel_delta & 0xff
-    hid_write.write_to_hid_interface(mouse_path, buf)
+def mouse_event_report(buttons, relative_x, relative_y, vertical_wheel_delta,
+                       horizontal_wheel_delta):
+    """Returns the report that `send_mouse_event` writes for a mouse event."""
+    # pylint: disable=invalid-name
+    x, y = _scale_mouse_coordinates(relative_x, relative_y)
+    return reports.mouse_report(
+        buttons, x, y, _translate_vertical_wheel_delta(vertical_wheel_delta),
+        horizontal_wheel_delta)
 
 
 def _scale_mouse_coordinates(relative_x, relative_y):
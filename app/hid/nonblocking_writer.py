@@ -0,0 +1,118 @@
+"""Writes HID reports in-process, using non-blocking I/O.
+
+Writes to a USB gadget interface can hang when there is no host reading from
+it. Instead of isolating the I/O in a separate process (see `process_writer`),
+this module opens the HID interfaces with `O_NONBLOCK`. Whenever the interface
+isn't ready to take more data, we wait cooperatively for it to become writable
+again, until the deadline expires. That way, neither the server process nor any
+other greenlet is blocked while a write is pending.
+"""
+import dataclasses
+import logging
+import os
+import time
+
+import eventlet.hubs
+import eventlet.semaphore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class _Interface:
+    hid_fd: int
+    # Ensures that reports don't interleave while a write is pending, and that
+    # the file descriptor doesn't get closed while another greenlet uses it.
+    lock: eventlet.semaphore.Semaphore
+    # Whether the file descriptor was closed. Greenlets that were waiting for
+    # the lock in the meantime must not use it anymore, because its number
+    # might have been reused for an unrelated file.
+    closed: bool = False
+
+
+# A mapping of HID interface paths to `_Interface` objects, so that we only open
+# each HID interface file once.
+_interfaces = {}
+
+
+def write(hid_path, buffer, timeout_in_seconds):
+    """Writes a report to a HID interface without blocking the server.
+
+    Args:
+        hid_path: The path to the HID interface file.
+        buffer: The report as bytes-like object.
+        timeout_in_seconds: The time limit for the write to complete.
+
+    Returns:
+        Always True, because the report is never rejected, only delayed. (The
+        return value matches that of `process_writer.write`.)
+
+    Raises:
+        TimeoutError: If the HID interface didn't accept the full report in
+            time.
+        OSError: If opening or writing to the HID interface failed.
+    """
+    deadline = time.monotonic() + timeout_in_seconds
+    while True:
+        interface = _get_interface(hid_path)
+        with interface.lock:
+            if not interface.closed:
+                _write_to_interface(hid_path, interface, buffer, deadline)
+                return True
+
+
+def _write_to_interface(hid_path, interface, buffer, deadline):
+    # The caller must hold the interface's lock.
+    try:
+        _write_before_deadline(interface.hid_fd, memoryview(buffer), deadline)
+    except TimeoutError:
+        # The host just isn't reading at the moment, so the file descriptor
+        # itself is still intact.
+        raise
+    except OSError:
+        # The gadget interface might have been torn down in the meantime (e.g.,
+        # when the USB gadget gets re-initialized), so discard the file
+        # descriptor and reopen the interface on the next write.
+        _close_interface(hid_path, interface)
+        raise
+
+
+def _write_before_deadline(hid_fd, buffer, deadline):
+    while buffer:
+        try:
+            bytes_written = os.write(hid_fd, buffer)
+        except BlockingIOError as e:
+            remaining_seconds = deadline - time.monotonic()
+            if remaining_seconds <= 0:
+                raise TimeoutError(
+                    'HID interface did not become writable in time') from e
+            eventlet.hubs.trampoline(hid_fd,
+                                     write=True,
+                                     timeout=remaining_seconds,
+                                     timeout_exc=TimeoutError)
+            continue
+        # Gadget interfaces normally accept a report in full, but we don't
+        # want to silently truncate a report if they don't.
+        buffer = buffer[bytes_written:]
+
+
+def _get_interface(hid_path):
+    interface = _interfaces.get(hid_path)
+    if interface is None:
+        hid_fd = os.open(hid_path,
+                         os.O_RDWR | os.O_APPEND | os.O_CREAT | os.O_NONBLOCK)
+        interface = _Interface(hid_fd=hid_fd,
+                               lock=eventlet.semaphore.Semaphore())
+        _interfaces[hid_path] = interface
+        logger.info('Opened HID interface %s in non-blocking mode', hid_path)
+    return interface
+
+
+def _close_interface(hid_path, interface):
+    # The caller must hold the interface's lock, so that no other greenlet is
+    # using the file descriptor.
+    if _interfaces.get(hid_path) is interface:
+        del _interfaces[hid_path]
+    if not interface.closed:
+        interface.closed = True
+        os.close(interface.hid_fd)
@@ -0,0 +1,149 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import eventlet
+
+from hid import nonblocking_writer
+
+
+def fill_fifo(fifo_path):
+    """Fills up the FIFO's buffer, so that subsequent writes to it block.
+
+    Returns:
+        A file descriptor (as int), through which the FIFO can be drained.
+    """
+    fifo_fd = os.open(fifo_path, os.O_RDWR | os.O_NONBLOCK)
+    try:
+        while True:
+            os.write(fifo_fd, b'\x00' * 4096)
+    except BlockingIOError:
+        pass
+    return fifo_fd
+
+
+def drain_fifo(fifo_fd):
+    try:
+        while os.read(fifo_fd, 65536):
+            pass
+    except BlockingIOError:
+        pass
+
+
+class NonblockingWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(nonblocking_writer, '_interfaces', {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.close_all_interfaces)
+
+    def close_all_interfaces(self):
+        # pylint: disable=protected-access
+        for hid_path, interface in list(nonblocking_writer._interfaces.items()):
+            nonblocking_writer._close_interface(hid_path, interface)
+
+    def test_writes_report_to_hid_interface(self):
+        with tempfile.NamedTemporaryFile() as input_file:
+            nonblocking_writer.write(input_file.name,
+                                     b'\x00\x00\x04\x00\x00\x00\x00\x00',
+                                     timeout_in_seconds=0.5)
+            self.assertEqual(b'\x00\x00\x04\x00\x00\x00\x00\x00',
+                             input_file.read())
+
+    def test_writes_remainder_of_partially_written_report(self):
+        real_write = os.write
+        with tempfile.NamedTemporaryFile() as input_file, mock.patch.object(
+                nonblocking_writer.os, 'write') as mock_write:
+            # Only accept one byte per call.
+            mock_write.side_effect = lambda fd, data: real_write(fd, data[:1])
+            nonblocking_writer.write(input_file.name,
+                                     b'\x01\x02\x03',
+                                     timeout_in_seconds=0.5)
+            self.assertEqual(b'\x01\x02\x03', input_file.read())
+            self.assertEqual(3, mock_write.call_count)
+
+    def test_waits_until_stalled_interface_becomes_writable(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            fifo_path = os.path.join(temp_dir, 'hidg0')
+            os.mkfifo(fifo_path)
+            fifo_fd = fill_fifo(fifo_path)
+            self.addCleanup(os.close, fifo_fd)
+
+            # Simulate a host that starts reading from the interface shortly
+            # after the write was issued.
+            eventlet.spawn_after(0.05, drain_fifo, fifo_fd)
+            nonblocking_writer.write(fifo_path, b'\x01', timeout_in_seconds=0.5)
+            self.assertEqual(b'\x01', os.read(fifo_fd, 1))
+
+    def test_times_out_on_stalled_interface_and_recovers(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            fifo_path = os.path.join(temp_dir, 'hidg0')
+            os.mkfifo(fifo_path)
+            fifo_fd = fill_fifo(fifo_path)
+            self.addCleanup(os.close, fifo_fd)
+
+            with self.assertRaises(TimeoutError):
+                nonblocking_writer.write(fifo_path,
+                                         b'\x01',
+                                         timeout_in_seconds=0.1)
+
+            drain_fifo(fifo_fd)
+            nonblocking_writer.write(fifo_path, b'\x02', timeout_in_seconds=0.5)
+            self.assertEqual(b'\x02', os.read(fifo_fd, 1))
+
+    def test_reopens_interface_after_write_error(self):
+        with tempfile.NamedTemporaryFile() as input_file:
+            with mock.patch.object(nonblocking_writer.os,
+                                   'write') as mock_write:
+                mock_write.side_effect = OSError('Cannot send after shutdown')
+                with self.assertRaises(OSError):
+                    nonblocking_writer.write(input_file.name,
+                                             b'\x01',
+                                             timeout_in_seconds=0.5)
+            nonblocking_writer.write(input_file.name,
+                                     b'\x02',
+                                     timeout_in_seconds=0.5)
+            self.assertEqual(b'\x02', input_file.read())
+
+    def test_waiting_write_does_not_use_interface_closed_by_failed_write(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            fifo_path = os.path.join(temp_dir, 'hidg0')
+            os.mkfifo(fifo_path)
+            fifo_fd = fill_fifo(fifo_path)
+            self.addCleanup(os.close, fifo_fd)
+            real_write = os.write
+            failed_interfaces = []
+
+            def fail_first_write(file_descriptor, data):
+                if not failed_interfaces:
+                    # pylint: disable=protected-access
+                    failed_interfaces.append(
+                        nonblocking_writer._interfaces[fifo_path])
+                    eventlet.sleep(0.05)
+                    raise OSError('Cannot send after shutdown')
+                return real_write(file_descriptor, data)
+
+            with mock.patch.object(nonblocking_writer.os,
+                                   'write') as mock_write:
+                mock_write.side_effect = fail_first_write
+                # The first write fails while the second one waits for the
+                # lock.
+                failing_write = eventlet.spawn(nonblocking_writer.write,
+                                               fifo_path,
+                                               b'\x01',
+                                               timeout_in_seconds=0.5)
+                eventlet.sleep(0)
+                drain_fifo(fifo_fd)
+                nonblocking_writer.write(fifo_path,
+                                         b'\x02',
+                                         timeout_in_seconds=0.5)
+                with self.assertRaises(OSError):
+                    failing_write.wait()
+
+            self.assertEqual(b'\x02', os.read(fifo_fd, 1))
+            self.assertTrue(failed_interfaces[0].closed)
+            # pylint: disable=protected-access
+            self.assertIsNot(failed_interfaces[0],
+                             nonblocking_writer._interfaces[fifo_path])
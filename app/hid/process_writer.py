@@ -0,0 +1,177 @@
+"""Writes HID reports through a long-lived child process.
+
+Writes to a USB gadget interface can hang, for example, when TinyPilot is
+attempting to write to the mouse interface, but the target system has no GUI.
+To avoid locking up the main server process, we perform the HID interface I/O
+in a separate process.
+
+Spawning a fresh process for every single report is expensive, though, so we
+keep one worker process alive that holds the HID interface files open across
+writes. The server hands reports to the worker through a pipe, which acts as a
+FIFO queue, and waits for the worker to acknowledge each report. If the worker
+doesn't acknowledge a report within the deadline, we assume that it's stuck in
+a write, so we kill it and spawn a fresh worker for the next report.
+"""
+import logging
+import multiprocessing
+
+import eventlet.hubs
+import eventlet.semaphore
+
+import execute
+
+logger = logging.getLogger(__name__)
+
+
+class Error(Exception):
+    pass
+
+
+class WorkerCrashedError(Error):
+    pass
+
+
+def _serve(connection):
+    """Writes reports received through the pipe until the pipe is closed.
+
+    This function runs inside the worker process.
+
+    Args:
+        connection: The worker's end of the pipe (a
+            `multiprocessing.connection.Connection`).
+    """
+    # A mapping of HID interface paths to open file handles.
+    hid_handles = {}
+    try:
+        while True:
+            try:
+                hid_path, buffer = connection.recv()
+            except EOFError:
+                return
+            result = execute.ProcessResult()
+            try:
+                result.return_value = _write_report(hid_handles, hid_path,
+                                                    buffer)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                result.exception = e
+            connection.send(result)
+    finally:
+        for hid_handle in hid_handles.values():
+            hid_handle.close()
+
+
+def _write_report(hid_handles, hid_path, buffer):
+    """Writes a report to a HID interface.
+
+    Returns:
+        True if the HID interface accepted the report, or False if it rejected
+        the report because the interface would have blocked.
+    """
+    hid_handle = hid_handles.get(hid_path)
+    if hid_handle is None:
+        # pylint: disable=consider-using-with
+        hid_handle = open(hid_path, 'ab+', buffering=0)
+        hid_handles[hid_path] = hid_handle
+    try:
+        hid_handle.write(buffer)
+    except BlockingIOError:
+        logger.error(
+            'Failed to write to HID interface: %s. Is USB cable connected?',
+            hid_path)
+        return False
+    except OSError:
+        # The gadget interface might have been torn down in the meantime (e.g.,
+        # when the USB gadget gets re-initialized), so discard the handle and
+        # reopen the interface on the next write.
+        hid_handles.pop(hid_path).close()
+        raise
+    return True
+
+
+class Worker:
+    """Manages the lifecycle of a HID writer process.
+
+    The worker process is started lazily on the first write, and it's restarted
+    automatically whenever it got stuck or has crashed.
+    """
+
+    def __init__(self):
+        self._process = None
+        self._connection = None
+        # Ensures that only one report is in flight at a time, so that the
+        # acknowledgements match up with the reports.
+        self._lock = eventlet.semaphore.Semaphore()
+
+    def write(self, hid_path, buffer, timeout_in_seconds):
+        """Writes a report to a HID interface via the worker process.
+
+        Args:
+            hid_path: The path to the HID interface file.
+            buffer: The report as bytes-like object.
+            timeout_in_seconds: The time limit for the write to complete.
+
+        Returns:
+            True if the HID interface accepted the report, or False if it
+            rejected the report because the interface would have blocked.
+
+        Raises:
+            TimeoutError: If the worker didn't complete the write in time.
+            WorkerCrashedError: If the worker process exited unexpectedly.
+            OSError: If the worker failed to open or write to the HID interface.
+        """
+        with self._lock:
+            if self._process is None or not self._process.is_alive():
+                self._start()
+            self._connection.send((hid_path, bytes(buffer)))
+            try:
+                # Wait cooperatively, so that other greenlets can proceed while
+                # the worker is busy writing.
+                eventlet.hubs.trampoline(self._connection.fileno(),
+                                         read=True,
+                                         timeout=timeout_in_seconds,
+                                         timeout_exc=TimeoutError)
+                result = self._connection.recv()
+            except TimeoutError as e:
+                self.stop()
+                raise TimeoutError(f'HID write failed to complete in '
+                                   f'{timeout_in_seconds} seconds') from e
+            except EOFError as e:
+                self.stop()
+                raise WorkerCrashedError(
+                    'HID writer process exited unexpectedly') from e
+        if not result.was_successful():
+            raise result.exception
+        return result.return_value
+
+    def stop(self):
+        """Terminates the worker process, if it's running."""
+        if self._process is None:
+            return
+        self._process.kill()
+        self._process.join(timeout=0.3)
+        self._connection.close()
+        self._process = None
+        self._connection = None
+
+    def _start(self):
+        self.stop()
+        self._connection, child_connection = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_serve,
+                                                args=(child_connection,),
+                                                daemon=True)
+        self._process.start()
+        # The child process has inherited its end of the pipe, so we close our
+        # copy. That way, the worker receives an EOF once we close our end.
+        child_connection.close()
+        logger.info('Started HID writer process (pid=%d)', self._process.pid)
+
+
+_worker = Worker()
+
+
+def write(hid_path, buffer, timeout_in_seconds):
+    """Writes a report to a HID interface via the shared worker process.
+
+    See `Worker.write` for details.
+    """
+    return _worker.write(hid_path, buffer, timeout_in_seconds)
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+
+from hid import process_writer
+
+
+def fill_fifo(fifo_path):
+    """Fills up the FIFO's buffer, so that subsequent writes to it block.
+
+    Returns:
+        A file descriptor (as int), through which the FIFO can be drained.
+    """
+    fifo_fd = os.open(fifo_path, os.O_RDWR | os.O_NONBLOCK)
+    try:
+        while True:
+            os.write(fifo_fd, b'\x00' * 4096)
+    except BlockingIOError:
+        pass
+    return fifo_fd
+
+
+def drain_fifo(fifo_fd):
+    try:
+        while os.read(fifo_fd, 65536):
+            pass
+    except BlockingIOError:
+        pass
+
+
+class ProcessWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.worker = process_writer.Worker()
+        self.addCleanup(self.worker.stop)
+
+    def worker_pid(self):
+        return self.worker._process.pid  # pylint: disable=protected-access
+
+    def test_writes_report_to_hid_interface(self):
+        with tempfile.NamedTemporaryFile() as input_file:
+            self.worker.write(input_file.name,
+                              b'\x00\x00\x04\x00\x00\x00\x00\x00',
+                              timeout_in_seconds=0.5)
+            self.assertEqual(b'\x00\x00\x04\x00\x00\x00\x00\x00',
+                             input_file.read())
+
+    def test_writes_reports_in_order_to_multiple_interfaces(self):
+        with tempfile.NamedTemporaryFile() as keyboard_file, \
+                tempfile.NamedTemporaryFile() as mouse_file:
+            self.worker.write(keyboard_file.name, b'\x01', 0.5)
+            self.worker.write(mouse_file.name, b'\x02', 0.5)
+            self.worker.write(keyboard_file.name, b'\x03', 0.5)
+            self.assertEqual(b'\x01\x03', keyboard_file.read())
+            self.assertEqual(b'\x02', mouse_file.read())
+
+    def test_reuses_worker_process_across_writes(self):
+        with tempfile.NamedTemporaryFile() as input_file:
+            self.worker.write(input_file.name, b'\x01', 0.5)
+            first_pid = self.worker_pid()
+            self.worker.write(input_file.name, b'\x02', 0.5)
+            self.assertEqual(first_pid, self.worker_pid())
+
+    def test_raises_error_from_worker_process(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with self.assertRaises(FileNotFoundError):
+                self.worker.write(os.path.join(temp_dir, 'missing', 'hidg0'),
+                                  b'\x01', 0.5)
+
+    def test_times_out_on_stalled_interface_and_recovers(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            fifo_path = os.path.join(temp_dir, 'hidg0')
+            os.mkfifo(fifo_path)
+            fifo_fd = fill_fifo(fifo_path)
+            self.addCleanup(os.close, fifo_fd)
+
+            with self.assertRaises(TimeoutError):
+                self.worker.write(fifo_path, b'\x01', timeout_in_seconds=0.2)
+
+            # Once the host reads from the interface again, writes succeed
+            # through a fresh worker process.
+            drain_fifo(fifo_fd)
+            self.worker.write(fifo_path, b'\x02', timeout_in_seconds=0.5)
+            self.assertEqual(b'\x02', os.read(fifo_fd, 1))
@@ -0,0 +1,88 @@
+"""Encodes the HID reports for the keyboard and mouse interfaces.
+
+Reports are immutable `bytes` objects, so they can be handed to the HID writers
+without any further conversion, and they can be cached and shared safely.
+"""
+import struct
+
+# The size of a keyboard report in bytes:
+# - Byte 0:   modifier bitmask
+# - Byte 1:   reserved
+# - Byte 2-7: keycodes of up to six pressed keys
+KEYBOARD_REPORT_SIZE = 8
+
+# The report that releases all keys, including modifier keys.
+KEYBOARD_RELEASE_REPORT = bytes(KEYBOARD_REPORT_SIZE)
+
+# Lookup table of keyboard reports with a single pressed key, indexed by
+# `(modifier << 8) | keycode`. There are 65,536 possible combinations, but in
+# practice only a few hundred of them are ever used. So instead of encoding all
+# of them upfront, we fill in each entry on first use, and from then on the
+# report is served from the table without any allocations.
+_KEYBOARD_REPORTS = [None] * (1 << 16)
+_KEYBOARD_REPORTS[0] = KEYBOARD_RELEASE_REPORT
+
+# The layout of a mouse report (little-endian):
+# - Byte 0:   buttons bitmask
+# - Byte 1-2: x position (unsigned)
+# - Byte 3-4: y position (unsigned)
+# - Byte 5:   vertical wheel delta (signed)
+# - Byte 6:   horizontal wheel delta (signed)
+_MOUSE_REPORT_FORMAT = struct.Struct('<BHHbb')
+
+# The size of a mouse report in bytes.
+MOUSE_REPORT_SIZE = _MOUSE_REPORT_FORMAT.size
+
+
+def keyboard_report(modifier, keycode):
+    """Returns the keyboard report for a single key press.
+
+    Args:
+        modifier: The modifier bitmask (int between 0 and 0xff).
+        keycode: The HID keycode of the pressed key (int between 0 and 0xff).
+
+    Returns:
+        The 8-byte report as `bytes`.
+    """
+    index = (modifier << 8) | keycode
+    report = _KEYBOARD_REPORTS[index]
+    if report is None:
+        report = bytes((modifier, 0, keycode, 0, 0, 0, 0, 0))
+        _KEYBOARD_REPORTS[index] = report
+    return report
+
+
+def keyboard_report_for_keys(modifier, keycodes):
+    """Returns the keyboard report for several simultaneously pressed keys.
+
+    Args:
+        modifier: The modifier bitmask (int between 0 and 0xff).
+        keycodes: The HID keycodes of up to six pressed keys (list of ints
+            between 0 and 0xff), in the order in which they were pressed.
+
+    Returns:
+        The 8-byte report as `bytes`.
+    """
+    if len(keycodes) <= 1:
+        return keyboard_report(modifier, keycodes[0] if keycodes else 0)
+    return bytes((modifier, 0, *keycodes)).ljust(KEYBOARD_REPORT_SIZE, b'\0')
+
+
+def mouse_report(buttons, x, y, vertical_wheel_delta, horizontal_wheel_delta):
+    """Returns the mouse report for an absolute mouse event.
+
+    Args:
+        buttons: The buttons bitmask (int between 0 and 0xff).
+        x: The absolute x position in HID units (int between 0 and 0x7fff).
+        y: The absolute y position in HID units (int between 0 and 0x7fff).
+        vertical_wheel_delta: Vertical wheel delta in HID semantics (int between
+            -127 and 127).
+        horizontal_wheel_delta: Horizontal wheel delta (int between -127 and
+            127).
+
+    Returns:
+        The 7-byte report as `bytes`.
+    """
+    # pylint: disable=invalid-name
+    return _MOUSE_REPORT_FORMAT.pack(buttons, x, y, vertical_wheel_delta,
+                                     horizontal_wheel_delta)
@@ -0,0 +1,77 @@
+"""Compares the cost of encoding HID reports with the previous approach.
+
+Previously, every report was assembled as a fresh list of ints, which was then
+converted to a `bytearray` right before writing it. This benchmark measures the
+time per report and the memory that each report occupies, for both the previous
+and the current approach.
+
+To run the benchmark:
+
+    cd app && python -m hid.reports_benchmark
+"""
+import timeit
+import tracemalloc
+
+from hid import keycodes as hid
+from hid import reports
+
+_ITERATIONS = 200000
+
+
+def _legacy_keyboard_report(modifier, keycode):
+    buf = [0] * 8
+    buf[0] = modifier
+    buf[2] = keycode
+    return bytearray(buf)
+
+
+def _legacy_mouse_report(buttons, x, y, vertical_wheel_delta,
+                         horizontal_wheel_delta):
+    # pylint: disable=invalid-name
+    buf = [0] * 7
+    buf[0] = buttons
+    buf[1] = x & 0xff
+    buf[2] = (x >> 8) & 0xff
+    buf[3] = y & 0xff
+    buf[4] = (y >> 8) & 0xff
+    buf[5] = vertical_wheel_delta & 0xff
+    buf[6] = horizontal_wheel_delta & 0xff
+    return bytearray(buf)
+
+
+def _nanoseconds_per_call(function, args):
+    seconds = timeit.timeit(lambda: function(*args), number=_ITERATIONS)
+    return seconds / _ITERATIONS * 1e9
+
+
+def _retained_bytes_per_call(function, args):
+    """Measures how much memory the reports occupy that a function returns."""
+    results = [None] * _ITERATIONS
+    tracemalloc.start()
+    for i in range(_ITERATIONS):
+        results[i] = function(*args)
+    allocated_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return allocated_bytes / _ITERATIONS
+
+
+def _print_comparison(label, legacy_function, function, args):
+    print(label)
+    for name, measured_function in (('previous', legacy_function), ('current',
+                                                                    function)):
+        print(f'  {name:<9}'
+              f'{_nanoseconds_per_call(measured_function, args):8.1f} ns/call'
+              f'{_retained_bytes_per_call(measured_function, args):8.1f} '
+              'bytes/call')
+
+
+def main():
+    _print_comparison('Keyboard report', _legacy_keyboard_report,
+                      reports.keyboard_report,
+                      (hid.MODIFIER_LEFT_SHIFT, hid.KEYCODE_A))
+    _print_comparison('Mouse report', _legacy_mouse_report,
+                      reports.mouse_report, (1, 0x3fff, 0x5fff, -1, 0))
+
+
+if __name__ == '__main__':
+    main()
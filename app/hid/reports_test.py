@@ -0,0 +1,77 @@
+import unittest
+
+from hid import keycodes as hid
+from hid import reports
+
+
+class KeyboardReportTest(unittest.TestCase):
+
+    def test_encodes_keycode_without_modifier(self):
+        self.assertEqual(b'\x00\x00\x04\x00\x00\x00\x00\x00',
+                         reports.keyboard_report(0, hid.KEYCODE_A))
+
+    def test_encodes_keycode_with_modifier(self):
+        self.assertEqual(
+            b'\x22\x00\x05\x00\x00\x00\x00\x00',
+            reports.keyboard_report(
+                hid.MODIFIER_LEFT_SHIFT | hid.MODIFIER_RIGHT_SHIFT,
+                hid.KEYCODE_B))
+
+    def test_encodes_standalone_modifier(self):
+        self.assertEqual(
+            b'\x80\x00\x00\x00\x00\x00\x00\x00',
+            reports.keyboard_report(hid.MODIFIER_RIGHT_META, hid.KEYCODE_NONE))
+
+    def test_encodes_highest_modifier_and_keycode(self):
+        self.assertEqual(b'\xff\x00\xff\x00\x00\x00\x00\x00',
+                         reports.keyboard_report(0xff, 0xff))
+
+    def test_reuses_report_objects(self):
+        self.assertIs(reports.keyboard_report(0, hid.KEYCODE_C),
+                      reports.keyboard_report(0, hid.KEYCODE_C))
+
+    def test_release_report_is_all_zeros(self):
+        self.assertEqual(b'\x00\x00\x00\x00\x00\x00\x00\x00',
+                         reports.KEYBOARD_RELEASE_REPORT)
+        self.assertIs(reports.KEYBOARD_RELEASE_REPORT,
+                      reports.keyboard_report(0, hid.KEYCODE_NONE))
+
+
+class KeyboardReportForKeysTest(unittest.TestCase):
+
+    def test_encodes_no_pressed_keys_as_release_report(self):
+        self.assertIs(reports.KEYBOARD_RELEASE_REPORT,
+                      reports.keyboard_report_for_keys(0, []))
+
+    def test_encodes_single_key_like_keyboard_report(self):
+        self.assertIs(
+            reports.keyboard_report(hid.MODIFIER_LEFT_SHIFT, hid.KEYCODE_A),
+            reports.keyboard_report_for_keys(hid.MODIFIER_LEFT_SHIFT,
+                                             [hid.KEYCODE_A]))
+
+    def test_encodes_keys_in_order_of_pressing(self):
+        self.assertEqual(
+            b'\x01\x00\x06\x04\x05\x00\x00\x00',
+            reports.keyboard_report_for_keys(
+                hid.MODIFIER_LEFT_CTRL,
+                [hid.KEYCODE_C, hid.KEYCODE_A, hid.KEYCODE_B]))
+
+    def test_encodes_six_keys(self):
+        self.assertEqual(
+            b'\x00\x00\x04\x05\x06\x07\x08\x09',
+            reports.keyboard_report_for_keys(0, [4, 5, 6, 7, 8, 9]))
+
+
+class MouseReportTest(unittest.TestCase):
+
+    def test_encodes_buttons_and_position(self):
+        self.assertEqual(b'\x01\xff\x3f\xff\x5f\x00\x00',
+                         reports.mouse_report(0x01, 0x3fff, 0x5fff, 0, 0))
+
+    def test_encodes_negative_wheel_deltas(self):
+        self.assertEqual(b'\x00\x00\x00\xff\x7f\xff\xff',
+                         reports.mouse_report(0, 0, 0x7fff, -1, -1))
+
+    def test_encodes_positive_wheel_deltas(self):
+        self.assertEqual(b'\x00\x00\x00\x00\x00\x01\x01',
+                         reports.mouse_report(0, 0, 0, 1, 1))
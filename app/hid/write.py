@@ -1,6 +1,11 @@
 import logging
+import time
 
-import execute
+import env
+from hid import link_monitor
+from hid import nonblocking_writer
+from hid import process_writer
+from hid import write_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -13,14 +18,40 @@ class WriteError(Error):
     pass
 
 
-def _write_to_hid_interface_immediately(hid_path, buffer):
-    try:
-        with open(hid_path, 'ab+') as hid_handle:
-            hid_handle.write(bytearray(buffer))
-    except BlockingIOError:
-        logger.error(
-            'Failed to write to HID interface: %s. Is USB cable connected?',
-            hid_path)
+class InterfaceUnavailableError(WriteError):
+    pass
+
+
+def _get_writer(hid_write_mode):
+    """Returns the write function for the configured HID write mode.
+
+    Args:
+        hid_write_mode: Either `process` or `nonblocking` (as string).
+
+    Returns:
+        A function with the signature
+        `write(hid_path, buffer, timeout_in_seconds)`.
+    """
+    if hid_write_mode == 'nonblocking':
+        return nonblocking_writer.write
+    if hid_write_mode != 'process':
+        logger.warning('Unknown HID write mode %s, falling back to "process"',
+                       hid_write_mode)
+    return process_writer.write
+
+
+_write = _get_writer(env.HID_WRITE_MODE)
+
+
+def set_write_mode(hid_write_mode):
+    """Overrides the HID write mode from the configuration (`HID_WRITE_MODE`).
+
+    Args:
+        hid_write_mode: Either `process` or `nonblocking` (as string).
+    """
+    # pylint: disable=global-statement
+    global _write
+    _write = _get_writer(hid_write_mode)
 
 
 def write_to_hid_interface(hid_path, buffer):
@@ -29,13 +60,26 @@ def write_to_hid_interface(hid_path, buffer):
     if logger.getEffectiveLevel() == logging.DEBUG:
         logger.debug_sensitive('writing to HID interface %s: %s', hid_path,
                                ' '.join([f'{x:#04x}' for x in buffer]))
+    # Don't wait for the deadline of a write that would fail anyway.
+    if not link_monitor.is_write_allowed(hid_path):
+        raise InterfaceUnavailableError(
+            f'HID interface is unavailable: {hid_path}. '
+            'Is USB cable connected?')
     # Writes can hang, for example, when TinyPilot is attempting to write to the
     # mouse interface, but the target system has no GUI. To avoid locking up the
-    # main server process, perform the HID interface I/O in a separate process.
+    # main server process, the writers enforce a deadline on every write.
+    start_time = time.monotonic()
     try:
-        execute.with_timeout(_write_to_hid_interface_immediately,
-                             args=(hid_path, buffer),
-                             timeout_in_seconds=0.5)
-    except TimeoutError as e:
+        was_accepted = _write(hid_path, buffer, timeout_in_seconds=0.5)
+    # Besides timeouts (`TimeoutError` is an `OSError`), the writers raise
+    # `OSError` if the gadget interface has gone away (e.g., `ESHUTDOWN`).
+    except (OSError, process_writer.Error) as e:
+        write_metrics.record_error(hid_path,
+                                   time.monotonic() - start_time,
+                                   is_timeout=isinstance(e, TimeoutError))
+        link_monitor.record_write_result(hid_path, is_success=False)
         raise WriteError(f'Failed to write to HID interface: {hid_path}. '
                          'Is USB cable connected?') from e
+    write_metrics.record_write(hid_path, len(buffer),
+                               time.monotonic() - start_time, was_accepted)
+    link_monitor.record_write_result(hid_path, is_success=was_accepted)
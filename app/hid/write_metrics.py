@@ -0,0 +1,131 @@
+"""Collects in-memory statistics about the writes to the HID interfaces.
+
+The metrics help us to correlate user reports about laggy or missing input with
+stalls of the HID interfaces. Recording a write must be cheap, since it happens
+on every single keystroke and mouse event, so the latencies are collected in a
+histogram with fixed buckets rather than as a list of individual samples.
+
+The metrics are kept per HID interface path, and they only live for the
+lifetime of the server process.
+"""
+import bisect
+import dataclasses
+
+# The upper bounds of the latency histogram buckets, in seconds. The buckets
+# grow geometrically (by 25% each), from 50 microseconds to about 1.8 seconds,
+# so the relative error of a percentile estimate is at most 25%. Latencies
+# beyond the last bound fall into an additional overflow bucket.
+_BUCKET_BOUNDS = tuple(50e-6 * 1.25**i for i in range(48))
+
+
+class LatencyHistogram:
+    """A histogram of latencies with geometrically growing bucket sizes."""
+
+    def __init__(self):
+        self._counts = [0] * (len(_BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.max_seconds = 0.0
+
+    def record(self, seconds):
+        self._counts[bisect.bisect_left(_BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def percentile(self, fraction):
+        """Estimates the latency below which the given fraction of samples fall.
+
+        Args:
+            fraction: The percentile as float between 0.0 and 1.0 (e.g., 0.95
+                for the 95th percentile).
+
+        Returns:
+            The upper bound of the bucket that contains the percentile (in
+            seconds, as float), capped at the maximum recorded latency. If
+            there are no samples, it returns None.
+        """
+        if self.count == 0:
+            return None
+        threshold = fraction * self.count
+        cumulative_count = 0
+        for bucket_index, bucket_count in enumerate(self._counts):
+            cumulative_count += bucket_count
+            if bucket_count and cumulative_count >= threshold:
+                if bucket_index == len(_BUCKET_BOUNDS):
+                    break
+                return min(_BUCKET_BOUNDS[bucket_index], self.max_seconds)
+        return self.max_seconds
+
+
+@dataclasses.dataclass
+class InterfaceMetrics:
+    latency: LatencyHistogram = dataclasses.field(
+        default_factory=LatencyHistogram)
+    # The number of reports that the HID interface accepted.
+    reports_written: int = 0
+    # The number of bytes that the HID interface accepted.
+    bytes_written: int = 0
+    # The number of reports that the HID interface rejected, because it would
+    # have blocked (i.e., `BlockingIOError`).
+    reports_rejected: int = 0
+    # The number of writes that failed with an error (including timeouts).
+    write_errors: int = 0
+    # The number of writes that failed because they didn't complete in time.
+    timeouts: int = 0
+
+
+# A mapping of HID interface paths to `InterfaceMetrics` objects.
+_metrics = {}
+
+
+def get(hid_path):
+    """Returns the metrics for a HID interface.
+
+    Args:
+        hid_path: The path to the HID interface file.
+
+    Returns:
+        An `InterfaceMetrics` object, which the caller must not modify.
+    """
+    return _metrics.get(hid_path) or InterfaceMetrics()
+
+
+def record_write(hid_path, report_size, latency_seconds, was_accepted):
+    """Records a completed write to a HID interface.
+
+    Args:
+        hid_path: The path to the HID interface file.
+        report_size: The size of the report in bytes.
+        latency_seconds: The duration of the write (float).
+        was_accepted: Whether the HID interface accepted the report (bool).
+    """
+    metrics = _get_or_create(hid_path)
+    metrics.latency.record(latency_seconds)
+    if was_accepted:
+        metrics.reports_written += 1
+        metrics.bytes_written += report_size
+    else:
+        metrics.reports_rejected += 1
+
+
+def record_error(hid_path, latency_seconds, is_timeout):
+    """Records a failed write to a HID interface.
+
+    Args:
+        hid_path: The path to the HID interface file.
+        latency_seconds: The time until the write failed (float).
+        is_timeout: Whether the write failed because it didn't complete in time
+            (bool).
+    """
+    metrics = _get_or_create(hid_path)
+    metrics.latency.record(latency_seconds)
+    metrics.write_errors += 1
+    if is_timeout:
+        metrics.timeouts += 1
+
+
+def _get_or_create(hid_path):
+    metrics = _metrics.get(hid_path)
+    if metrics is None:
+        metrics = InterfaceMetrics()
+        _metrics[hid_path] = metrics
+    return metrics
@@ -0,0 +1,75 @@
+import unittest
+from unittest import mock
+
+from hid import write_metrics
+
+
+class LatencyHistogramTest(unittest.TestCase):
+
+    def test_has_no_percentiles_without_samples(self):
+        histogram = write_metrics.LatencyHistogram()
+        self.assertIsNone(histogram.percentile(0.5))
+        self.assertEqual(0, histogram.count)
+
+    def test_estimates_percentiles_within_bucket_precision(self):
+        histogram = write_metrics.LatencyHistogram()
+        # Record 1ms, 2ms, ..., 100ms.
+        for i in range(1, 101):
+            histogram.record(i / 1000)
+        self.assertEqual(100, histogram.count)
+        self.assertAlmostEqual(0.100, histogram.max_seconds)
+        for fraction, expected_seconds in ((0.5, 0.050), (0.95, 0.095),
+                                           (0.99, 0.099)):
+            actual_seconds = histogram.percentile(fraction)
+            self.assertGreaterEqual(actual_seconds, expected_seconds)
+            self.assertLessEqual(actual_seconds, expected_seconds * 1.25)
+
+    def test_caps_percentiles_at_maximum(self):
+        histogram = write_metrics.LatencyHistogram()
+        histogram.record(0.0012)
+        self.assertEqual(0.0012, histogram.percentile(0.99))
+
+    def test_reports_maximum_for_latencies_beyond_last_bucket(self):
+        histogram = write_metrics.LatencyHistogram()
+        histogram.record(0.001)
+        histogram.record(60.0)
+        self.assertEqual(60.0, histogram.percentile(0.99))
+
+
+class WriteMetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(write_metrics, '_metrics', {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_returns_empty_metrics_for_unknown_interface(self):
+        metrics = write_metrics.get('/dev/hidg0')
+        self.assertEqual(0, metrics.reports_written)
+        self.assertEqual(0, metrics.latency.count)
+
+    def test_counts_accepted_and_rejected_reports(self):
+        write_metrics.record_write('/dev/hidg0', 8, 0.001, was_accepted=True)
+        write_metrics.record_write('/dev/hidg0', 8, 0.001, was_accepted=True)
+        write_metrics.record_write('/dev/hidg0', 8, 0.001, was_accepted=False)
+        write_metrics.record_write('/dev/hidg1', 7, 0.001, was_accepted=True)
+
+        keyboard_metrics = write_metrics.get('/dev/hidg0')
+        self.assertEqual(2, keyboard_metrics.reports_written)
+        self.assertEqual(16, keyboard_metrics.bytes_written)
+        self.assertEqual(1, keyboard_metrics.reports_rejected)
+        self.assertEqual(3, keyboard_metrics.latency.count)
+
+        mouse_metrics = write_metrics.get('/dev/hidg1')
+        self.assertEqual(1, mouse_metrics.reports_written)
+        self.assertEqual(7, mouse_metrics.bytes_written)
+
+    def test_counts_errors_and_timeouts(self):
+        write_metrics.record_error('/dev/hidg0', 0.5, is_timeout=True)
+        write_metrics.record_error('/dev/hidg0', 0.001, is_timeout=False)
+
+        metrics = write_metrics.get('/dev/hidg0')
+        self.assertEqual(2, metrics.write_errors)
+        self.assertEqual(1, metrics.timeouts)
+        self.assertEqual(0, metrics.reports_written)
+        self.assertEqual(0.5, metrics.latency.max_seconds)
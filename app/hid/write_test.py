@@ -0,0 +1,74 @@
+import tempfile
+import unittest
+from unittest import mock
+
+from hid import link_monitor
+from hid import write as hid_write
+from hid import write_metrics
+
+
+class WriteToHidInterfaceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.monitor = link_monitor.Monitor()
+        patcher = mock.patch.object(link_monitor, '_monitor', self.monitor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(write_metrics, '_metrics', {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_writes_report_to_hid_interface(self):
+        with tempfile.NamedTemporaryFile() as input_file:
+            hid_write.write_to_hid_interface(input_file.name, b'\x01\x02')
+            self.assertEqual(b'\x01\x02', input_file.read())
+
+    def test_overrides_write_mode(self):
+        # Restore the write mode after the test.
+        # pylint: disable=protected-access
+        patcher = mock.patch.object(hid_write, '_write', hid_write._write)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        hid_write.set_write_mode('nonblocking')
+
+        self.assertIs(hid_write.nonblocking_writer.write, hid_write._write)
+
+    def test_fails_immediately_while_link_is_disconnected(self):
+        self.monitor.update_link_state(link_monitor.LinkState.DISCONNECTED)
+        with mock.patch.object(hid_write, '_write') as mock_write:
+            with self.assertRaises(hid_write.InterfaceUnavailableError):
+                hid_write.write_to_hid_interface('/dev/hidg0', b'\x01')
+            mock_write.assert_not_called()
+
+    def test_fails_immediately_after_repeated_timeouts(self):
+        with mock.patch.object(hid_write, '_write') as mock_write:
+            mock_write.side_effect = TimeoutError()
+            for _ in range(3):
+                with self.assertRaises(hid_write.WriteError):
+                    hid_write.write_to_hid_interface('/dev/hidg1', b'\x01')
+
+            with self.assertRaises(hid_write.InterfaceUnavailableError):
+                hid_write.write_to_hid_interface('/dev/hidg1', b'\x01')
+            self.assertEqual(3, mock_write.call_count)
+
+    def test_fails_immediately_after_repeated_os_errors(self):
+        with mock.patch.object(hid_write, '_write') as mock_write:
+            mock_write.side_effect = OSError(108, 'Cannot send after shutdown')
+            for _ in range(3):
+                with self.assertRaises(hid_write.WriteError):
+                    hid_write.write_to_hid_interface('/dev/hidg1', b'\x01')
+
+            with self.assertRaises(hid_write.InterfaceUnavailableError):
+                hid_write.write_to_hid_interface('/dev/hidg1', b'\x01')
+            self.assertEqual(3, mock_write.call_count)
+
+    def test_records_os_error_as_write_error(self):
+        with mock.patch.object(hid_write, '_write') as mock_write:
+            mock_write.side_effect = OSError(108, 'Cannot send after shutdown')
+            with self.assertRaises(hid_write.WriteError):
+                hid_write.write_to_hid_interface('/dev/hidg0', b'\x01')
+
+        metrics = write_metrics.get('/dev/hidg0')
+        self.assertEqual(1, metrics.write_errors)
+        self.assertEqual(0, metrics.timeouts)
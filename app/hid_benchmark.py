@@ -0,0 +1,393 @@
+"""Measures the throughput and latency of the HID input path.
+
+The benchmark drives the same code paths as real clients (the Socket.IO
+handlers, `js_to_hid`, `hid.keyboard`, `hid.mouse`, the mouse pipeline, and the
+paste engine) against a fake USB gadget (see `fake_gadget`). It runs each
+scenario against a fast host, a slow host, and a stalled host, and reports the
+throughput in reports per second and the distribution of the latency from
+submitting an event until the host has read its last report. (The fake gadget
+buffers more reports than a real one, so the slow host isn't as slow as it
+seems, see `_HOSTS`.)
+
+The results can be stored as JSON, so that they can be compared between
+releases.
+
+To run the benchmark:
+
+    cd app && python -m hid_benchmark --output results.json
+
+To compare the results with those of a previous run:
+
+    cd app && python -m hid_benchmark --baseline previous-results.json
+"""
+import argparse
+import dataclasses
+import json
+import os
+import tempfile
+import time
+
+import flask
+
+# We’re importing the log package first because it needs to overwrite the
+# app-wide logger class before any other module loads it.
+# pylint: disable-next=unused-import
+import log  # noqa: F401
+import db_connection
+import env
+import fake_gadget
+import latency_stats
+import paste_engine
+import socket_api
+import text_to_hid
+import utc
+from hid import keyboard as fake_keyboard
+from hid import keycodes as hid
+from hid import write as hid_write
+
+# The format version of the JSON results, which changes whenever the structure
+# of the results changes in an incompatible way.
+_RESULTS_FORMAT_VERSION = 1
+
+
+@dataclasses.dataclass(frozen=True)
+class _Host:
+    # The time that the host waits between reading two reports.
+    delay_seconds: float
+    is_stalled: bool
+    # The maximum number of events per scenario. Against a stalled host, every
+    # write runs into its deadline, so we keep the number of events small.
+    max_events: int
+
+
+_HOSTS = {
+    'fast': _Host(delay_seconds=0.0, is_stalled=False, max_events=1000000),
+    # Like a host that polls the interfaces at 125 Hz. The fake gadget buffers
+    # over 500 reports per interface before writes block (see `fake_gadget`),
+    # so scenarios with fewer pending reports mostly measure that buffer
+    # rather than the host's pace. Latencies until the host has read a report
+    # are still accurate, but acknowledgement latencies (as in the
+    # `socket-mouse-burst` scenario) and throughput are optimistic.
+    'slow': _Host(delay_seconds=0.008, is_stalled=False, max_events=1000000),
+    'stalled': _Host(delay_seconds=0.0, is_stalled=True, max_events=3),
+}
+
+# The maximum time to wait for the host to read the reports of an event.
+_DELIVERY_TIMEOUT_SECONDS = 5.0
+
+# The number of mouse events per `hid-batch` message in the mouse scenario.
+_MOUSE_BURST_SIZE = 16
+
+_KEYSTROKE_MESSAGE = {
+    'metaLeft': False,
+    'metaRight': False,
+    'altLeft': False,
+    'altRight': False,
+    'shiftLeft': False,
+    'shiftRight': False,
+    'ctrlLeft': False,
+    'ctrlRight': False,
+    'key': 'a',
+    'code': 'KeyA',
+}
+
+# A keystroke results in a report that presses the key and one that releases
+# it.
+_KEYSTROKE_REPORTS = 2
+
+_PASTE_TEXT = 'The quick brown fox jumps over the lazy dog.\n'
+
+
+@dataclasses.dataclass
+class _Measurement:
+    events: int = 0
+    failed_events: int = 0
+    reports: int = 0
+    duration_seconds: float = 0.0
+    latencies_seconds: list = dataclasses.field(default_factory=list)
+
+    @property
+    def reports_per_second(self):
+        if not self.duration_seconds:
+            return 0.0
+        return self.reports / self.duration_seconds
+
+    def to_dict(self):
+        return {
+            'events': self.events,
+            'failedEvents': self.failed_events,
+            'reports': self.reports,
+            'durationSeconds': self.duration_seconds,
+            'reportsPerSecond': self.reports_per_second,
+            'latencyMs': latency_stats.summarize(self.latencies_seconds),
+        }
+
+
+def _wait_for_delivery(interface, report_count):
+    """Waits until the host has read reports, and returns when the last did."""
+    try:
+        interface.wait_for_reports(report_count, _DELIVERY_TIMEOUT_SECONDS)
+    except fake_gadget.ReportTimeoutError:
+        return None
+    return interface.arrivals[report_count - 1].timestamp
+
+
+def _run_events(interface, event_count, reports_per_event, send_event):
+    """Sends events one after the other, and measures each event's latency.
+
+    Args:
+        interface: The `fake_gadget.FakeInterface` that receives the reports.
+        event_count: The number of events to send.
+        reports_per_event: The number of reports that each event results in.
+        send_event: A function that sends a single event. It returns whether
+            the event was applied successfully.
+
+    Returns:
+        A `_Measurement` object.
+    """
+    measurement = _Measurement(events=event_count)
+    initial_report_count = interface.report_count
+    start_time = time.monotonic()
+    for _ in range(event_count):
+        expected_report_count = interface.report_count + reports_per_event
+        event_start_time = time.monotonic()
+        is_success = send_event()
+        # Without the host having read the reports, we can't tell when the
+        # event took effect.
+        arrival_time = None
+        if is_success:
+            arrival_time = _wait_for_delivery(interface, expected_report_count)
+        if arrival_time is None:
+            measurement.failed_events += 1
+        else:
+            measurement.latencies_seconds.append(arrival_time -
+                                                 event_start_time)
+    measurement.duration_seconds = time.monotonic() - start_time
+    measurement.reports = interface.report_count - initial_report_count
+    return measurement
+
+
+def _send_keystroke_directly(gadget, _, event_count):
+    keystroke = hid.Keystroke(keycode=hid.KEYCODE_A)
+
+    def send_event():
+        try:
+            fake_keyboard.send_keystroke(gadget.keyboard.path, keystroke)
+        except hid_write.WriteError:
+            return False
+        return True
+
+    return _run_events(gadget.keyboard, event_count, _KEYSTROKE_REPORTS,
+                       send_event)
+
+
+def _send_keystroke_via_socket(gadget, client, event_count):
+
+    def send_event():
+        return client.emit('keystroke', _KEYSTROKE_MESSAGE,
+                           callback=True)['success']
+
+    return _run_events(gadget.keyboard, event_count, _KEYSTROKE_REPORTS,
+                       send_event)
+
+
+def _send_mouse_bursts_via_socket(gadget, client, event_count):
+    """Sends bursts of mouse movements, which the mouse pipeline coalesces.
+
+    The latency is per burst, until the server has acknowledged it, which it
+    does once the mouse pipeline has written the burst.
+    """
+    measurement = _Measurement(events=event_count)
+    initial_report_count = gadget.mouse.report_count
+    start_time = time.monotonic()
+    for burst_start in range(0, event_count, _MOUSE_BURST_SIZE):
+        burst_size = min(_MOUSE_BURST_SIZE, event_count - burst_start)
+        burst = [{
+            'type': 'mouseEvent',
+            'buttons': 0,
+            'relativeX': (burst_start + i) % 100 / 100,
+            'relativeY': 0.5,
+            'verticalWheelDelta': 0,
+            'horizontalWheelDelta': 0,
+        } for i in range(burst_size)]
+        burst_start_time = time.monotonic()
+        response = client.emit('hid-batch', burst, callback=True)
+        if response['success']:
+            measurement.latencies_seconds.append(time.monotonic() -
+                                                 burst_start_time)
+        measurement.failed_events += len(response['failed'])
+    measurement.duration_seconds = time.monotonic() - start_time
+    measurement.reports = gadget.mouse.report_count - initial_report_count
+    return measurement
+
+
+def _paste_text(gadget, _, event_count):
+    """Pastes text without pacing, and measures the time between reports.
+
+    Each character counts as an event.
+    """
+    text = (_PASTE_TEXT * (event_count // len(_PASTE_TEXT) + 1))[:event_count]
+    report_stream = fake_keyboard.compile_keystrokes(
+        text_to_hid.convert_text(text, 'en-US'))
+    initial_report_count = gadget.keyboard.report_count
+    start_time = time.monotonic()
+    job = paste_engine.submit(gadget.keyboard.path,
+                              report_stream,
+                              reports_per_second=None,
+                              on_progress=lambda _: None)
+    # Other greenlets (i.e., the paste job) only run while we yield.
+    while not job.wait(_DELIVERY_TIMEOUT_SECONDS):
+        pass
+    measurement = _Measurement(events=event_count)
+    if job.status != paste_engine.Status.DONE:
+        measurement.failed_events = event_count
+    measurement.reports = job.reports_written
+    arrival_time = None
+    if job.reports_written:
+        arrival_time = _wait_for_delivery(
+            gadget.keyboard, initial_report_count + job.reports_written)
+    if arrival_time is not None:
+        arrivals = gadget.keyboard.arrivals[initial_report_count:]
+        previous_timestamp = start_time
+        for arrival in arrivals:
+            measurement.latencies_seconds.append(arrival.timestamp -
+                                                 previous_timestamp)
+            previous_timestamp = arrival.timestamp
+        measurement.duration_seconds = arrival_time - start_time
+    else:
+        measurement.duration_seconds = time.monotonic() - start_time
+    return measurement
+
+
+_SCENARIOS = {
+    'keystroke': _send_keystroke_directly,
+    'socket-keystroke': _send_keystroke_via_socket,
+    'socket-mouse-burst': _send_mouse_bursts_via_socket,
+    'paste': _paste_text,
+}
+
+
+def _run_host(host_name, host, event_count):
+    """Runs all scenarios against a fresh fake gadget.
+
+    Returns:
+        A list of result dictionaries, one per scenario.
+    """
+    results = []
+    # A fresh gadget has fresh interface paths, so the writers and the circuit
+    # breakers don't carry over any state from the previous host.
+    with fake_gadget.FakeGadget(host.delay_seconds) as gadget:
+        socket_api.set_hid_paths(gadget.keyboard.path, gadget.mouse.path)
+        if host.is_stalled:
+            gadget.stall()
+        app = flask.Flask(__name__)
+        socket_api.socketio.init_app(app)
+        client = socket_api.socketio.test_client(app)
+        try:
+            for scenario_name, scenario in _SCENARIOS.items():
+                measurement = scenario(gadget, client,
+                                       min(event_count, host.max_events))
+                result = {'scenario': scenario_name, 'host': host_name}
+                result.update(measurement.to_dict())
+                _print_result(result)
+                results.append(result)
+        finally:
+            client.disconnect()
+            if host.is_stalled:
+                gadget.resume()
+    return results
+
+
+def _print_result(result):
+    latency = result['latencyMs'] or {}
+    print(f'{result["scenario"]:<20}{result["host"]:<9}'
+          f'{result["reportsPerSecond"]:10.1f} reports/s'
+          f'{latency.get("p50", float("nan")):9.2f} ms p50'
+          f'{latency.get("p99", float("nan")):9.2f} ms p99'
+          f'{result["failedEvents"]:6d} failed')
+
+
+def _print_comparison(results, baseline):
+    baseline_results = {
+        (result['scenario'], result['host']): result
+        for result in baseline['results']
+    }
+    print('Compared to baseline:')
+    for result in results:
+        baseline_result = baseline_results.get(
+            (result['scenario'], result['host']))
+        if baseline_result is None:
+            continue
+        throughput_change = _relative_change(
+            result['reportsPerSecond'], baseline_result['reportsPerSecond'])
+        latency_change = _relative_change(_p99(result), _p99(baseline_result))
+        print(f'{result["scenario"]:<20}{result["host"]:<9}'
+              f'{throughput_change} reports/s{latency_change} p99')
+
+
+def _p99(result):
+    return result['latencyMs']['p99'] if result['latencyMs'] else None
+
+
+def _relative_change(value, baseline_value):
+    if not value or not baseline_value:
+        return f'{"n/a":>9}'
+    return f'{(value / baseline_value - 1) * 100:+8.1f}%'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events',
+                        type=int,
+                        default=200,
+                        help='Number of events per scenario')
+    parser.add_argument('--hosts',
+                        nargs='+',
+                        choices=_HOSTS.keys(),
+                        default=list(_HOSTS.keys()),
+                        help='Fake hosts to run the scenarios against')
+    parser.add_argument('--write-mode',
+                        choices=('process', 'nonblocking'),
+                        default=env.HID_WRITE_MODE,
+                        help='HID write mode (see HID_WRITE_MODE)')
+    parser.add_argument('--label',
+                        default='',
+                        help='Label to store with the results (e.g., the'
+                        ' release version)')
+    parser.add_argument('--output', help='File path to store the results at')
+    parser.add_argument('--baseline',
+                        help='File path to previous results to compare with')
+    args = parser.parse_args()
+
+    hid_write.set_write_mode(args.write_mode)
+    results = []
+    # Without any user accounts in the database, the Socket.IO clients don't
+    # have to authenticate.
+    with tempfile.TemporaryDirectory() as db_dir:
+        db_connection.open_at(os.path.join(db_dir, 'tinypilot.db'))
+        try:
+            for host_name in args.hosts:
+                results += _run_host(host_name, _HOSTS[host_name], args.events)
+        finally:
+            db_connection.close()
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            _print_comparison(results, json.load(baseline_file))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(
+                {
+                    'formatVersion': _RESULTS_FORMAT_VERSION,
+                    'label': args.label,
+                    'createdAt': utc.now().isoformat(),
+                    'writeMode': args.write_mode,
+                    'events': args.events,
+                    'results': results,
+                },
+                output_file,
+                indent=2)
+
+
+if __name__ == '__main__':
+    main()
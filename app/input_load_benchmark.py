@@ -0,0 +1,638 @@
+"""Measures where the server saturates under input from many clients.
+
+The load generator launches the server (`main.py`) with fresh data and with the
+HID interfaces pointed at a fake USB gadget (see `fake_gadget`). It then
+opens several authenticated Socket.IO connections, each of which sends a mix of
+`keystroke`, `mouse-event`, and `keyRelease` events at a target rate. It
+reports the acknowledgement latency and the error rate per client, as well as
+the CPU and memory usage of the server process (not including the HID writer
+process in the `process` write mode).
+
+With `--logins`, further clients log in over and over while the input clients
+send their events, which shows how much logins (i.e., password hashing) delay
+the input events of other users.
+
+To run the load generator:
+
+    cd app && python -m input_load_benchmark --clients 4 --rate 60
+
+The results can be stored as JSON via `--output`, so that they can be compared
+between hardware revisions.
+"""
+import argparse
+import contextlib
+import dataclasses
+import json
+import os
+import random
+import re
+import secrets
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import simple_websocket
+
+import fake_gadget
+import latency_stats
+
+_MAIN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+
+# The maximum time to wait for the server to accept connections.
+_SERVER_START_TIMEOUT_SECONDS = 30.0
+
+# The maximum time to wait for outstanding acknowledgements after the last
+# event has been sent. Events that aren't acknowledged by then count as lost.
+_ACK_TIMEOUT_SECONDS = 5.0
+
+# The server only accepts requests that a reverse proxy has forwarded (see
+# `main.check_proxy_https_redirect`), so we pretend to be the proxy.
+_PROXY_HEADERS = {'X-Forwarded-Proto': 'https'}
+
+_KEYSTROKE_MESSAGE = {
+    'metaLeft': False,
+    'metaRight': False,
+    'altLeft': False,
+    'altRight': False,
+    'shiftLeft': False,
+    'shiftRight': False,
+    'ctrlLeft': False,
+    'ctrlRight': False,
+    'key': 'a',
+    'code': 'KeyA',
+}
+
+_EVENT_TYPES = ('keystroke', 'mouse-event', 'keyRelease')
+
+_DEFAULT_MIX = {'keystroke': 4, 'mouse-event': 10, 'keyRelease': 1}
+
+
+class Error(Exception):
+    pass
+
+
+class ServerStartError(Error):
+    pass
+
+
+class LoginError(Error):
+    pass
+
+
+@dataclasses.dataclass
+class _Server:
+    base_url: str
+    process: subprocess.Popen
+
+
+@dataclasses.dataclass(frozen=True)
+class _ProcessUsage:
+    # The `time.monotonic` timestamp at which the usage was read.
+    timestamp: float
+    cpu_seconds: float
+    rss_bytes: int
+    peak_rss_bytes: int
+
+
+@dataclasses.dataclass
+class _ClientStats:
+    sent: int = 0
+    acked: int = 0
+    # Events that the server acknowledged as unsuccessful.
+    failed: int = 0
+    # Events that the server never acknowledged.
+    lost: int = 0
+    duration_seconds: float = 0.0
+    latencies_seconds: list = dataclasses.field(default_factory=list)
+    error: str = None
+
+    @property
+    def error_rate(self):
+        if not self.sent:
+            return 0.0
+        return (self.failed + self.lost) / self.sent
+
+    @property
+    def send_rate(self):
+        if not self.duration_seconds:
+            return 0.0
+        return self.sent / self.duration_seconds
+
+    def to_dict(self):
+        return {
+            'sent': self.sent,
+            'acked': self.acked,
+            'failed': self.failed,
+            'lost': self.lost,
+            'errorRate': self.error_rate,
+            'sendRate': self.send_rate,
+            'latencyMs': latency_stats.summarize(self.latencies_seconds),
+            'error': self.error,
+        }
+
+
+@dataclasses.dataclass
+class _LoginStats:
+    attempts: int = 0
+    # Login attempts that the server turned away because it was busy.
+    rejected: int = 0
+    # Login attempts that failed for any other reason.
+    failed: int = 0
+    latencies_seconds: list = dataclasses.field(default_factory=list)
+
+    def to_dict(self):
+        return {
+            'attempts': self.attempts,
+            'rejected': self.rejected,
+            'failed': self.failed,
+            'latencyMs': latency_stats.summarize(self.latencies_seconds),
+        }
+
+
+def _find_free_port():
+    with socket.socket() as server_socket:
+        server_socket.bind(('127.0.0.1', 0))
+        return server_socket.getsockname()[1]
+
+
+@contextlib.contextmanager
+def _launch_server(home_dir, gadget, write_mode):
+    """Runs the server in a subprocess, until the context exits.
+
+    The server reads the paths of the HID interfaces from the `.env` file in
+    its working directory, so we run it in the (temporary) home directory.
+    """
+    with open(os.path.join(home_dir, '.env'), 'w',
+              encoding='utf-8') as env_file:
+        env_file.write(f'KEYBOARD_PATH={gadget.keyboard.path}\n'
+                       f'MOUSE_PATH={gadget.mouse.path}\n'
+                       f'HID_WRITE_MODE={write_mode}\n')
+    port = _find_free_port()
+    log_path = os.path.join(home_dir, 'server.log')
+    with open(log_path, 'w', encoding='utf-8') as log_file:
+        process = subprocess.Popen(  # noqa: S603 # pylint: disable=consider-using-with
+            [sys.executable, _MAIN_PATH],
+            cwd=home_dir,
+            env=dict(os.environ,
+                     HOST='127.0.0.1',
+                     PORT=str(port),
+                     TINYPILOT_HOME_DIR=home_dir),
+            stdout=log_file,
+            stderr=subprocess.STDOUT)
+    try:
+        _wait_for_port(process, port, log_path)
+        yield _Server(base_url=f'http://127.0.0.1:{port}', process=process)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def _wait_for_port(process, port, log_path):
+    deadline = time.monotonic() + _SERVER_START_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    with open(log_path, encoding='utf-8') as log_file:
+        raise ServerStartError(
+            f'Server did not start, see its output:\n{log_file.read()}')
+
+
+def _log_in(base_url, username, password):
+    """Creates the first user on the fresh server and logs in as that user.
+
+    Once a user exists, the server requires authentication, so the clients go
+    through the same auth checks as in production.
+
+    Returns:
+        The value for the `Cookie` header of subsequent requests (as string).
+    """
+    headers = _fetch_request_headers(base_url)
+    try:
+        with _post_json(f'{base_url}/api/user', {
+                'username': username,
+                'password': password,
+                'role': 'ADMIN',
+        }, headers):
+            pass
+    except urllib.error.HTTPError as e:
+        # Registering a user restarts the video service, which fails on
+        # development systems without mock scripts (see
+        # `dev-scripts/enable-mock-scripts`), even though the user has been
+        # created. Logging in tells whether it has.
+        if e.code != 500:
+            raise LoginError(f'Failed to create user: {e}') from e
+    try:
+        with _post_json(f'{base_url}/api/auth', {
+                'username': username,
+                'password': password,
+        }, headers) as response:
+            cookie = _session_cookie(response)
+    except urllib.error.HTTPError as e:
+        raise LoginError(f'Failed to log in: {e}') from e
+    if not cookie:
+        raise LoginError('Failed to log in')
+    return cookie
+
+
+def _fetch_request_headers(base_url):
+    """Starts a new session with the server.
+
+    Returns:
+        A dictionary of the headers for JSON requests within the session,
+        including the session cookie and the CSRF token.
+    """
+    # The session cookie is marked as secure, so a cookie jar wouldn't send it
+    # over plain HTTP. That's why we pass it on by hand.
+    with _open_url(f'{base_url}/', headers=_PROXY_HEADERS) as response:
+        match = re.search(r'<meta name="csrf-token" content="([^"]+)"',
+                          response.read().decode('utf-8'))
+        cookie = _session_cookie(response)
+    if not match or not cookie:
+        raise LoginError('Failed to retrieve CSRF token')
+    return dict(
+        _PROXY_HEADERS, **{
+            'Content-Type': 'application/json',
+            'Cookie': cookie,
+            'X-CSRFToken': match.group(1),
+        })
+
+
+def _post_json(url, data, headers):
+    return _open_url(url, headers, data=json.dumps(data).encode('utf-8'))
+
+
+def _open_url(url, headers, data=None):
+    # The URL always points to the server that we've launched ourselves.
+    request = urllib.request.Request(  # noqa: S310
+        url, data=data, headers=headers)
+    return urllib.request.urlopen(request)  # noqa: S310
+
+
+def _session_cookie(response):
+    for header in response.headers.get_all('Set-Cookie') or []:
+        if header.startswith('session='):
+            return header.split(';', 1)[0]
+    return None
+
+
+def _read_process_usage(pid):
+    with open(f'/proc/{pid}/stat', encoding='utf-8') as stat_file:
+        # The process name might contain spaces, so only split after it.
+        fields = stat_file.read().rsplit(')', 1)[1].split()
+    # utime and stime are the 14th and 15th fields of the whole line.
+    cpu_ticks = int(fields[11]) + int(fields[12])
+    memory_kb = {}
+    with open(f'/proc/{pid}/status', encoding='utf-8') as status_file:
+        for line in status_file:
+            key, _, value = line.partition(':')
+            if key in ('VmRSS', 'VmHWM'):
+                memory_kb[key] = int(value.split()[0])
+    return _ProcessUsage(timestamp=time.monotonic(),
+                         cpu_seconds=cpu_ticks / os.sysconf('SC_CLK_TCK'),
+                         rss_bytes=memory_kb['VmRSS'] * 1024,
+                         peak_rss_bytes=memory_kb['VmHWM'] * 1024)
+
+
+def _server_usage_to_dict(usage_before, usage_after):
+    wall_seconds = usage_after.timestamp - usage_before.timestamp
+    cpu_seconds = usage_after.cpu_seconds - usage_before.cpu_seconds
+    return {
+        'cpuPercent': cpu_seconds / wall_seconds * 100,
+        'rssMb': usage_after.rss_bytes / 1024 / 1024,
+        'peakRssMb': usage_after.peak_rss_bytes / 1024 / 1024,
+    }
+
+
+class _InputClient:  # pylint: disable=too-many-instance-attributes
+    """A Socket.IO client that sends input events at a fixed rate.
+
+    It speaks the Socket.IO protocol directly over a WebSocket, so that we
+    don't need a Socket.IO client library:
+    - `0{...}`: Engine.IO handshake from the server.
+    - `40`: Connect to the default namespace (the server replies with `40` or,
+      if it rejects the connection, with `44`).
+    - `2`/`3`: Engine.IO ping from the server and pong from the client.
+    - `42<id>[<event>, <data>]`: An event that requests an acknowledgement.
+    - `43<id>[<response>]`: The acknowledgement of an event.
+    """
+
+    def __init__(self, url, cookie, mix, rate, seed):
+        """Creates a new client, which doesn't connect yet.
+
+        Args:
+            url: The base URL of the server.
+            cookie: The value of the `Cookie` header for authentication.
+            mix: A dictionary of event types to their relative weights.
+            rate: The number of events to send per second.
+            seed: The seed for choosing events from the mix.
+        """
+        self._url = url.replace('http://', 'ws://',
+                                1) + ('/socket.io/?EIO=4&transport=websocket')
+        self._cookie = cookie
+        self._event_types = list(mix.keys())
+        self._event_weights = list(mix.values())
+        self._interval_seconds = 1 / rate
+        # The events only need to be reproducible, not unpredictable.
+        self._random = random.Random(seed)  # noqa: S311
+        self._lock = threading.Lock()
+        # A mapping of ack IDs to the time at which the event was sent.
+        self._pending = {}
+        self._all_acked = threading.Event()
+        self._websocket = None
+        self.stats = _ClientStats()
+
+    def run(self, duration_seconds):
+        try:
+            self._connect()
+        except (Error, simple_websocket.ConnectionError,
+                simple_websocket.ConnectionClosed) as e:
+            self.stats.error = str(e) or type(e).__name__
+            # The WebSocket's thread would keep the process from exiting.
+            if self._websocket:
+                self._websocket.close()
+            return
+        receiver = threading.Thread(target=self._receive_acks, daemon=True)
+        receiver.start()
+        try:
+            self._send_events(duration_seconds)
+        except simple_websocket.ConnectionClosed:
+            self.stats.error = 'Server closed the connection'
+        self._all_acked.wait(timeout=_ACK_TIMEOUT_SECONDS)
+        self._websocket.close()
+        receiver.join()
+        with self._lock:
+            self.stats.lost = len(self._pending)
+
+    def _connect(self):
+        self._websocket = simple_websocket.Client.connect(
+            self._url, headers={'Cookie': self._cookie})
+        # If the Engine.IO handshake (`0{...}`) arrives together with the
+        # response to the WebSocket upgrade, the client only delivers it once
+        # further data arrives. So we don't wait for the handshake before
+        # connecting to the namespace, but skip it among the replies.
+        self._websocket.send('40')
+        while True:
+            message = self._websocket.receive(timeout=_ACK_TIMEOUT_SECONDS)
+            if message is None:
+                raise Error('Timed out connecting to namespace')
+            if message.startswith('40'):
+                return
+            if message.startswith('44'):
+                raise Error(f'Server rejected connection: {message[2:]}')
+
+    def _send_events(self, duration_seconds):
+        start_time = time.monotonic()
+        next_send_time = start_time
+        ack_id = 0
+        while next_send_time < start_time + duration_seconds:
+            time.sleep(max(0.0, next_send_time - time.monotonic()))
+            ack_id += 1
+            event_type = self._random.choices(self._event_types,
+                                              self._event_weights)[0]
+            event = [event_type]
+            if event_type == 'keystroke':
+                event.append(_KEYSTROKE_MESSAGE)
+            elif event_type == 'mouse-event':
+                event.append({
+                    'buttons': 0,
+                    'relativeX': ack_id % 100 / 100,
+                    'relativeY': 0.5,
+                    'verticalWheelDelta': 0,
+                    'horizontalWheelDelta': 0,
+                })
+            with self._lock:
+                self._pending[ack_id] = time.monotonic()
+                self._all_acked.clear()
+            self._websocket.send(f'42{ack_id}{json.dumps(event)}')
+            self.stats.sent += 1
+            # Keep to the schedule even if the server is slow to acknowledge,
+            # so that slow responses don't reduce the load.
+            next_send_time += self._interval_seconds
+        self.stats.duration_seconds = time.monotonic() - start_time
+
+    def _receive_acks(self):
+        while True:
+            try:
+                message = self._websocket.receive()
+            except simple_websocket.ConnectionClosed:
+                return
+            if message == '2':
+                self._websocket.send('3')
+            elif message.startswith('43'):
+                self._handle_ack(message[2:])
+
+    def _handle_ack(self, packet):
+        match = re.match(r'(\d+)(.*)', packet, re.DOTALL)
+        ack_id = int(match.group(1))
+        response = json.loads(match.group(2))
+        ack_time = time.monotonic()
+        with self._lock:
+            send_time = self._pending.pop(ack_id, None)
+            if not self._pending:
+                self._all_acked.set()
+        if send_time is None:
+            return
+        self.stats.acked += 1
+        self.stats.latencies_seconds.append(ack_time - send_time)
+        if not response or not response[0] or not response[0].get('success'):
+            self.stats.failed += 1
+
+
+class _LoginClient:
+    """A client that logs in over and over, as fast as the server lets it."""
+
+    def __init__(self, url, username, password):
+        self._url = url
+        self._username = username
+        self._password = password
+        self.stats = _LoginStats()
+
+    def run(self, duration_seconds):
+        headers = _fetch_request_headers(self._url)
+        end_time = time.monotonic() + duration_seconds
+        while time.monotonic() < end_time:
+            start_time = time.monotonic()
+            try:
+                with _post_json(f'{self._url}/api/auth', {
+                        'username': self._username,
+                        'password': self._password,
+                }, headers):
+                    pass
+            except urllib.error.HTTPError as e:
+                if e.code == 429:
+                    self.stats.rejected += 1
+                else:
+                    self.stats.failed += 1
+            else:
+                self.stats.latencies_seconds.append(time.monotonic() -
+                                                    start_time)
+            self.stats.attempts += 1
+
+
+def _parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        event_type, _, weight = item.partition('=')
+        if event_type not in _EVENT_TYPES:
+            raise argparse.ArgumentTypeError(
+                f'Event type must be one of: {", ".join(_EVENT_TYPES)}')
+        try:
+            mix[event_type] = float(weight)
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(
+                f'Invalid weight for {event_type}: {weight}') from e
+    if not any(weight > 0 for weight in mix.values()):
+        raise argparse.ArgumentTypeError('At least one weight must be positive')
+    return mix
+
+
+def _print_results(results):
+    for client in results['clients']:
+        _print_row(f'client {client["client"]}', client)
+    _print_row('total', results['total'])
+    if results['logins']:
+        logins = results['logins']
+        latency = logins['latencyMs'] or {}
+        print(f'Logins: {logins["attempts"]} attempts,'
+              f' {latency.get("p50", float("nan")):.2f} ms p50,'
+              f' {logins["rejected"]} rejected, {logins["failed"]} failed')
+    server = results['server']
+    print(f'Server: {server["cpuPercent"]:.1f}% CPU,'
+          f' {server["rssMb"]:.1f} MB RSS ({server["peakRssMb"]:.1f} MB peak)')
+
+
+def _print_row(label, stats):
+    latency = stats['latencyMs'] or {}
+    print(f'{label:<12}{stats["sendRate"]:8.1f} events/s'
+          f'{latency.get("p50", float("nan")):9.2f} ms p50'
+          f'{latency.get("p99", float("nan")):9.2f} ms p99'
+          f'{stats["errorRate"] * 100:8.2f}% errors'
+          f'{" " + stats["error"] if stats["error"] else ""}')
+
+
+def main():
+    """Runs the load test as configured by the command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients',
+                        type=int,
+                        default=4,
+                        help='Number of concurrent clients')
+    parser.add_argument('--rate',
+                        type=float,
+                        default=60,
+                        help='Events per second that each client sends')
+    parser.add_argument('--duration',
+                        type=float,
+                        default=10,
+                        help='Time in seconds for which each client sends')
+    parser.add_argument('--mix',
+                        type=_parse_mix,
+                        default=_DEFAULT_MIX,
+                        help='Relative weights of the event types, e.g.'
+                        ' "keystroke=4,mouse-event=10,keyRelease=1"')
+    parser.add_argument('--logins',
+                        type=int,
+                        default=0,
+                        help='Number of concurrent clients that keep logging'
+                        ' in while the input clients send events')
+    parser.add_argument('--host-delay-ms',
+                        type=float,
+                        default=0,
+                        help='Time that the fake USB host takes per report')
+    parser.add_argument('--write-mode',
+                        choices=('process', 'nonblocking'),
+                        default='process',
+                        help='HID write mode of the server')
+    parser.add_argument('--label',
+                        default='',
+                        help='Label to store with the results (e.g., the'
+                        ' hardware revision)')
+    parser.add_argument('--output', help='File path to store the results at')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='input-load-') as home_dir, \
+            fake_gadget.FakeGadget(args.host_delay_ms / 1000) as gadget, \
+            _launch_server(home_dir, gadget, args.write_mode) as server:
+        username, password = 'load-test', secrets.token_urlsafe(16)
+        cookie = _log_in(server.base_url, username, password)
+        clients = [
+            _InputClient(server.base_url, cookie, args.mix, args.rate, seed)
+            for seed in range(args.clients)
+        ]
+        login_clients = [
+            _LoginClient(server.base_url, username, password)
+            for _ in range(args.logins)
+        ]
+        threads = [
+            threading.Thread(target=client.run, args=(args.duration,))
+            for client in clients + login_clients
+        ]
+        usage_before = _read_process_usage(server.process.pid)
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        usage_after = _read_process_usage(server.process.pid)
+        host_reports = {
+            'keyboard': gadget.keyboard.report_count,
+            'mouse': gadget.mouse.report_count,
+        }
+
+    total = _ClientStats(duration_seconds=args.duration)
+    for client in clients:
+        total.sent += client.stats.sent
+        total.acked += client.stats.acked
+        total.failed += client.stats.failed
+        total.lost += client.stats.lost
+        total.latencies_seconds += client.stats.latencies_seconds
+    logins = None
+    if login_clients:
+        logins = _LoginStats()
+        for client in login_clients:
+            logins.attempts += client.stats.attempts
+            logins.rejected += client.stats.rejected
+            logins.failed += client.stats.failed
+            logins.latencies_seconds += client.stats.latencies_seconds
+        logins = logins.to_dict()
+    results = {
+        'label': args.label,
+        'clients': [{
+            'client': index,
+            **client.stats.to_dict()
+        } for index, client in enumerate(clients)],
+        'total': total.to_dict(),
+        'logins': logins,
+        'server': _server_usage_to_dict(usage_before, usage_after),
+        'hostReports': host_reports,
+    }
+    _print_results(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(dict(results,
+                           clientCount=args.clients,
+                           ratePerClient=args.rate,
+                           loginClientCount=args.logins,
+                           durationSeconds=args.duration,
+                           mix=args.mix,
+                           hostDelayMs=args.host_delay_ms,
+                           writeMode=args.write_mode),
+                      output_file,
+                      indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Tracks the outcome of unacknowledged input events of a client connection.
+
+By default, clients request an acknowledgement for every input event, which
+costs a packet back to the client per event. On high-latency links, that return
+traffic competes with the video stream. So clients can opt into sending input
+events without acknowledgement. In that mode, they attach monotonically
+increasing sequence numbers to the events instead, and the server periodically
+sends a cumulative status:
+
+- The highest sequence number up to which all events have been handled. The
+  server handles events concurrently, so an event might finish before an
+  earlier one.
+- The sequence numbers of the events that failed since the previous status.
+  Sequence numbers that the server never received count as failed, too.
+
+The server only sends a status if something has changed, and at most once per
+interval.
+"""
+import logging
+
+import eventlet
+
+logger = logging.getLogger(__name__)
+
+# If a client skips more sequence numbers than that, we don't report each of
+# them as failed, so that a misbehaving client can't inflate the status.
+_MAX_SEQUENCE_GAP = 256
+
+
+class Error(Exception):
+    pass
+
+
+class InvalidSequenceNumberError(Error):
+    pass
+
+
+class SequenceTracker:
+    """Keeps track of the sequence numbers of a single client connection."""
+
+    def __init__(self, send_status, interval_seconds):
+        """Creates a new tracker, which hasn't received any events yet.
+
+        Args:
+            send_status: A function that sends a status to the client. It takes
+                a dictionary with the fields `appliedSeq` (int) and
+                `failedSeqs` (list of ints) as its only argument.
+            interval_seconds: The minimum time between two statuses (as int or
+                float).
+        """
+        self._send_status = send_status
+        self._interval_seconds = interval_seconds
+        self._last_received = None
+        # The sequence numbers of the events that are still being handled.
+        self._in_flight = set()
+        self._failed = []
+        self._last_sent_applied = None
+        self._flush_timer = None
+
+    def receive(self, seq):
+        """Registers the start of handling an event.
+
+        Args:
+            seq: The sequence number of the event.
+
+        Raises:
+            InvalidSequenceNumberError: If the sequence number is not an integer
+                greater than the one of the previous event. The caller must not
+                handle the event in that case.
+        """
+        if not isinstance(seq, int) or isinstance(seq, bool) or seq < 0:
+            raise InvalidSequenceNumberError(
+                f'Sequence number must be a non-negative integer: {seq}')
+        if self._last_received is not None and seq <= self._last_received:
+            raise InvalidSequenceNumberError(
+                f'Sequence number must be greater than {self._last_received}:'
+                f' {seq}')
+        if self._last_received is not None:
+            skipped = range(self._last_received + 1, seq)
+            if len(skipped) > _MAX_SEQUENCE_GAP:
+                logger.warning('Client skipped %d sequence numbers',
+                               len(skipped))
+            else:
+                self._failed.extend(skipped)
+        self._last_received = seq
+        self._in_flight.add(seq)
+
+    def complete(self, seq, is_success):
+        """Registers the outcome of an event.
+
+        Args:
+            seq: The sequence number of the event, which must have been passed
+                to `receive` before.
+            is_success: Whether the event was applied successfully (bool).
+        """
+        self._in_flight.discard(seq)
+        if not is_success:
+            self._failed.append(seq)
+        self._schedule_flush()
+
+    def close(self):
+        """Stops sending statuses."""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+    def _applied_seq(self):
+        if self._in_flight:
+            return min(self._in_flight) - 1
+        return self._last_received
+
+    def _schedule_flush(self):
+        if self._flush_timer is None:
+            self._flush_timer = eventlet.spawn_after(self._interval_seconds,
+                                                     self._flush)
+
+    def _flush(self):
+        self._flush_timer = None
+        applied_seq = self._applied_seq()
+        if applied_seq == self._last_sent_applied and not self._failed:
+            return
+        failed = sorted(self._failed)
+        self._failed = []
+        self._last_sent_applied = applied_seq
+        self._send_status({'appliedSeq': applied_seq, 'failedSeqs': failed})
+        # If events are still in flight, the status will change again once they
+        # complete, which schedules the next flush.
@@ -0,0 +1,106 @@
+import unittest
+from unittest import mock
+
+import eventlet
+
+import input_sequence
+
+
+class SequenceTrackerTest(unittest.TestCase):
+
+    def make_tracker(self):
+        send_status = mock.Mock()
+        tracker = input_sequence.SequenceTracker(send_status,
+                                                 interval_seconds=0.01)
+        self.addCleanup(tracker.close)
+        return tracker, send_status
+
+    def test_reports_highest_applied_sequence_number(self):
+        tracker, send_status = self.make_tracker()
+
+        for seq in (1, 2, 3):
+            tracker.receive(seq)
+            tracker.complete(seq, is_success=True)
+        eventlet.sleep(0.05)
+
+        send_status.assert_called_once_with({'appliedSeq': 3, 'failedSeqs': []})
+
+    def test_reports_failed_sequence_numbers_once(self):
+        tracker, send_status = self.make_tracker()
+
+        tracker.receive(1)
+        tracker.complete(1, is_success=False)
+        tracker.receive(2)
+        tracker.complete(2, is_success=True)
+        eventlet.sleep(0.05)
+        tracker.receive(3)
+        tracker.complete(3, is_success=True)
+        eventlet.sleep(0.05)
+
+        self.assertEqual([
+            mock.call({
+                'appliedSeq': 2,
+                'failedSeqs': [1]
+            }),
+            mock.call({
+                'appliedSeq': 3,
+                'failedSeqs': []
+            }),
+        ], send_status.call_args_list)
+
+    def test_holds_back_applied_sequence_number_while_event_is_in_flight(self):
+        tracker, send_status = self.make_tracker()
+
+        tracker.receive(1)
+        tracker.receive(2)
+        tracker.complete(2, is_success=True)
+        eventlet.sleep(0.05)
+        tracker.complete(1, is_success=True)
+        eventlet.sleep(0.05)
+
+        self.assertEqual([
+            mock.call({
+                'appliedSeq': 0,
+                'failedSeqs': []
+            }),
+            mock.call({
+                'appliedSeq': 2,
+                'failedSeqs': []
+            }),
+        ], send_status.call_args_list)
+
+    def test_reports_skipped_sequence_numbers_as_failed(self):
+        tracker, send_status = self.make_tracker()
+
+        tracker.receive(1)
+        tracker.complete(1, is_success=True)
+        tracker.receive(4)
+        tracker.complete(4, is_success=True)
+        eventlet.sleep(0.05)
+
+        send_status.assert_called_once_with({
+            'appliedSeq': 4,
+            'failedSeqs': [2, 3]
+        })
+
+    def test_sends_nothing_without_changes(self):
+        _, send_status = self.make_tracker()
+        eventlet.sleep(0.05)
+        send_status.assert_not_called()
+
+    def test_rejects_sequence_number_that_does_not_increase(self):
+        tracker, _ = self.make_tracker()
+        tracker.receive(5)
+        for seq in (5, 4):
+            with self.subTest(seq=seq):
+                with self.assertRaises(
+                        input_sequence.InvalidSequenceNumberError):
+                    tracker.receive(seq)
+
+    def test_rejects_invalid_sequence_number(self):
+        tracker, _ = self.make_tracker()
+        for seq in (-1, 1.5, '1', None, True):
+            with self.subTest(seq=seq):
+                with self.assertRaises(
+                        input_sequence.InvalidSequenceNumberError):
+                    tracker.receive(seq)
@@ -144,6 +144,17 @@ _MAPPING = {
     'Tab': hid.KEYCODE_TAB,
 }
 
+# All supported JavaScript key codes in a fixed order. Clients that use the
+# binary wire format refer to a key code by its position in this tuple, its
+# key code ID (see `request_parsers.binary_input`).
+KEY_CODES = tuple(sorted(_MAPPING))
+
+# The HID keycodes, indexed by key code ID.
+_HID_KEYCODES_BY_ID = tuple(_MAPPING[code] for code in KEY_CODES)
+
+_MODIFIER_KEY_CODE_IDS = frozenset(
+    KEY_CODES.index(code) for code in _MODIFIER_KEYCODES)
+
 
 def convert(keystroke):
     """Converts a JavaScript-esque Keystroke object into a HID Keystroke object.
@@ -163,6 +174,34 @@ def convert(keystroke):
                          modifier=_map_modifier_keys(keystroke))
 
 
+def convert_key_code_id(modifier, key_code_id):
+    """Converts a keystroke in the binary wire format into a HID Keystroke.
+
+    This is the equivalent of `convert` for keystrokes whose modifier keys are
+    already encoded as HID bitmask, and whose key code is encoded as key code
+    ID.
+
+    Args:
+        modifier: The HID modifier bitmask (int between 0 and 0xff).
+        key_code_id: The position of the key code in `KEY_CODES` (int).
+
+    Returns:
+        A HID Keystroke object.
+
+    Raises:
+        UnrecognizedKeyCodeError: If there is no key code with that ID.
+    """
+    if not 0 <= key_code_id < len(_HID_KEYCODES_BY_ID):
+        raise UnrecognizedKeyCodeError(
+            f'Unrecognized key code ID {key_code_id}')
+    # See `_map_keycode` for why a standalone modifier key has no keycode.
+    if (key_code_id in _MODIFIER_KEY_CODE_IDS and
+            bin(modifier).count('1') == 1):
+        return hid.Keystroke(keycode=hid.KEYCODE_NONE, modifier=modifier)
+    return hid.Keystroke(keycode=_HID_KEYCODES_BY_ID[key_code_id],
+                         modifier=modifier)
+
+
 def _map_modifier_keys(keystroke):
     modifier_bitmask = 0
 
@@ -134,3 +134,57 @@ class ConvertJsToHIDTest(unittest.TestCase):
                                     right_ctrl_modifier=False,
                                     key='a',
                                     code=''))
+
+
+class ConvertKeyCodeIdTest(unittest.TestCase):
+
+    def test_converts_simple_keystroke(self):
+        self.assertEqual(
+            hid.Keystroke(keycode=hid.KEYCODE_A),
+            js_to_hid.convert_key_code_id(0, js_to_hid.KEY_CODES.index('KeyA')))
+
+    def test_converts_shifted_keystroke(self):
+        self.assertEqual(
+            hid.Keystroke(keycode=hid.KEYCODE_A,
+                          modifier=hid.MODIFIER_LEFT_SHIFT),
+            js_to_hid.convert_key_code_id(hid.MODIFIER_LEFT_SHIFT,
+                                          js_to_hid.KEY_CODES.index('KeyA')))
+
+    def test_converts_standalone_modifier_key_without_keycode(self):
+        self.assertEqual(
+            hid.Keystroke(keycode=hid.KEYCODE_NONE,
+                          modifier=hid.MODIFIER_LEFT_CTRL),
+            js_to_hid.convert_key_code_id(
+                hid.MODIFIER_LEFT_CTRL,
+                js_to_hid.KEY_CODES.index('ControlLeft')))
+
+    def test_matches_conversion_of_equivalent_keystroke(self):
+        modifier_flags = (
+            ('left_ctrl_modifier', hid.MODIFIER_LEFT_CTRL),
+            ('left_shift_modifier', hid.MODIFIER_LEFT_SHIFT),
+            ('left_alt_modifier', hid.MODIFIER_LEFT_ALT),
+            ('left_meta_modifier', hid.MODIFIER_LEFT_META),
+            ('right_ctrl_modifier', hid.MODIFIER_RIGHT_CTRL),
+            ('right_shift_modifier', hid.MODIFIER_RIGHT_SHIFT),
+            ('right_alt_modifier', hid.MODIFIER_RIGHT_ALT),
+            ('right_meta_modifier', hid.MODIFIER_RIGHT_META),
+        )
+        modifiers = (0, hid.MODIFIER_LEFT_CTRL,
+                     hid.MODIFIER_RIGHT_SHIFT | hid.MODIFIER_RIGHT_ALT)
+        for key_code_id, code in enumerate(js_to_hid.KEY_CODES):
+            for modifier in modifiers:
+                with self.subTest(code=code, modifier=modifier):
+                    js_keystroke = keystroke.Keystroke(
+                        key='',
+                        code=code,
+                        **{
+                            field: bool(modifier & bit)
+                            for field, bit in modifier_flags
+                        })
+                    self.assertEqual(
+                        js_to_hid.convert(js_keystroke),
+                        js_to_hid.convert_key_code_id(modifier, key_code_id))
+
+    def test_raises_exception_on_unrecognized_key_code_id(self):
+        with self.assertRaises(js_to_hid.UnrecognizedKeyCodeError):
+            js_to_hid.convert_key_code_id(0, len(js_to_hid.KEY_CODES))
@@ -0,0 +1,203 @@
+"""Tracks the pressed keys of a client connection in key-down/key-up mode.
+
+By default, every keystroke is pressed and released right away (see
+`hid.keyboard.send_keystroke`). Clients can opt into sending explicit key-down
+and key-up events instead, which allows genuinely long key presses and halves
+the number of reports. In that mode, the server keeps track of which keys are
+currently pressed, and writes a report whenever that set changes.
+
+The downside is that a key stays pressed on the target system until the client
+releases it. If the client goes away or its key-up event gets lost, the key
+would repeat forever. Therefore, a watchdog releases all keys when no event has
+arrived within a certain time window. Clients that hold a key for longer than
+that have to keep sending key-down events for it (like a browser does while a
+key auto-repeats) or other input events.
+"""
+import logging
+
+import eventlet
+
+from hid import keycodes as hid
+from hid import reports
+from hid import write as hid_write
+
+logger = logging.getLogger(__name__)
+
+# A HID keyboard report has room for six simultaneously pressed keys.
+_MAX_PRESSED_KEYS = 6
+
+# Modifier keys are part of the modifier bitmask, so they don't occupy any of
+# the six key slots of a report.
+_MODIFIER_KEYCODES = range(hid.KEYCODE_LEFT_CTRL, hid.KEYCODE_RIGHT_META + 1)
+
+
+class Error(Exception):
+    pass
+
+
+class TooManyKeysError(Error):
+    pass
+
+
+class KeyState:
+    """Writes the pressed keys of a single client connection."""
+
+    def __init__(self, keyboard_path, watchdog_seconds):
+        """Creates a new key state in which no keys are pressed.
+
+        Args:
+            keyboard_path: The file path to the keyboard interface.
+            watchdog_seconds: The time after the most recent event at which
+                all keys get released (as int or float).
+        """
+        self._keyboard_path = keyboard_path
+        self._watchdog_seconds = watchdog_seconds
+        self._modifier = hid.KEYCODE_NONE
+        # The pressed keys (excluding modifier keys), in the order in which
+        # they were pressed.
+        self._keycodes = []
+        # The most recent report that the HID interface has accepted.
+        self._written_report = reports.KEYBOARD_RELEASE_REPORT
+        self._watchdog = None
+
+    @property
+    def pressed_keycodes(self):
+        return list(self._keycodes)
+
+    @property
+    def report(self):
+        """The keyboard report that reflects the currently pressed keys."""
+        return reports.keyboard_report_for_keys(self._modifier, self._keycodes)
+
+    def press(self, keystroke):
+        """Presses a key, in addition to the keys that are already pressed.
+
+        Pressing a key that is already pressed has no effect, other than
+        resetting the watchdog.
+
+        Args:
+            keystroke: A HID Keystroke object. Its modifier bitmask replaces the
+                current one.
+
+        Raises:
+            TooManyKeysError: If six keys are already pressed.
+            hid_write.WriteError: If the report couldn't be written.
+        """
+        keycodes = self._keycodes
+        if _is_regular_key(keystroke.keycode) and (keystroke.keycode
+                                                   not in keycodes):
+            if len(keycodes) >= _MAX_PRESSED_KEYS:
+                self._reset_watchdog()
+                raise TooManyKeysError(
+                    f'Cannot press more than {_MAX_PRESSED_KEYS} keys at once')
+            keycodes = keycodes + [keystroke.keycode]
+        self._update(keystroke.modifier, keycodes)
+
+    def release(self, keystroke):
+        """Releases a key, while the other pressed keys remain pressed.
+
+        Args:
+            keystroke: A HID Keystroke object. Its modifier bitmask replaces the
+                current one.
+
+        Raises:
+            hid_write.WriteError: If the report couldn't be written.
+        """
+        keycodes = [
+            keycode for keycode in self._keycodes
+            if keycode != keystroke.keycode
+        ]
+        self._update(keystroke.modifier, keycodes)
+
+    def tap(self, keystroke):
+        """Presses and releases a key, while other keys remain pressed.
+
+        This is for keystrokes that get pressed and released right away (e.g.,
+        `keystroke` events), which would otherwise release all keys that the
+        client holds down. The keystroke's modifier bitmask only applies while
+        the key is pressed.
+
+        Args:
+            keystroke: A HID Keystroke object.
+
+        Returns:
+            A list of the keyboard reports that reflect the key press and the
+            subsequent release.
+
+        Raises:
+            TooManyKeysError: If six keys are already pressed.
+            hid_write.WriteError: If a report couldn't be written.
+        """
+        modifier, keycodes = self._modifier, self._keycodes
+        try:
+            self.press(keystroke)
+            press_report = self.report
+        finally:
+            self._update(modifier, keycodes)
+        return [press_report, self.report]
+
+    def release_all(self):
+        """Releases all keys, including modifier keys.
+
+        Raises:
+            hid_write.WriteError: If the report couldn't be written.
+        """
+        self._update(hid.KEYCODE_NONE, [])
+
+    def keep_alive(self):
+        """Resets the watchdog without changing the pressed keys.
+
+        Clients call this for other input events (e.g., mouse events), so that
+        keys stay pressed while the user is actively using the mouse.
+        """
+        self._reset_watchdog()
+
+    def close(self):
+        """Releases all keys and stops the watchdog.
+
+        Unlike the other methods, it doesn't raise an error if the report
+        couldn't be written, because the connection is going away anyway.
+        """
+        self._release_all_safely()
+        self._cancel_watchdog()
+
+    def _update(self, modifier, keycodes):
+        self._modifier = modifier
+        self._keycodes = keycodes
+        try:
+            report = reports.keyboard_report_for_keys(modifier, keycodes)
+            if report != self._written_report:
+                hid_write.write_to_hid_interface(self._keyboard_path, report)
+                self._written_report = report
+        finally:
+            self._reset_watchdog()
+
+    def _reset_watchdog(self):
+        self._cancel_watchdog()
+        # Even if no keys are supposed to be pressed, they might still be
+        # pressed on the target system if the release report failed.
+        if (self._modifier or self._keycodes or
+                self._written_report != reports.KEYBOARD_RELEASE_REPORT):
+            self._watchdog = eventlet.spawn_after(self._watchdog_seconds,
+                                                  self._on_watchdog_expired)
+
+    def _cancel_watchdog(self):
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            self._watchdog = None
+
+    def _on_watchdog_expired(self):
+        self._watchdog = None
+        logger.warning('Releasing keys after %.1f seconds without input events',
+                       self._watchdog_seconds)
+        self._release_all_safely()
+
+    def _release_all_safely(self):
+        try:
+            self.release_all()
+        except hid_write.WriteError as e:
+            logger.error('Failed to release keys: %s', e)
+
+
+def _is_regular_key(keycode):
+    return keycode != hid.KEYCODE_NONE and keycode not in _MODIFIER_KEYCODES
@@ -0,0 +1,187 @@
+import unittest
+from unittest import mock
+
+import eventlet
+
+import key_state
+from hid import keycodes as hid
+from hid import reports
+from hid import write as hid_write
+
+
+class KeyStateTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(key_state.hid_write,
+                                    'write_to_hid_interface')
+        self.mock_write = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_key_state(self, watchdog_seconds=60):
+        state = key_state.KeyState('/dev/hidg0', watchdog_seconds)
+        self.addCleanup(state.close)
+        return state
+
+    def written_reports(self):
+        return [call.args[1] for call in self.mock_write.call_args_list]
+
+    def test_writes_one_report_per_state_change(self):
+        state = self.make_key_state()
+
+        state.press(hid.Keystroke(keycode=hid.KEYCODE_A))
+        state.press(hid.Keystroke(keycode=hid.KEYCODE_B))
+        state.release(hid.Keystroke(keycode=hid.KEYCODE_A))
+        state.release(hid.Keystroke(keycode=hid.KEYCODE_B))
+
+        self.assertEqual([
+            reports.keyboard_report_for_keys(0, [hid.KEYCODE_A]),
+            reports.keyboard_report_for_keys(0, [hid.KEYCODE_A, hid.KEYCODE_B]),
+            reports.keyboard_report_for_keys(0, [hid.KEYCODE_B]),
+            reports.KEYBOARD_RELEASE_REPORT,
+        ], self.written_reports())
+
+    def test_ignores_repeated_key_down_events(self):
+        state = self.make_key_state()
+
+        for _ in range(3):
+            state.press(hid.Keystroke(keycode=hid.KEYCODE_A))
+
+        self.mock_write.assert_called_once_with(
+            '/dev/hidg0', reports.keyboard_report(0, hid.KEYCODE_A))
+
+    def test_keeps_modifier_keys_in_modifier_bitmask(self):
+        state = self.make_key_state()
+
+        state.press(
+            hid.Keystroke(keycode=hid.KEYCODE_NONE,
+                          modifier=hid.MODIFIER_LEFT_SHIFT))
+        state.press(
+            hid.Keystroke(keycode=hid.KEYCODE_LEFT_CTRL,
+                          modifier=hid.MODIFIER_LEFT_SHIFT |
+                          hid.MODIFIER_LEFT_CTRL))
+
+        self.assertEqual([], state.pressed_keycodes)
+        self.assertEqual([
+            reports.keyboard_report(hid.MODIFIER_LEFT_SHIFT, hid.KEYCODE_NONE),
+            reports.keyboard_report(
+                hid.MODIFIER_LEFT_SHIFT | hid.MODIFIER_LEFT_CTRL,
+                hid.KEYCODE_NONE),
+        ], self.written_reports())
+
+    def test_rejects_seventh_key(self):
+        state = self.make_key_state()
+        keycodes = [
+            hid.KEYCODE_A, hid.KEYCODE_B, hid.KEYCODE_C, hid.KEYCODE_D,
+            hid.KEYCODE_E, hid.KEYCODE_F
+        ]
+        for keycode in keycodes:
+            state.press(hid.Keystroke(keycode=keycode))
+
+        with self.assertRaises(key_state.TooManyKeysError):
+            state.press(hid.Keystroke(keycode=hid.KEYCODE_G))
+        self.assertEqual(keycodes, state.pressed_keycodes)
+        self.assertEqual(6, self.mock_write.call_count)
+
+    def test_retries_failed_report_on_next_event(self):
+        state = self.make_key_state()
+        self.mock_write.side_effect = [hid_write.WriteError(), None, None]
+
+        with self.assertRaises(hid_write.WriteError):
+            state.press(hid.Keystroke(keycode=hid.KEYCODE_A))
+        state.press(hid.Keystroke(keycode=hid.KEYCODE_A))
+
+        self.assertEqual([
+            reports.keyboard_report(0, hid.KEYCODE_A),
+            reports.keyboard_report(0, hid.KEYCODE_A),
+        ], self.written_reports())
+
+    def test_tap_keeps_other_keys_pressed(self):
+        state = self.make_key_state()
+        state.press(
+            hid.Keystroke(keycode=hid.KEYCODE_A,
+                          modifier=hid.MODIFIER_LEFT_SHIFT))
+
+        tapped_reports = state.tap(
+            hid.Keystroke(keycode=hid.KEYCODE_B,
+                          modifier=hid.MODIFIER_LEFT_CTRL))
+
+        self.assertEqual([
+            reports.keyboard_report_for_keys(hid.MODIFIER_LEFT_CTRL,
+                                             [hid.KEYCODE_A, hid.KEYCODE_B]),
+            reports.keyboard_report_for_keys(hid.MODIFIER_LEFT_SHIFT,
+                                             [hid.KEYCODE_A]),
+        ], tapped_reports)
+        self.assertEqual(tapped_reports, self.written_reports()[1:])
+        self.assertEqual([hid.KEYCODE_A], state.pressed_keycodes)
+
+    def test_tap_restores_key_state_if_write_fails(self):
+        state = self.make_key_state()
+        state.press(hid.Keystroke(keycode=hid.KEYCODE_A))
+        self.mock_write.side_effect = hid_write.WriteError('Failed to write')
+
+        with self.assertRaises(hid_write.WriteError):
+            state.tap(hid.Keystroke(keycode=hid.KEYCODE_B))
+
+        self.assertEqual([hid.KEYCODE_A], state.pressed_keycodes)
+
+    def test_releases_all_keys(self):
+        state = self.make_key_state()
+        state.press(
+            hid.Keystroke(keycode=hid.KEYCODE_A,
+                          modifier=hid.MODIFIER_LEFT_SHIFT))
+
+        state.release_all()
+
+        self.assertEqual(reports.KEYBOARD_RELEASE_REPORT,
+                         self.written_reports()[-1])
+        self.assertEqual([], state.pressed_keycodes)
+
+    def test_releases_keys_on_close(self):
+        state = self.make_key_state()
+        state.press(hid.Keystroke(keycode=hid.KEYCODE_A))
+
+        state.close()
+
+        self.assertEqual(reports.KEYBOARD_RELEASE_REPORT,
+                         self.written_reports()[-1])
+
+    def test_watchdog_releases_keys_without_events(self):
+        state = self.make_key_state(watchdog_seconds=0.01)
+
+        state.press(hid.Keystroke(keycode=hid.KEYCODE_A))
+        eventlet.sleep(0.05)
+
+        self.assertEqual([
+            reports.keyboard_report(0, hid.KEYCODE_A),
+            reports.KEYBOARD_RELEASE_REPORT,
+        ], self.written_reports())
+
+    def test_key_down_events_keep_watchdog_from_expiring(self):
+        state = self.make_key_state(watchdog_seconds=0.05)
+
+        for _ in range(5):
+            state.press(hid.Keystroke(keycode=hid.KEYCODE_A))
+            eventlet.sleep(0.02)
+
+        self.assertEqual([hid.KEYCODE_A], state.pressed_keycodes)
+        self.mock_write.assert_called_once()
+
+    def test_keep_alive_keeps_watchdog_from_expiring(self):
+        state = self.make_key_state(watchdog_seconds=0.05)
+
+        state.press(hid.Keystroke(keycode=hid.KEYCODE_A))
+        for _ in range(5):
+            eventlet.sleep(0.02)
+            state.keep_alive()
+
+        self.assertEqual([hid.KEYCODE_A], state.pressed_keycodes)
+        self.mock_write.assert_called_once()
+
+    def test_watchdog_is_idle_while_no_keys_are_pressed(self):
+        state = self.make_key_state(watchdog_seconds=0.01)
+
+        state.press(hid.Keystroke(keycode=hid.KEYCODE_A))
+        state.release(hid.Keystroke(keycode=hid.KEYCODE_A))
+        eventlet.sleep(0.05)
+
+        self.assertEqual(2, self.mock_write.call_count)
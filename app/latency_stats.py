@@ -0,0 +1,31 @@
+"""Summarizes latency measurements of the benchmark and load testing tools."""
+import statistics
+
+
+def summarize(latencies_seconds):
+    """Calculates the distribution of latency measurements.
+
+    Args:
+        latencies_seconds: A list of latencies in seconds (as floats).
+
+    Returns:
+        A dictionary with the fields `min`, `p50`, `p90`, `p99`, `max`, and
+        `mean`, in milliseconds, or `None` if there are no measurements.
+    """
+    if not latencies_seconds:
+        return None
+    latencies_ms = sorted(latency * 1000 for latency in latencies_seconds)
+    if len(latencies_ms) > 1:
+        percentiles = statistics.quantiles(latencies_ms,
+                                           n=100,
+                                           method='inclusive')
+    else:
+        percentiles = latencies_ms * 99
+    return {
+        'min': latencies_ms[0],
+        'p50': percentiles[49],
+        'p90': percentiles[89],
+        'p99': percentiles[98],
+        'max': latencies_ms[-1],
+        'mean': statistics.fmean(latencies_ms),
+    }
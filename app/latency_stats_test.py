@@ -0,0 +1,30 @@
+import unittest
+
+import latency_stats
+
+
+class SummarizeTest(unittest.TestCase):
+
+    def test_summarizes_latencies_in_milliseconds(self):
+        summary = latency_stats.summarize([i / 1000 for i in range(1, 101)])
+
+        self.assertAlmostEqual(1.0, summary['min'])
+        self.assertAlmostEqual(50.5, summary['p50'])
+        self.assertAlmostEqual(90.1, summary['p90'])
+        self.assertAlmostEqual(99.01, summary['p99'])
+        self.assertAlmostEqual(100.0, summary['max'])
+        self.assertAlmostEqual(50.5, summary['mean'])
+
+    def test_summarizes_single_latency(self):
+        self.assertEqual(
+            {
+                'min': 2.0,
+                'p50': 2.0,
+                'p90': 2.0,
+                'p99': 2.0,
+                'max': 2.0,
+                'mean': 2.0,
+            }, latency_stats.summarize([0.002]))
+
+    def test_returns_none_without_latencies(self):
+        self.assertIsNone(latency_stats.summarize([]))
@@ -0,0 +1,129 @@
+"""Plays back recorded input macros on the target system.
+
+Playback writes the recorded HID reports straight to the HID interfaces, with
+the recorded delays between them. Some target systems (e.g., BIOS menus) drop
+input if it arrives too quickly, so the delays have to be accurate: eventlet
+only wakes up a sleeping greenlet at the granularity of its hub, so we sleep
+until shortly before each report is due, and then yield until it's due exactly.
+
+A playback is a paste job (see `paste_engine`), so it runs in the same queue as
+pasted text, and it can be followed and cancelled in the same way.
+"""
+import logging
+import time
+
+import eventlet
+
+import macros
+import paste_engine
+from hid import write as hid_write
+
+logger = logging.getLogger(__name__)
+
+# The time before a report is due at which we stop sleeping and start yielding
+# until the report is due. It needs to be larger than the timing inaccuracy of
+# `eventlet.sleep`.
+_SPIN_THRESHOLD_SECONDS = 0.002
+
+# The minimum time between two progress notifications of a playback.
+_PROGRESS_INTERVAL_SECONDS = 0.1
+
+# The range of supported playback speeds, as factor of the recorded speed.
+MIN_SPEED = 0.1
+MAX_SPEED = 100.0
+
+
+class PlaybackJob(paste_engine.Job):
+    """A job that writes the reports of a macro with the recorded timing."""
+
+    def __init__(  # pylint: disable=too-many-positional-arguments
+            self, keyboard_path, mouse_path, records, speed, on_progress):
+        """Creates a new playback job.
+
+        Args:
+            keyboard_path: The file path to the keyboard interface.
+            mouse_path: The file path to the mouse interface.
+            records: The `macros.Record` objects of the macro.
+            speed: The factor by which to speed up the recorded delays (e.g.,
+                2.0 for playing back twice as fast).
+            on_progress: See `paste_engine.Job`.
+        """
+        super().__init__(keyboard_path,
+                         report_stream=b'',
+                         reports_per_second=None,
+                         on_progress=on_progress)
+        self._mouse_path = mouse_path
+        self._records = records
+        self._speed = speed
+        self._last_mouse_report = None
+        self.reports_total = len(records)
+
+    def _write_reports(self):
+        hid_paths = {
+            macros.Interface.KEYBOARD: self._keyboard_path,
+            macros.Interface.MOUSE: self._mouse_path,
+        }
+        previous_write_time = time.monotonic()
+        next_progress_at = previous_write_time + _PROGRESS_INTERVAL_SECONDS
+        for record in self._records:
+            due_time = previous_write_time + record.delay_seconds / self._speed
+            _sleep_until(due_time)
+            if self._is_cancel_requested:
+                return paste_engine.Status.CANCELLED
+            # Measure each delay from when the previous report was due, so that
+            # the duration of a write doesn't add up over many reports. If we
+            # fell behind, though, don't rush the subsequent reports.
+            previous_write_time = max(due_time, time.monotonic())
+            hid_write.write_to_hid_interface(hid_paths[record.interface],
+                                             record.report)
+            if record.interface == macros.Interface.MOUSE:
+                self._last_mouse_report = record.report
+            self.reports_written += 1
+            if previous_write_time >= next_progress_at:
+                self._on_progress(self)
+                next_progress_at = (previous_write_time +
+                                    _PROGRESS_INTERVAL_SECONDS)
+        return paste_engine.Status.DONE
+
+    def _release_inputs(self):
+        super()._release_inputs()
+        # Release the mouse buttons, but leave the cursor where it is.
+        if self._last_mouse_report and self._last_mouse_report[0]:
+            # Keep the position (bytes 1-4), but clear the buttons and wheels.
+            release_report = (b'\x00' + self._last_mouse_report[1:5] +
+                              b'\x00\x00')
+            try:
+                hid_write.write_to_hid_interface(self._mouse_path,
+                                                 release_report)
+            except hid_write.WriteError as e:
+                logger.error('Failed to release mouse buttons: %s', e)
+
+
+def _sleep_until(due_time):
+    remaining_seconds = due_time - time.monotonic()
+    # Yield even if the report is already due, so that long macros without
+    # delays don't starve the other greenlets.
+    eventlet.sleep(max(0.0, remaining_seconds - _SPIN_THRESHOLD_SECONDS))
+    # Yield rather than busy-wait, so that other greenlets can still run.
+    while time.monotonic() < due_time:
+        eventlet.sleep(0)
+
+
+def play(  # pylint: disable=too-many-positional-arguments
+        keyboard_path, mouse_path, records, speed, on_progress):
+    """Submits a macro for playback.
+
+    Args:
+        keyboard_path: The file path to the keyboard interface.
+        mouse_path: The file path to the mouse interface.
+        records: The `macros.Record` objects of the macro.
+        speed: The factor by which to speed up the recorded delays.
+        on_progress: See `paste_engine.Job`.
+
+    Returns:
+        The `PlaybackJob` object, which can be retrieved and cancelled via
+        `paste_engine`.
+    """
+    job = PlaybackJob(keyboard_path, mouse_path, records, speed, on_progress)
+    paste_engine.enqueue(job)
+    return job
@@ -0,0 +1,100 @@
+import time
+import unittest
+from unittest import mock
+
+import macro_player
+import macros
+import paste_engine
+
+KEYBOARD_PRESS_A = b'\x00\x00\x04\x00\x00\x00\x00\x00'
+KEYBOARD_RELEASE = b'\x00\x00\x00\x00\x00\x00\x00\x00'
+MOUSE_PRESS = b'\x01\xff\x3f\xff\x3f\x00\x00'
+
+
+def make_job(records, speed=1.0):
+    return macro_player.PlaybackJob('/dev/hidg0',
+                                    '/dev/hidg1',
+                                    records,
+                                    speed,
+                                    on_progress=mock.Mock())
+
+
+@mock.patch.object(macro_player.hid_write, 'write_to_hid_interface')
+class PlaybackJobTest(unittest.TestCase):
+
+    def test_writes_reports_to_their_interfaces(self, mock_write):
+        job = make_job([
+            macros.Record(0.0, macros.Interface.KEYBOARD, KEYBOARD_PRESS_A),
+            macros.Record(0.0, macros.Interface.MOUSE, MOUSE_PRESS),
+            macros.Record(0.0, macros.Interface.KEYBOARD, KEYBOARD_RELEASE),
+        ])
+
+        job.run()
+
+        self.assertEqual([
+            mock.call('/dev/hidg0', KEYBOARD_PRESS_A),
+            mock.call('/dev/hidg1', MOUSE_PRESS),
+            mock.call('/dev/hidg0', KEYBOARD_RELEASE),
+        ], mock_write.call_args_list)
+        self.assertEqual(paste_engine.Status.DONE, job.status)
+        self.assertEqual(3, job.reports_total)
+        self.assertEqual(3, job.reports_written)
+
+    def test_keeps_recorded_delays(self, mock_write):
+        write_times = []
+        mock_write.side_effect = lambda *_: write_times.append(time.monotonic())
+        job = make_job([
+            macros.Record(0.0, macros.Interface.KEYBOARD, KEYBOARD_PRESS_A),
+            macros.Record(0.03, macros.Interface.KEYBOARD, KEYBOARD_RELEASE),
+        ])
+
+        job.run()
+
+        self.assertEqual(2, len(write_times))
+        self.assertGreaterEqual(write_times[1] - write_times[0], 0.03)
+
+    def test_scales_delays_by_speed(self, mock_write):
+        job = make_job([
+            macros.Record(0.0, macros.Interface.KEYBOARD, KEYBOARD_PRESS_A),
+            macros.Record(10.0, macros.Interface.KEYBOARD, KEYBOARD_RELEASE),
+        ],
+                       speed=macro_player.MAX_SPEED)
+
+        job.run()
+
+        self.assertEqual(2, mock_write.call_count)
+        self.assertGreaterEqual(job.run_seconds, 0.1)
+
+    def test_stops_writing_when_cancelled(self, mock_write):
+        job = make_job([
+            macros.Record(0.0, macros.Interface.KEYBOARD, KEYBOARD_PRESS_A),
+            macros.Record(0.0, macros.Interface.KEYBOARD, KEYBOARD_RELEASE),
+        ])
+        mock_write.side_effect = lambda *_: job.cancel()
+
+        job.run()
+
+        self.assertEqual([
+            mock.call('/dev/hidg0', KEYBOARD_PRESS_A),
+            mock.call('/dev/hidg0', KEYBOARD_RELEASE),
+        ], mock_write.call_args_list)
+        self.assertEqual(paste_engine.Status.CANCELLED, job.status)
+        self.assertEqual(1, job.reports_written)
+
+    def test_releases_mouse_buttons_when_cancelled(self, mock_write):
+        job = make_job([
+            macros.Record(0.0, macros.Interface.MOUSE, MOUSE_PRESS),
+            macros.Record(0.0, macros.Interface.MOUSE, MOUSE_PRESS),
+        ])
+        mock_write.side_effect = lambda *_: job.cancel()
+
+        job.run()
+
+        self.assertEqual(
+            [
+                mock.call('/dev/hidg1', MOUSE_PRESS),
+                mock.call('/dev/hidg0', KEYBOARD_RELEASE),
+                # The button gets released at the same position.
+                mock.call('/dev/hidg1', b'\x00\xff\x3f\xff\x3f\x00\x00'),
+            ],
+            mock_write.call_args_list)
@@ -0,0 +1,163 @@
+"""Records input macros and encodes them in a compact binary format.
+
+A macro is a sequence of HID reports, each with the time that passed since the
+previous report. We record the reports that result from the input events of a
+client connection, and play them back later (see `macro_player`), e.g., to
+repeat the same BIOS key sequence on many machines.
+
+The binary format consists of a version byte, followed by one record per report:
+- Byte 0-3: the delay since the previous report in microseconds (unsigned,
+            little-endian)
+- Byte 4:   the HID interface (0 = keyboard, 1 = mouse)
+- Byte 5-n: the report, whose size depends on the interface (8 bytes for the
+            keyboard, 7 bytes for the mouse)
+"""
+import dataclasses
+import enum
+import struct
+import time
+
+from hid import reports
+
+_FORMAT_VERSION = 1
+
+_RECORD_HEADER_FORMAT = struct.Struct('<IB')
+
+# The longest delay that fits into a record.
+_MAX_DELAY_MICROSECONDS = 0xffffffff
+
+# Arbitrary limit, but just to prevent anything crazy.
+_MAX_REPORTS = 100000
+
+
+class Error(Exception):
+    pass
+
+
+class MacroTooLongError(Error):
+    pass
+
+
+class InvalidMacroError(Error):
+    pass
+
+
+class Interface(enum.Enum):
+    KEYBOARD = 0
+    MOUSE = 1
+
+
+_REPORT_SIZES = {
+    Interface.KEYBOARD: reports.KEYBOARD_REPORT_SIZE,
+    Interface.MOUSE: reports.MOUSE_REPORT_SIZE,
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class Record:
+    # The time since the previous report.
+    delay_seconds: float
+    interface: Interface
+    report: bytes
+
+
+@dataclasses.dataclass(frozen=True)
+class Macro:
+    # The encoded records, in the binary format (see module docstring).
+    data: bytes
+    report_count: int
+    # The time from the first to the last report.
+    duration_seconds: float
+
+
+class Recorder:
+    """Records HID reports, along with the time between them."""
+
+    def __init__(self):
+        self._data = bytearray((_FORMAT_VERSION,))
+        self._report_count = 0
+        self._duration_microseconds = 0
+        self._last_report_time = None
+        self._last_keyboard_report = None
+
+    def record(self, interface, report):
+        """Appends a report to the macro.
+
+        A keyboard report that is identical to the previous keyboard report is
+        skipped, because it wouldn't change anything on the target system (e.g.,
+        when a key auto-repeats in key-down/key-up mode). Mouse reports are
+        always recorded, because wheel movements are relative.
+
+        Args:
+            interface: The `Interface` that the report is meant for.
+            report: The report as `bytes`.
+
+        Raises:
+            MacroTooLongError: If the macro has reached the maximum number of
+                reports.
+        """
+        if interface == Interface.KEYBOARD:
+            if report == self._last_keyboard_report:
+                return
+            self._last_keyboard_report = report
+        if self._report_count >= _MAX_REPORTS:
+            raise MacroTooLongError(
+                f'Macro must not contain more than {_MAX_REPORTS} reports')
+
+        now = time.monotonic()
+        delay_microseconds = 0
+        if self._last_report_time is not None:
+            delay_microseconds = min(
+                round((now - self._last_report_time) * 1000000),
+                _MAX_DELAY_MICROSECONDS)
+        self._last_report_time = now
+
+        self._data += _RECORD_HEADER_FORMAT.pack(delay_microseconds,
+                                                 interface.value)
+        self._data += report
+        self._report_count += 1
+        self._duration_microseconds += delay_microseconds
+
+    def finish(self):
+        """Returns the recorded `Macro`."""
+        return Macro(data=bytes(self._data),
+                     report_count=self._report_count,
+                     duration_seconds=self._duration_microseconds / 1000000)
+
+
+def decode(data):
+    """Decodes the records of a macro.
+
+    Args:
+        data: The macro in the binary format as `bytes`.
+
+    Returns:
+        A list of `Record` objects.
+
+    Raises:
+        InvalidMacroError: If the data isn't a valid macro.
+    """
+    if not data or data[0] != _FORMAT_VERSION:
+        raise InvalidMacroError('Macro has an unsupported format')
+    records = []
+    offset = 1
+    while offset < len(data):
+        if offset + _RECORD_HEADER_FORMAT.size > len(data):
+            raise InvalidMacroError('Macro is truncated')
+        delay_microseconds, interface_value = (
+            _RECORD_HEADER_FORMAT.unpack_from(data, offset))
+        offset += _RECORD_HEADER_FORMAT.size
+        try:
+            interface = Interface(interface_value)
+        except ValueError as e:
+            raise InvalidMacroError(
+                f'Macro contains unknown interface: {interface_value}') from e
+        report_size = _REPORT_SIZES[interface]
+        if offset + report_size > len(data):
+            raise InvalidMacroError('Macro is truncated')
+        records.append(
+            Record(delay_seconds=delay_microseconds / 1000000,
+                   interface=interface,
+                   report=bytes(data[offset:offset + report_size])))
+        offset += report_size
+    return records
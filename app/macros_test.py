@@ -0,0 +1,93 @@
+import unittest
+from unittest import mock
+
+import macros
+
+KEYBOARD_PRESS_A = b'\x00\x00\x04\x00\x00\x00\x00\x00'
+KEYBOARD_RELEASE = b'\x00\x00\x00\x00\x00\x00\x00\x00'
+MOUSE_MOVE = b'\x00\xff\x3f\xff\x3f\x00\x00'
+
+
+@mock.patch.object(macros.time, 'monotonic')
+class RecorderTest(unittest.TestCase):
+
+    def test_records_reports_with_delays(self, mock_monotonic):
+        mock_monotonic.side_effect = [10.0, 10.25, 12.0]
+        recorder = macros.Recorder()
+
+        recorder.record(macros.Interface.KEYBOARD, KEYBOARD_PRESS_A)
+        recorder.record(macros.Interface.MOUSE, MOUSE_MOVE)
+        recorder.record(macros.Interface.KEYBOARD, KEYBOARD_RELEASE)
+        macro = recorder.finish()
+
+        self.assertEqual(3, macro.report_count)
+        self.assertAlmostEqual(2.0, macro.duration_seconds)
+        self.assertEqual([
+            macros.Record(delay_seconds=0.0,
+                          interface=macros.Interface.KEYBOARD,
+                          report=KEYBOARD_PRESS_A),
+            macros.Record(delay_seconds=0.25,
+                          interface=macros.Interface.MOUSE,
+                          report=MOUSE_MOVE),
+            macros.Record(delay_seconds=1.75,
+                          interface=macros.Interface.KEYBOARD,
+                          report=KEYBOARD_RELEASE),
+        ], macros.decode(macro.data))
+
+    def test_skips_repeated_keyboard_report(self, mock_monotonic):
+        mock_monotonic.side_effect = [1.0, 2.0]
+        recorder = macros.Recorder()
+
+        recorder.record(macros.Interface.KEYBOARD, KEYBOARD_PRESS_A)
+        recorder.record(macros.Interface.KEYBOARD, KEYBOARD_PRESS_A)
+        recorder.record(macros.Interface.KEYBOARD, KEYBOARD_RELEASE)
+
+        self.assertEqual(
+            [KEYBOARD_PRESS_A, KEYBOARD_RELEASE],
+            [record.report for record in macros.decode(recorder.finish().data)])
+
+    def test_records_repeated_mouse_report(self, mock_monotonic):
+        mock_monotonic.side_effect = [1.0, 2.0]
+        recorder = macros.Recorder()
+
+        recorder.record(macros.Interface.MOUSE, MOUSE_MOVE)
+        recorder.record(macros.Interface.MOUSE, MOUSE_MOVE)
+
+        self.assertEqual(2, recorder.finish().report_count)
+
+    @mock.patch.object(macros, '_MAX_REPORTS', 2)
+    def test_rejects_report_beyond_maximum(self, mock_monotonic):
+        mock_monotonic.side_effect = [1.0, 2.0]
+        recorder = macros.Recorder()
+        recorder.record(macros.Interface.MOUSE, MOUSE_MOVE)
+        recorder.record(macros.Interface.MOUSE, MOUSE_MOVE)
+
+        with self.assertRaises(macros.MacroTooLongError):
+            recorder.record(macros.Interface.MOUSE, MOUSE_MOVE)
+        self.assertEqual(2, recorder.finish().report_count)
+
+    def test_empty_macro_has_no_records(self, _):
+        macro = macros.Recorder().finish()
+
+        self.assertEqual(0, macro.report_count)
+        self.assertEqual(0.0, macro.duration_seconds)
+        self.assertEqual([], macros.decode(macro.data))
+
+
+class DecodeTest(unittest.TestCase):
+
+    def test_rejects_invalid_data(self):
+        for data in (
+                b'',
+                # Unsupported version.
+                b'\x02',
+                # Truncated header.
+                b'\x01\x00\x00\x00',
+                # Unknown interface.
+                b'\x01\x00\x00\x00\x00\x07' + MOUSE_MOVE,
+                # Truncated report.
+                b'\x01\x00\x00\x00\x00\x00' + KEYBOARD_PRESS_A[:7],
+        ):
+            with self.subTest(data=data):
+                with self.assertRaises(macros.InvalidMacroError):
+                    macros.decode(data)
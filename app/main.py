@@ -12,6 +12,7 @@ from werkzeug import exceptions
 # app-wide logger class before any other module loads it.
 import log
 import api
+import auth_subrequest
 import db.settings
 import db_connection
 import json_response
@@ -21,6 +22,7 @@ import silence_eventlet_fork_noise
 import socket_api
 import views
 from find_files import find as find_files
+from hid import link_monitor as hid_link_monitor
 
 # Silence eventlet's post-fork AssertionError under Python 3.13.
 # Must run after socket_api is imported (which triggers engineio to
@@ -56,11 +58,14 @@ app.config.update(
     WTF_CSRF_TIME_LIMIT=None,
 )
 
+# Open the database connection, which applies any pending migrations, before
+# serving the first request.
+db_connection.get()
+
 # Configure cookie security.
-with app.app_context():
-    is_session_cookie_secure = (not debug and
-                                db.settings.Settings().requires_https())
-    app.config.update(SESSION_COOKIE_SECURE=is_session_cookie_secure)
+is_session_cookie_secure = (not debug and
+                            db.settings.Settings().requires_https())
+app.config.update(SESSION_COOKIE_SECURE=is_session_cookie_secure)
 
 # Configure CSRF protection.
 csrf = flask_wtf.csrf.CSRFProtect(app)
@@ -69,6 +74,9 @@ app.register_blueprint(api.api_blueprint)
 app.register_blueprint(license_notice.blueprint)
 app.register_blueprint(views.views_blueprint)
 
+# Answer the auth subrequests of our NGINX proxy without the Flask stack.
+app.wsgi_app = auth_subrequest.Middleware(app)
+
 
 @app.before_request
 def check_proxy_https_redirect():
@@ -97,11 +105,6 @@ def check_proxy_https_redirect():
     return None
 
 
-@app.teardown_appcontext
-def close_connection(_):
-    db_connection.close()
-
-
 @app.errorhandler(flask_wtf.csrf.CSRFError)
 def handle_csrf_error(error):
     return json_response.error(error), 403
@@ -130,6 +133,7 @@ def handle_error(e):
 def main():
     socketio = socket_api.socketio
     socketio.init_app(app)
+    socketio.start_background_task(hid_link_monitor.run)
     socketio.run(app,
                  host=host,
                  port=port,
@@ -0,0 +1,237 @@
+"""Forwards the mouse events of a client connection to the HID interface.
+
+When HID writes slow down (e.g., because the target system is busy), mouse
+events pile up faster than we can write them. Writing every single one of them
+would make the cursor trail far behind the user's actual mouse movements, so the
+pipeline applies the following rules to the events that are waiting for their
+turn:
+
+- Button changes and wheel events are always written, in the order in which
+  they arrived.
+- A pure position update (i.e., a move with the same button state as the event
+  before it) replaces a pending position update, so only the most recent
+  position gets written.
+- An event that is identical to the one before it gets discarded, because it
+  wouldn't have any effect on the target system.
+
+The number of waiting events is bounded. Button changes and wheel events can't
+be merged or discarded, so when they fill up the queue, new events have to wait
+until the queue has room again. To keep clients from getting that far, the
+pipeline signals backpressure while the queue is getting long, so that clients
+can send fewer events.
+"""
+import collections
+import dataclasses
+import logging
+import time
+
+import eventlet
+import eventlet.event
+import eventlet.semaphore
+
+from hid import mouse as fake_mouse
+from hid import write as hid_write
+
+logger = logging.getLogger(__name__)
+
+# The maximum number of events that can wait for being written.
+_MAX_PENDING_EVENTS = 32
+
+# The number of waiting events from which on the pipeline signals backpressure.
+_BACKPRESSURE_THRESHOLD = 4
+
+# The minimum time between two backpressure signals.
+_BACKPRESSURE_INTERVAL_SECONDS = 0.2
+
+# The weight of the most recent write in the moving average of write durations.
+_WRITE_DURATION_SMOOTHING = 0.2
+
+
+@dataclasses.dataclass
+class Stats:
+    # The number of events that were written to the HID interface.
+    written: int = 0
+    # The number of events that failed to be written to the HID interface.
+    failed: int = 0
+    # The number of pending position updates that were replaced by a newer one.
+    merged: int = 0
+    # The number of events that were discarded as duplicates.
+    dropped: int = 0
+
+
+@dataclasses.dataclass
+class _PendingEvent:
+    mouse_event: object
+    # Whether a subsequent position update may replace this event.
+    is_replaceable: bool
+    # The `eventlet.event.Event` objects of all callers that are waiting for
+    # this event to be written.
+    waiters: list
+
+
+class MousePipeline:
+    """Writes the mouse events of a single client connection in order."""
+
+    def __init__(self, mouse_path, on_backpressure=None):
+        """Creates a new pipeline without any waiting events.
+
+        Args:
+            mouse_path: The file path to the mouse interface.
+            on_backpressure: A function that gets called with the queue depth
+                (int) and the drain rate (see `drain_rate`) while events are
+                piling up, and once more when the queue has drained.
+        """
+        self._mouse_path = mouse_path
+        self._on_backpressure = on_backpressure
+        self._pending = collections.deque()
+        # Each waiting event holds a slot until it has been written. Callers
+        # acquire the slots in the order of submission, so waiting for a slot
+        # doesn't reorder events.
+        self._slots = eventlet.semaphore.Semaphore(_MAX_PENDING_EVENTS)
+        self._last_submitted = None
+        # The `_PendingEvent` that is currently being written, if any.
+        self._in_flight = None
+        self._worker = None
+        self._average_write_seconds = None
+        self._last_backpressure_time = None
+        self.stats = Stats()
+
+    @property
+    def depth(self):
+        """The number of events that are waiting for being written."""
+        return len(self._pending)
+
+    @property
+    def drain_rate(self):
+        """The recent rate of writes in events per second.
+
+        It's `None` if there haven't been any writes yet.
+        """
+        if not self._average_write_seconds:
+            return None
+        return 1 / self._average_write_seconds
+
+    def submit(self, mouse_event):
+        """Enqueues a mouse event for being written to the HID interface.
+
+        Args:
+            mouse_event: A `request_parsers.mouse_event.MouseEvent` object.
+
+        Returns:
+            An `eventlet.event.Event` that is fired with a bool once the event
+            (or a newer event that replaced it) has been written. The bool
+            indicates whether the write was successful.
+        """
+        # This blocks while the queue is full.
+        self._slots.acquire()
+        waiter = eventlet.event.Event()
+        if self._is_duplicate(mouse_event):
+            self._slots.release()
+            self.stats.dropped += 1
+            # The duplicate's outcome is that of the event it duplicates.
+            if self._pending:
+                self._pending[-1].waiters.append(waiter)
+            elif self._in_flight is not None:
+                self._in_flight.waiters.append(waiter)
+            else:
+                waiter.send(True)
+            return waiter
+
+        is_move = self._is_move(mouse_event)
+        self._last_submitted = mouse_event
+        if is_move and self._pending and self._pending[-1].is_replaceable:
+            self._slots.release()
+            self._pending[-1].mouse_event = mouse_event
+            self._pending[-1].waiters.append(waiter)
+            self.stats.merged += 1
+        else:
+            self._pending.append(
+                _PendingEvent(mouse_event=mouse_event,
+                              is_replaceable=is_move,
+                              waiters=[waiter]))
+            self._signal_backpressure()
+
+        if self._worker is None:
+            self._worker = eventlet.spawn(self._process_pending)
+        return waiter
+
+    def _is_duplicate(self, mouse_event):
+        # Wheel events are relative, so repeating them is meaningful.
+        return (mouse_event == self._last_submitted and
+                not _has_wheel_delta(mouse_event))
+
+    def _is_move(self, mouse_event):
+        return (self._last_submitted is not None and
+                mouse_event.buttons == self._last_submitted.buttons and
+                not _has_wheel_delta(mouse_event))
+
+    def _process_pending(self):
+        try:
+            while self._pending:
+                pending_event = self._pending.popleft()
+                self._in_flight = pending_event
+                is_success = False
+                write_start = time.monotonic()
+                try:
+                    is_success = self._write(pending_event.mouse_event)
+                    # A retry of the most recent event must not count as a
+                    # duplicate of the event that failed.
+                    if not is_success and not self._pending:
+                        self._last_submitted = None
+                finally:
+                    self._in_flight = None
+                    self._slots.release()
+                    self._record_write_duration(time.monotonic() - write_start)
+                    for waiter in pending_event.waiters:
+                        waiter.send(is_success)
+        finally:
+            self._worker = None
+            # If a write failed unexpectedly, the remaining events still need a
+            # worker, because their callers are waiting for them.
+            if self._pending:
+                self._worker = eventlet.spawn(self._process_pending)
+            # Let the client know that it can speed up again.
+            elif self._last_backpressure_time is not None:
+                self._last_backpressure_time = None
+                self._notify_backpressure()
+
+    def _record_write_duration(self, write_seconds):
+        if self._average_write_seconds is None:
+            self._average_write_seconds = write_seconds
+        else:
+            self._average_write_seconds += _WRITE_DURATION_SMOOTHING * (
+                write_seconds - self._average_write_seconds)
+
+    def _signal_backpressure(self):
+        if self.depth < _BACKPRESSURE_THRESHOLD:
+            return
+        now = time.monotonic()
+        if (self._last_backpressure_time is not None and
+                now - self._last_backpressure_time
+                < _BACKPRESSURE_INTERVAL_SECONDS):
+            return
+        self._last_backpressure_time = now
+        self._notify_backpressure()
+
+    def _notify_backpressure(self):
+        if self._on_backpressure is not None:
+            self._on_backpressure(self.depth, self.drain_rate)
+
+    def _write(self, mouse_event):
+        try:
+            fake_mouse.send_mouse_event(self._mouse_path, mouse_event.buttons,
+                                        mouse_event.relative_x,
+                                        mouse_event.relative_y,
+                                        mouse_event.vertical_wheel_delta,
+                                        mouse_event.horizontal_wheel_delta)
+        except (hid_write.WriteError, OSError) as e:
+            logger.error_sensitive('Failed to forward mouse event: %s', e)
+            self.stats.failed += 1
+            return False
+        self.stats.written += 1
+        return True
+
+
+def _has_wheel_delta(mouse_event):
+    return (mouse_event.vertical_wheel_delta != 0 or
+            mouse_event.horizontal_wheel_delta != 0)
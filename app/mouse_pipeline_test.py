@@ -0,0 +1,202 @@
+import unittest
+from unittest import mock
+
+import eventlet
+
+import mouse_pipeline
+from hid import write as hid_write
+from request_parsers import mouse_event as mouse_event_request
+
+
+def make_event(buttons=0,
+               relative_x=0.5,
+               relative_y=0.5,
+               vertical_wheel_delta=0,
+               horizontal_wheel_delta=0):
+    return mouse_event_request.MouseEvent(
+        buttons=buttons,
+        relative_x=relative_x,
+        relative_y=relative_y,
+        vertical_wheel_delta=vertical_wheel_delta,
+        horizontal_wheel_delta=horizontal_wheel_delta)
+
+
+@mock.patch.object(mouse_pipeline.fake_mouse, 'send_mouse_event')
+class MousePipelineTest(unittest.TestCase):
+
+    def written_events(self, mock_send_mouse_event):
+        return [
+            make_event(*call.args[1:])
+            for call in mock_send_mouse_event.call_args_list
+        ]
+
+    def test_writes_single_event(self, mock_send_mouse_event):
+        pipeline = mouse_pipeline.MousePipeline('/dev/hidg1')
+        self.assertTrue(pipeline.submit(make_event(buttons=1)).wait())
+        mock_send_mouse_event.assert_called_once_with('/dev/hidg1', 1, 0.5, 0.5,
+                                                      0, 0)
+
+    def test_collapses_pending_moves_to_most_recent_one(self,
+                                                        mock_send_mouse_event):
+        pipeline = mouse_pipeline.MousePipeline('/dev/hidg1')
+        # The events are submitted back to back, so they all queue up before
+        # the first one gets written.
+        waiters = [
+            pipeline.submit(make_event(relative_x=0.1)),
+            pipeline.submit(make_event(relative_x=0.2)),
+            pipeline.submit(make_event(relative_x=0.3)),
+            pipeline.submit(make_event(relative_x=0.4)),
+        ]
+        self.assertEqual([True, True, True, True],
+                         [waiter.wait() for waiter in waiters])
+        self.assertEqual([
+            make_event(relative_x=0.1),
+            make_event(relative_x=0.4),
+        ], self.written_events(mock_send_mouse_event))
+        self.assertEqual(2, pipeline.stats.merged)
+
+    def test_never_drops_button_changes(self, mock_send_mouse_event):
+        pipeline = mouse_pipeline.MousePipeline('/dev/hidg1')
+        waiters = [
+            pipeline.submit(make_event(relative_x=0.1)),
+            pipeline.submit(make_event(buttons=1, relative_x=0.2)),
+            pipeline.submit(make_event(buttons=1, relative_x=0.3)),
+            pipeline.submit(make_event(buttons=1, relative_x=0.4)),
+            pipeline.submit(make_event(buttons=0, relative_x=0.5)),
+            pipeline.submit(make_event(buttons=0, relative_x=0.6)),
+        ]
+        for waiter in waiters:
+            waiter.wait()
+        self.assertEqual([
+            make_event(relative_x=0.1),
+            make_event(buttons=1, relative_x=0.2),
+            make_event(buttons=1, relative_x=0.4),
+            make_event(buttons=0, relative_x=0.5),
+            make_event(buttons=0, relative_x=0.6),
+        ], self.written_events(mock_send_mouse_event))
+        self.assertEqual(1, pipeline.stats.merged)
+
+    def test_never_drops_wheel_events(self, mock_send_mouse_event):
+        pipeline = mouse_pipeline.MousePipeline('/dev/hidg1')
+        waiters = [
+            pipeline.submit(make_event(vertical_wheel_delta=1)),
+            pipeline.submit(make_event(vertical_wheel_delta=1)),
+            pipeline.submit(make_event(vertical_wheel_delta=1)),
+        ]
+        for waiter in waiters:
+            waiter.wait()
+        self.assertEqual([make_event(vertical_wheel_delta=1)] * 3,
+                         self.written_events(mock_send_mouse_event))
+        self.assertEqual(0, pipeline.stats.merged)
+        self.assertEqual(0, pipeline.stats.dropped)
+
+    def test_drops_identical_consecutive_events(self, mock_send_mouse_event):
+        pipeline = mouse_pipeline.MousePipeline('/dev/hidg1')
+        self.assertTrue(pipeline.submit(make_event(relative_x=0.1)).wait())
+        self.assertTrue(pipeline.submit(make_event(relative_x=0.1)).wait())
+        self.assertEqual([make_event(relative_x=0.1)],
+                         self.written_events(mock_send_mouse_event))
+        self.assertEqual(1, pipeline.stats.dropped)
+
+    def test_reports_outcome_of_write_to_duplicate_of_event_in_flight(
+            self, mock_send_mouse_event):
+
+        def fail_after_yielding(*_):
+            eventlet.sleep(0.01)
+            raise hid_write.WriteError('Failed to write to HID interface')
+
+        mock_send_mouse_event.side_effect = fail_after_yielding
+        pipeline = mouse_pipeline.MousePipeline('/dev/hidg1')
+        first_waiter = pipeline.submit(make_event(relative_x=0.1))
+        # Let the worker start writing the first event.
+        eventlet.sleep(0)
+        duplicate_waiter = pipeline.submit(make_event(relative_x=0.1))
+
+        self.assertFalse(first_waiter.wait())
+        self.assertFalse(duplicate_waiter.wait())
+        self.assertEqual(1, mock_send_mouse_event.call_count)
+
+    def test_reports_failed_writes(self, mock_send_mouse_event):
+        mock_send_mouse_event.side_effect = hid_write.WriteError(
+            'Failed to write to HID interface')
+        pipeline = mouse_pipeline.MousePipeline('/dev/hidg1')
+        self.assertFalse(pipeline.submit(make_event()).wait())
+        self.assertEqual(1, pipeline.stats.failed)
+        self.assertEqual(0, pipeline.stats.written)
+
+    def test_keeps_writing_after_os_error(self, mock_send_mouse_event):
+        mock_send_mouse_event.side_effect = [
+            OSError(108, 'Cannot send after shutdown'), None
+        ]
+        pipeline = mouse_pipeline.MousePipeline('/dev/hidg1')
+        # The second event is pending while the first one fails.
+        waiters = [
+            pipeline.submit(make_event(buttons=1)),
+            pipeline.submit(make_event(buttons=0)),
+        ]
+        self.assertEqual([False, True],
+                         [waiter.wait(timeout=1) for waiter in waiters])
+        self.assertEqual(0, pipeline.depth)
+        self.assertEqual(1, pipeline.stats.failed)
+
+    def test_writes_retry_of_failed_event(self, mock_send_mouse_event):
+        mock_send_mouse_event.side_effect = [
+            hid_write.WriteError('Failed to write to HID interface'), None
+        ]
+        pipeline = mouse_pipeline.MousePipeline('/dev/hidg1')
+        self.assertFalse(pipeline.submit(make_event(relative_x=0.1)).wait())
+        self.assertTrue(pipeline.submit(make_event(relative_x=0.1)).wait())
+        self.assertEqual(2, mock_send_mouse_event.call_count)
+        self.assertEqual(0, pipeline.stats.dropped)
+
+    @mock.patch.object(mouse_pipeline, '_MAX_PENDING_EVENTS', 2)
+    def test_blocks_submission_while_queue_is_full(self, mock_send_mouse_event):
+        pipeline = mouse_pipeline.MousePipeline('/dev/hidg1')
+        depths = []
+        mock_send_mouse_event.side_effect = (
+            lambda *args: depths.append(pipeline.depth))
+
+        waiters = [
+            pipeline.submit(make_event(vertical_wheel_delta=1))
+            for _ in range(6)
+        ]
+
+        self.assertTrue(all(waiter.wait() for waiter in waiters))
+        self.assertEqual([make_event(vertical_wheel_delta=1)] * 6,
+                         self.written_events(mock_send_mouse_event))
+        self.assertLessEqual(max(depths), 2)
+
+    def test_signals_backpressure_and_drain(self, mock_send_mouse_event):
+        on_backpressure = mock.Mock()
+        pipeline = mouse_pipeline.MousePipeline('/dev/hidg1', on_backpressure)
+
+        waiters = [
+            pipeline.submit(make_event(vertical_wheel_delta=1))
+            for _ in range(6)
+        ]
+        for waiter in waiters:
+            waiter.wait()
+        eventlet.sleep(0)
+
+        self.assertEqual(6, mock_send_mouse_event.call_count)
+        self.assertEqual(2, on_backpressure.call_count)
+        self.assertEqual(mock.call(4, None), on_backpressure.call_args_list[0])
+        depth, drain_rate = on_backpressure.call_args_list[1].args
+        self.assertEqual(0, depth)
+        self.assertGreater(drain_rate, 0)
+
+    def test_does_not_signal_backpressure_for_short_queue(
+            self, mock_send_mouse_event):
+        on_backpressure = mock.Mock()
+        pipeline = mouse_pipeline.MousePipeline('/dev/hidg1', on_backpressure)
+
+        waiters = [
+            pipeline.submit(make_event(vertical_wheel_delta=1))
+            for _ in range(3)
+        ]
+        for waiter in waiters:
+            waiter.wait()
+        eventlet.sleep(0)
+
+        self.assertEqual(3, mock_send_mouse_event.call_count)
+        on_backpressure.assert_not_called()
@@ -1,3 +1,24 @@
+"""Hashes and verifies passwords.
+
+Hashing a password takes tens to hundreds of milliseconds of CPU time on a
+Raspberry Pi. In a greenlet, that would freeze the eventlet hub, including the
+input events of all other clients, so the hashing runs on dedicated native
+threads instead, where `hashlib` releases the GIL. The threads run at a low CPU
+priority, so that they don't compete with the hub when there are fewer CPU
+cores than busy threads. (We don't use eventlet's shared pool of native threads,
+`eventlet.tpool`, because an unprivileged process can't raise the priority of a
+thread again, so all other users of the pool would run at low priority, too.)
+
+Only a limited number of hashes run at once, so that a burst of login attempts
+can't claim all CPU cores. Further login attempts wait for their turn, but
+only up to a limit, beyond which we turn them away.
+"""
+import concurrent.futures
+import os
+import threading
+
+import eventlet.hubs
+import eventlet.semaphore
 from passlib.hash import pbkdf2_sha256
 
 # pylint fails to recognize this as a global constant.
@@ -7,10 +28,88 @@ _CUSTOM_PBKDF2 = pbkdf2_sha256.using(rounds=50000)
 # pylint can't follow pbkdf'2 members for some reason.
 # pylint: disable=no-member
 
+# The maximum number of hashes that run at the same time.
+_MAX_CONCURRENT_HASHES = 1
+
+# The maximum number of verifications that wait for a free hashing slot. This
+# only applies to verifications (i.e., login attempts), because they don't
+# require authentication.
+_MAX_WAITING_VERIFICATIONS = 8
+
+# The nice value of the threads that hash passwords, so that they don't take CPU
+# time away from the eventlet hub when the CPU cores are busy.
+_HASHING_NICENESS = 19
+
+_hashing_slots = eventlet.semaphore.Semaphore(_MAX_CONCURRENT_HASHES)
+
+
+def _lower_thread_priority():
+    # On Linux, the nice value applies to the calling thread only.
+    os.setpriority(os.PRIO_PROCESS, threading.get_native_id(),
+                   _HASHING_NICENESS)
+
+
+_hashing_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=_MAX_CONCURRENT_HASHES,
+    thread_name_prefix='password-hashing',
+    initializer=_lower_thread_priority)
+
+
+class Error(Exception):
+    pass
+
+
+class TooManyVerificationsError(Error):
+    pass
+
 
 def generate_hash(password):
-    return _CUSTOM_PBKDF2.hash(password)
+    with _hashing_slots:
+        return _run_on_hashing_thread(_CUSTOM_PBKDF2.hash, password)
 
 
 def verify(password, password_hash):
-    return _CUSTOM_PBKDF2.verify(password, password_hash)
+    """Checks whether a password matches a password hash.
+
+    Returns:
+        True if the password matches.
+
+    Raises:
+        TooManyVerificationsError: If too many other verifications are waiting
+            already.
+    """
+    # A negative balance is the number of greenlets waiting for a slot.
+    if _hashing_slots.balance <= -_MAX_WAITING_VERIFICATIONS:
+        raise TooManyVerificationsError(
+            'Too many login attempts in progress, please try again later')
+    with _hashing_slots:
+        return _run_on_hashing_thread(_CUSTOM_PBKDF2.verify, password,
+                                      password_hash)
+
+
+def _run_on_hashing_thread(function, *args):
+    # The greenlet waits for the result on a pipe, which the eventlet hub can
+    # watch without blocking other greenlets. The hashing thread closes the
+    # write end itself, because the greenlet might be gone by then.
+    read_fd, write_fd = os.pipe()
+    try:
+        try:
+            future = _hashing_executor.submit(function, *args)
+        except BaseException:
+            os.close(write_fd)
+            raise
+        future.add_done_callback(lambda _: _notify_and_close(write_fd))
+        eventlet.hubs.trampoline(read_fd, read=True)
+        return future.result()
+    finally:
+        os.close(read_fd)
+
+
+def _notify_and_close(write_fd):
+    try:
+        os.write(write_fd, b'\0')
+    except BrokenPipeError:
+        # The waiting greenlet has given up already.
+        pass
+    finally:
+        os.close(write_fd)
@@ -0,0 +1,55 @@
+import os
+import threading
+import unittest
+from unittest import mock
+
+import eventlet.semaphore
+import eventlet.tpool
+
+import password
+
+
+class PasswordTest(unittest.TestCase):
+
+    def test_verifies_password_against_its_hash(self):
+        password_hash = password.generate_hash('p4ssw0rd')
+
+        self.assertTrue(password.verify('p4ssw0rd', password_hash))
+        self.assertFalse(password.verify('pa55word', password_hash))
+
+    def test_rejects_verification_if_too_many_are_waiting(self):
+        password_hash = password.generate_hash('p4ssw0rd')
+
+        # No slots are free, and no further verification may wait for one.
+        with mock.patch.object(password, '_hashing_slots',
+                               eventlet.semaphore.Semaphore(0)), \
+                mock.patch.object(password, '_MAX_WAITING_VERIFICATIONS', 0):
+            with self.assertRaises(password.TooManyVerificationsError):
+                password.verify('p4ssw0rd', password_hash)
+
+    def test_releases_slot_after_verification(self):
+        password_hash = password.generate_hash('p4ssw0rd')
+
+        password.verify('p4ssw0rd', password_hash)
+
+        # pylint: disable=protected-access
+        self.assertEqual(password._MAX_CONCURRENT_HASHES,
+                         password._hashing_slots.balance)
+
+    def test_hashes_on_low_priority_thread(self):
+        # pylint: disable=protected-access
+        niceness = password._run_on_hashing_thread(_get_thread_niceness)
+
+        self.assertEqual(password._HASHING_NICENESS, niceness)
+
+    def test_leaves_priority_of_shared_native_threads_alone(self):
+        expected_niceness = _get_thread_niceness()
+
+        password.generate_hash('p4ssw0rd')
+
+        self.assertEqual(expected_niceness,
+                         eventlet.tpool.execute(_get_thread_niceness))
+
+
+def _get_thread_niceness():
+    return os.getpriority(os.PRIO_PROCESS, threading.get_native_id())
@@ -0,0 +1,328 @@
+"""Types pasted text on the target system.
+
+Pasting a text means writing a long stream of keyboard reports, which can take a
+while. So paste jobs write their reports in a background greenlet, and they
+report their progress through a callback, which allows clients to follow along.
+A job can be cancelled at any point. If it's cancelled while writing, the job
+releases all keys, so that no key remains pressed on the target system.
+
+The reports of two jobs must never interleave, because that would garble the
+typed text. Therefore, all jobs go through a single queue, which runs them one
+after the other, in the order in which they were submitted. Other jobs that
+type on the keyboard (e.g., macro playbacks, see `macro_player`) share that
+queue.
+
+Some target systems drop keystrokes if they arrive too quickly (e.g., BIOS
+menus), so a job can be paced to write a limited number of reports per second.
+"""
+import collections
+import enum
+import logging
+import time
+import uuid
+
+import eventlet
+import eventlet.event
+
+import threads
+import utc
+from hid import keyboard as fake_keyboard
+from hid import reports
+from hid import write as hid_write
+
+logger = logging.getLogger(__name__)
+
+# The pace at which to write the keyboard reports for particular kinds of target
+# systems, in reports per second. In the compiled report stream (see
+# `fake_keyboard.compile_keystrokes`), most keystrokes take a single report, and
+# only repeated keys take two (press and release). So every report can be a key
+# press, and the pace is also the maximum number of key presses per second that
+# the target system has to handle: 250 for Windows, 125 for macOS, and 30 for
+# BIOS menus. `None` means that the reports are written as fast as the target
+# system reads them from the keyboard interface.
+PACING_PROFILES = {
+    'default': None,
+    'windows': 250,
+    'macos': 125,
+    'bios': 30,
+}
+
+# The minimum interval between two progress notifications of a job.
+_PROGRESS_INTERVAL_SECONDS = 0.1
+
+# The number of finished jobs to remember, so that clients can still retrieve
+# the outcome of a job after it has finished.
+_MAX_FINISHED_JOBS = 50
+
+
+class Error(Exception):
+    pass
+
+
+class NoSuchJobError(Error):
+    pass
+
+
+class Status(enum.Enum):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+
+class Job:  # pylint: disable=too-many-instance-attributes
+    """A job that writes a stream of keyboard reports to the target system."""
+
+    def __init__(self, keyboard_path, report_stream, reports_per_second,
+                 on_progress):
+        """Creates a new paste job.
+
+        Args:
+            keyboard_path: The file path to the keyboard interface.
+            report_stream: The keyboard reports as `bytes` (see
+                `hid.keyboard.compile_keystrokes`).
+            reports_per_second: The maximum number of reports to write per
+                second (as int or float), or `None` to write the reports as
+                fast as the target system accepts them.
+            on_progress: A function that gets called with the job as its only
+                argument whenever the job starts or finishes, and periodically
+                while the job is writing.
+        """
+        self.job_id = uuid.uuid4().hex
+        self.status = Status.QUEUED
+        self.submitted_at = utc.now()
+        self.reports_total = len(report_stream) // reports.KEYBOARD_REPORT_SIZE
+        self.reports_written = 0
+        self._keyboard_path = keyboard_path
+        self._report_stream = report_stream
+        self._interval_seconds = (1 / reports_per_second
+                                  if reports_per_second else 0)
+        self._on_progress = on_progress
+        self._is_cancel_requested = False
+        self._submitted_time = time.monotonic()
+        self._started_time = None
+        self._finished_time = None
+        self._finished = eventlet.event.Event()
+
+    def is_finished(self):
+        return self._finished.ready()
+
+    @property
+    def wait_seconds(self):
+        """The time that the job spent (or has spent so far) in the queue."""
+        end_time = (self._started_time or self._finished_time or
+                    time.monotonic())
+        return end_time - self._submitted_time
+
+    @property
+    def run_seconds(self):
+        """The time that the job spent (or has spent so far) writing.
+
+        If the job hasn't started writing, it's `None`.
+        """
+        if self._started_time is None:
+            return None
+        return (self._finished_time or time.monotonic()) - self._started_time
+
+    def wait(self, timeout_seconds):
+        """Waits for the job to finish.
+
+        Args:
+            timeout_seconds: The maximum time to wait (as int or float).
+
+        Returns:
+            True if the job has finished, or False if the timeout expired.
+        """
+        self._finished.wait(timeout=timeout_seconds)
+        return self.is_finished()
+
+    def cancel(self):
+        """Cancels the job.
+
+        A queued job is cancelled right away. A running job stops before
+        writing its next report. Cancelling a finished job has no effect.
+        """
+        if self.status == Status.QUEUED:
+            self._finish(Status.CANCELLED)
+        self._is_cancel_requested = True
+
+    def run(self):
+        """Writes the reports to the keyboard interface."""
+        self.status = Status.RUNNING
+        self._started_time = time.monotonic()
+        self._on_progress(self)
+        status = Status.FAILED
+        try:
+            status = self._write_reports()
+        except hid_write.WriteError as e:
+            logger.error('Failed to paste text: %s', e)
+        finally:
+            # If the job stopped halfway, a key might still be pressed.
+            if status != Status.DONE and self.reports_written:
+                self._release_inputs()
+            self._finish(status)
+
+    def _write_reports(self):
+        next_write_at = time.monotonic()
+        next_progress_at = next_write_at + _PROGRESS_INTERVAL_SECONDS
+        for offset in range(0, len(self._report_stream),
+                            reports.KEYBOARD_REPORT_SIZE):
+            # Yield even if the job isn't paced, so that long pastes don't
+            # starve the other greenlets (e.g., the Socket.IO handlers).
+            threads.reschedule(max(0.0, next_write_at - time.monotonic()))
+            if self._is_cancel_requested:
+                return Status.CANCELLED
+            hid_write.write_to_hid_interface(
+                self._keyboard_path,
+                self._report_stream[offset:offset +
+                                    reports.KEYBOARD_REPORT_SIZE])
+            self.reports_written += 1
+
+            now = time.monotonic()
+            # If a write took longer than the interval, don't try to catch up,
+            # because a burst of reports is what the pacing should prevent.
+            next_write_at = max(next_write_at + self._interval_seconds, now)
+            if now >= next_progress_at:
+                self._on_progress(self)
+                next_progress_at = now + _PROGRESS_INTERVAL_SECONDS
+        return Status.DONE
+
+    def _release_inputs(self):
+        _release_keys(self._keyboard_path)
+
+    def _finish(self, status):
+        self.status = status
+        self._finished_time = time.monotonic()
+        self._finished.send()
+        self._on_progress(self)
+
+
+def _release_keys(keyboard_path):
+    try:
+        fake_keyboard.release_keys(keyboard_path)
+    except hid_write.WriteError as e:
+        logger.error('Failed to release keys after paste: %s', e)
+
+
+class JobQueue:
+    """Runs paste jobs one after the other, in the order of submission."""
+
+    def __init__(self):
+        # A mapping of job IDs to `Job` objects, in the order of submission.
+        self._jobs = collections.OrderedDict()
+        self._pending = collections.deque()
+        self._worker = None
+
+    def submit(self, job):
+        self._jobs[job.job_id] = job
+        self._forget_old_jobs()
+        self._pending.append(job)
+        if self._worker is None:
+            self._worker = eventlet.spawn(self._process_pending)
+
+    def get(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise NoSuchJobError(f'There is no paste job with ID {job_id}')
+        return job
+
+    def jobs(self):
+        return list(self._jobs.values())
+
+    def _forget_old_jobs(self):
+        finished_job_ids = [
+            job_id for job_id, job in self._jobs.items() if job.is_finished()
+        ]
+        for job_id in finished_job_ids[:-_MAX_FINISHED_JOBS]:
+            del self._jobs[job_id]
+
+    def _process_pending(self):
+        try:
+            while self._pending:
+                job = self._pending.popleft()
+                # The job might have been cancelled while it was queued.
+                if job.status != Status.QUEUED:
+                    continue
+                try:
+                    job.run()
+                except Exception:  # pylint: disable=broad-exception-caught
+                    # Don't let a single broken job block all subsequent jobs.
+                    logger.exception('Paste job %s failed unexpectedly',
+                                     job.job_id)
+        finally:
+            self._worker = None
+
+
+_queue = JobQueue()
+
+
+def submit(keyboard_path, report_stream, reports_per_second, on_progress):
+    """Submits a paste job to the queue.
+
+    Args:
+        keyboard_path: The file path to the keyboard interface.
+        report_stream: The keyboard reports as `bytes` (see
+            `hid.keyboard.compile_keystrokes`).
+        reports_per_second: The maximum number of reports to write per second,
+            or `None` for no limit.
+        on_progress: A function that gets called with the job as its only
+            argument whenever the job starts or finishes, and periodically
+            while the job is writing.
+
+    Returns:
+        The `Job` object of the submitted job.
+    """
+    job = Job(keyboard_path, report_stream, reports_per_second, on_progress)
+    enqueue(job)
+    return job
+
+
+def enqueue(job):
+    """Adds a job to the queue.
+
+    Args:
+        job: A `Job` object (or an object of a subclass), which hasn't run yet.
+    """
+    _queue.submit(job)
+
+
+def get(job_id):
+    """Retrieves a paste job.
+
+    Args:
+        job_id: The ID of the job (as string).
+
+    Returns:
+        The `Job` object.
+
+    Raises:
+        NoSuchJobError: If there is no job with the given ID (anymore).
+    """
+    return _queue.get(job_id)
+
+
+def jobs():
+    """Returns all queued, running, and recently finished jobs.
+
+    Returns:
+        A list of `Job` objects, in the order of submission.
+    """
+    return _queue.jobs()
+
+
+def cancel(job_id):
+    """Cancels a paste job.
+
+    Args:
+        job_id: The ID of the job (as string).
+
+    Returns:
+        The `Job` object of the cancelled job.
+
+    Raises:
+        NoSuchJobError: If there is no job with the given ID (anymore).
+    """
+    job = _queue.get(job_id)
+    job.cancel()
+    return job
@@ -0,0 +1,223 @@
+import time
+import unittest
+from unittest import mock
+
+import eventlet
+
+import paste_engine
+from hid import write as hid_write
+
+# Three keyboard reports: press A, press B, release all keys.
+REPORT_STREAM = (b'\x00\x00\x04\x00\x00\x00\x00\x00'
+                 b'\x00\x00\x05\x00\x00\x00\x00\x00'
+                 b'\x00\x00\x00\x00\x00\x00\x00\x00')
+
+
+def written_reports(mock_write):
+    return [call.args[1] for call in mock_write.call_args_list]
+
+
+def make_job(reports_per_second=None, on_progress=None):
+    return paste_engine.Job('/dev/hidg0',
+                            REPORT_STREAM,
+                            reports_per_second,
+                            on_progress=on_progress or mock.Mock())
+
+
+@mock.patch.object(paste_engine.hid_write, 'write_to_hid_interface')
+class JobTest(unittest.TestCase):
+
+    def test_writes_all_reports_in_order(self, mock_write):
+        on_progress = mock.Mock()
+        job = make_job(on_progress=on_progress)
+
+        job.run()
+
+        self.assertEqual([
+            b'\x00\x00\x04\x00\x00\x00\x00\x00',
+            b'\x00\x00\x05\x00\x00\x00\x00\x00',
+            b'\x00\x00\x00\x00\x00\x00\x00\x00',
+        ], written_reports(mock_write))
+        mock_write.assert_called_with('/dev/hidg0', mock.ANY)
+        self.assertEqual(paste_engine.Status.DONE, job.status)
+        self.assertTrue(job.is_finished())
+        self.assertEqual(3, job.reports_total)
+        self.assertEqual(3, job.reports_written)
+        on_progress.assert_called_with(job)
+
+    def test_paces_reports(self, mock_write):
+        job = make_job(reports_per_second=50)
+
+        job.run()
+
+        self.assertEqual(3, mock_write.call_count)
+        # Three reports take two intervals of 20ms each.
+        self.assertGreaterEqual(job.run_seconds, 0.04)
+
+    def test_cancels_running_job_and_releases_keys(self, mock_write):
+        job = make_job()
+        mock_write.side_effect = lambda *_: job.cancel()
+
+        job.run()
+
+        self.assertEqual([
+            b'\x00\x00\x04\x00\x00\x00\x00\x00',
+            b'\x00\x00\x00\x00\x00\x00\x00\x00',
+        ], written_reports(mock_write))
+        self.assertEqual(paste_engine.Status.CANCELLED, job.status)
+        self.assertEqual(1, job.reports_written)
+
+    def test_fails_job_on_write_error_and_releases_keys(self, mock_write):
+        mock_write.side_effect = [
+            None,
+            hid_write.WriteError('Failed to write to HID interface'),
+            None,
+        ]
+        on_progress = mock.Mock()
+        job = make_job(on_progress=on_progress)
+
+        job.run()
+
+        self.assertEqual(b'\x00\x00\x00\x00\x00\x00\x00\x00',
+                         written_reports(mock_write)[-1])
+        self.assertEqual(paste_engine.Status.FAILED, job.status)
+        self.assertEqual(1, job.reports_written)
+        on_progress.assert_called_with(job)
+
+    def test_cancels_queued_job_immediately(self, _):
+        on_progress = mock.Mock()
+        job = make_job(on_progress=on_progress)
+
+        job.cancel()
+
+        self.assertEqual(paste_engine.Status.CANCELLED, job.status)
+        self.assertTrue(job.is_finished())
+        self.assertIsNone(job.run_seconds)
+        on_progress.assert_called_once_with(job)
+
+    def test_ignores_cancelling_finished_job(self, _):
+        job = make_job()
+        job.run()
+
+        job.cancel()
+
+        self.assertEqual(paste_engine.Status.DONE, job.status)
+
+    def test_measures_wait_time_until_job_starts(self, _):
+        job = make_job()
+        time.sleep(0.02)
+        job.run()
+        wait_seconds = job.wait_seconds
+        time.sleep(0.02)
+
+        self.assertGreaterEqual(wait_seconds, 0.02)
+        self.assertEqual(wait_seconds, job.wait_seconds)
+
+
+def submit_job(reports_per_second=None):
+    return paste_engine.submit('/dev/hidg0',
+                               REPORT_STREAM,
+                               reports_per_second,
+                               on_progress=mock.Mock())
+
+
+@mock.patch.object(paste_engine.hid_write, 'write_to_hid_interface')
+class JobQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(paste_engine, '_queue',
+                                    paste_engine.JobQueue())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.cancel_all_jobs)
+
+    def cancel_all_jobs(self):
+        # Don't let unfinished jobs write anything during subsequent tests.
+        for job in paste_engine.jobs():
+            job.cancel()
+            job.wait(timeout_seconds=1)
+
+    def test_runs_job_in_background(self, mock_write):
+        job = submit_job()
+        self.assertEqual(paste_engine.Status.QUEUED, job.status)
+
+        self.assertTrue(job.wait(timeout_seconds=1))
+        self.assertEqual(paste_engine.Status.DONE, job.status)
+        self.assertEqual(3, mock_write.call_count)
+
+    def test_runs_jobs_one_after_the_other_in_order(self, mock_write):
+        first_job = submit_job(reports_per_second=100)
+        second_job = submit_job(reports_per_second=100)
+
+        self.assertTrue(second_job.wait(timeout_seconds=1))
+        self.assertEqual(paste_engine.Status.DONE, first_job.status)
+        self.assertEqual(paste_engine.Status.DONE, second_job.status)
+        # The reports of the two jobs don't interleave.
+        self.assertEqual(REPORT_STREAM * 2,
+                         b''.join(written_reports(mock_write)))
+        self.assertGreaterEqual(second_job.wait_seconds, first_job.run_seconds)
+
+    def test_cancels_queued_job_without_affecting_others(self, mock_write):
+        first_job = submit_job(reports_per_second=100)
+        second_job = submit_job(reports_per_second=100)
+        third_job = submit_job(reports_per_second=100)
+
+        paste_engine.cancel(second_job.job_id)
+
+        self.assertTrue(third_job.wait(timeout_seconds=1))
+        self.assertEqual(paste_engine.Status.DONE, first_job.status)
+        self.assertEqual(paste_engine.Status.CANCELLED, second_job.status)
+        self.assertEqual(paste_engine.Status.DONE, third_job.status)
+        self.assertEqual(6, mock_write.call_count)
+
+    def test_cancels_running_job_and_proceeds_with_next(self, mock_write):
+        first_job = submit_job(reports_per_second=10)
+        second_job = submit_job()
+        eventlet.sleep(0.05)
+        self.assertEqual(paste_engine.Status.RUNNING, first_job.status)
+
+        paste_engine.cancel(first_job.job_id)
+
+        self.assertTrue(second_job.wait(timeout_seconds=1))
+        self.assertEqual(paste_engine.Status.CANCELLED, first_job.status)
+        self.assertEqual(paste_engine.Status.DONE, second_job.status)
+        # The first report and the release of the first job, plus all reports
+        # of the second job.
+        self.assertEqual(5, mock_write.call_count)
+
+    def test_continues_with_next_job_after_unexpected_error(self, mock_write):
+        mock_write.side_effect = [FileNotFoundError('/dev/hidg0')] + [None] * 3
+        first_job = submit_job()
+        second_job = submit_job()
+
+        self.assertTrue(second_job.wait(timeout_seconds=1))
+        self.assertEqual(paste_engine.Status.FAILED, first_job.status)
+        self.assertEqual(paste_engine.Status.DONE, second_job.status)
+
+    def test_retrieves_jobs_in_order_of_submission(self, _):
+        first_job = submit_job()
+        second_job = submit_job()
+
+        self.assertEqual([first_job, second_job], paste_engine.jobs())
+        self.assertEqual(second_job, paste_engine.get(second_job.job_id))
+
+    def test_forgets_oldest_finished_jobs(self, _):
+        with mock.patch.object(paste_engine, '_MAX_FINISHED_JOBS', 2):
+            first_job = submit_job()
+            first_job.cancel()
+            second_job = submit_job()
+            second_job.cancel()
+            third_job = submit_job()
+            third_job.cancel()
+            fourth_job = submit_job()
+
+            self.assertEqual([second_job, third_job, fourth_job],
+                             paste_engine.jobs())
+            with self.assertRaises(paste_engine.NoSuchJobError):
+                paste_engine.get(first_job.job_id)
+
+    def test_rejects_unknown_job(self, _):
+        with self.assertRaises(paste_engine.NoSuchJobError):
+            paste_engine.get('unknown-job-id')
+        with self.assertRaises(paste_engine.NoSuchJobError):
+            paste_engine.cancel('unknown-job-id')
@@ -0,0 +1,128 @@
+"""Parses input events in the compact binary wire format.
+
+Clients can opt into the binary wire format when they connect (see
+`socket_api.on_connect`). Instead of JSON dictionaries, they then send keyboard
+and mouse events as a few bytes each, which are cheaper to transmit and to
+parse. The encoding is close to the HID reports, so the events need little
+translation before they can be written to the HID interfaces.
+
+A keystroke consists of 2 bytes:
+- Byte 0: modifier bitmask, in the same bit order as in HID keyboard reports
+          (see `hid.keycodes.MODIFIER_*`)
+- Byte 1: key code ID, i.e., the position of the JavaScript key code in
+          `js_to_hid.KEY_CODES`
+
+A mouse event consists of 7 bytes (little-endian):
+- Byte 0:   buttons bitmask, like the `buttons` field of a JSON mouse event
+- Byte 1-2: x position as fixed-point number, from 0 (left) to 0x7fff (right)
+- Byte 3-4: y position as fixed-point number, from 0 (top) to 0x7fff (bottom)
+- Byte 5:   vertical wheel delta (signed), like in a JSON mouse event
+- Byte 6:   horizontal wheel delta (signed), like in a JSON mouse event
+"""
+import struct
+
+import js_to_hid
+from request_parsers import mouse_event as mouse_event_request
+
+KEYSTROKE_SIZE = 2
+
+_MOUSE_EVENT_FORMAT = struct.Struct('<BHHbb')
+MOUSE_EVENT_SIZE = _MOUSE_EVENT_FORMAT.size
+
+# The largest fixed-point position, which corresponds to a relative position of
+# 1.0. It matches the LOGICAL_MAXIMUM in the mouse HID descriptor, so positions
+# map exactly to HID units.
+MAX_POSITION = 0x7fff
+
+# JavaScript only supports 5 mouse buttons.
+_MAX_BUTTON_STATE = pow(2, 5) - 1
+
+
+class Error(Exception):
+    pass
+
+
+class MalformedMessageError(Error):
+    pass
+
+
+class InvalidKeyCodeError(Error):
+    pass
+
+
+class InvalidButtonStateError(Error):
+    pass
+
+
+class InvalidPositionError(Error):
+    pass
+
+
+class InvalidWheelValueError(Error):
+    pass
+
+
+def parse_keystroke(message):
+    """Parses a keystroke in the binary wire format.
+
+    Args:
+        message: The encoded keystroke as `bytes`.
+
+    Returns:
+        A HID Keystroke object.
+
+    Raises:
+        MalformedMessageError: If the message doesn't have the right size.
+        InvalidKeyCodeError: If the key code ID is unknown.
+    """
+    if not isinstance(message, bytes) or len(message) != KEYSTROKE_SIZE:
+        raise MalformedMessageError(
+            f'Keystroke is invalid, expecting {KEYSTROKE_SIZE} bytes')
+    modifier, key_code_id = message
+    try:
+        return js_to_hid.convert_key_code_id(modifier, key_code_id)
+    except js_to_hid.UnrecognizedKeyCodeError as e:
+        raise InvalidKeyCodeError(str(e)) from e
+
+
+def parse_mouse_event(message):
+    """Parses a mouse event in the binary wire format.
+
+    Args:
+        message: The encoded mouse event as `bytes`.
+
+    Returns:
+        A `request_parsers.mouse_event.MouseEvent` object, which is equal to
+        the one of the equivalent JSON mouse event.
+
+    Raises:
+        MalformedMessageError: If the message doesn't have the right size.
+        InvalidButtonStateError: If the buttons bitmask has an invalid value.
+        InvalidPositionError: If the x or y position is out of range.
+        InvalidWheelValueError: If a wheel delta has an invalid value.
+    """
+    if not isinstance(message, bytes) or len(message) != MOUSE_EVENT_SIZE:
+        raise MalformedMessageError(
+            f'Mouse event is invalid, expecting {MOUSE_EVENT_SIZE} bytes')
+    # pylint: disable=invalid-name
+    buttons, x, y, vertical_wheel_delta, horizontal_wheel_delta = (
+        _MOUSE_EVENT_FORMAT.unpack(message))
+    if buttons > _MAX_BUTTON_STATE:
+        raise InvalidButtonStateError(
+            f'Button state must be <= {_MAX_BUTTON_STATE:#x}: {buttons}')
+    if x > MAX_POSITION or y > MAX_POSITION:
+        raise InvalidPositionError(
+            f'Position must be <= {MAX_POSITION:#x}: ({x}, {y})')
+    if (vertical_wheel_delta not in (-1, 0, 1) or
+            horizontal_wheel_delta not in (-1, 0, 1)):
+        raise InvalidWheelValueError(
+            'Wheel value must be -1, 0, or 1: '
+            f'({vertical_wheel_delta}, {horizontal_wheel_delta})')
+    # Dividing by the maximum is exact enough that scaling the relative position
+    # back to HID units yields the original value (see `hid.mouse`).
+    return mouse_event_request.MouseEvent(
+        buttons=buttons,
+        relative_x=x / MAX_POSITION,
+        relative_y=y / MAX_POSITION,
+        vertical_wheel_delta=vertical_wheel_delta,
+        horizontal_wheel_delta=horizontal_wheel_delta)
@@ -0,0 +1,78 @@
+import unittest
+
+import js_to_hid
+from hid import keycodes as hid
+from hid import mouse as fake_mouse
+from request_parsers import binary_input
+from request_parsers import mouse_event
+
+
+class ParseKeystrokeTest(unittest.TestCase):
+
+    def test_parses_keystroke(self):
+        key_code_id = js_to_hid.KEY_CODES.index('KeyA')
+        self.assertEqual(
+            hid.Keystroke(keycode=hid.KEYCODE_A,
+                          modifier=hid.MODIFIER_LEFT_SHIFT),
+            binary_input.parse_keystroke(
+                bytes((hid.MODIFIER_LEFT_SHIFT, key_code_id))))
+
+    def test_rejects_message_of_wrong_size(self):
+        for message in (b'', b'\x00', b'\x00\x00\x00'):
+            with self.subTest(message=message):
+                with self.assertRaises(binary_input.MalformedMessageError):
+                    binary_input.parse_keystroke(message)
+
+    def test_rejects_message_that_is_not_binary(self):
+        with self.assertRaises(binary_input.MalformedMessageError):
+            binary_input.parse_keystroke({'code': 'KeyA'})
+
+    def test_rejects_unknown_key_code_id(self):
+        with self.assertRaises(binary_input.InvalidKeyCodeError):
+            binary_input.parse_keystroke(b'\x00\xff')
+
+
+class ParseMouseEventTest(unittest.TestCase):
+
+    def test_parses_mouse_event(self):
+        self.assertEqual(
+            mouse_event.MouseEvent(buttons=1,
+                                   relative_x=0.0,
+                                   relative_y=1.0,
+                                   vertical_wheel_delta=-1,
+                                   horizontal_wheel_delta=1),
+            binary_input.parse_mouse_event(b'\x01\x00\x00\xff\x7f\xff\x01'))
+
+    def test_positions_map_exactly_to_hid_units(self):
+        # pylint: disable=protected-access
+        for position in range(binary_input.MAX_POSITION + 1):
+            message = bytes((0, position & 0xff, position >> 8, 0, 0, 0, 0))
+            parsed = binary_input.parse_mouse_event(message)
+            self.assertEqual(
+                (position, 0),
+                fake_mouse._scale_mouse_coordinates(parsed.relative_x,
+                                                    parsed.relative_y))
+
+    def test_rejects_message_of_wrong_size(self):
+        for message in (b'', b'\x00' * 6, b'\x00' * 8):
+            with self.subTest(message=message):
+                with self.assertRaises(binary_input.MalformedMessageError):
+                    binary_input.parse_mouse_event(message)
+
+    def test_rejects_invalid_button_state(self):
+        with self.assertRaises(binary_input.InvalidButtonStateError):
+            binary_input.parse_mouse_event(b'\x20\x00\x00\x00\x00\x00\x00')
+
+    def test_rejects_position_out_of_range(self):
+        for message in (b'\x00\x00\x80\x00\x00\x00\x00',
+                        b'\x00\x00\x00\x00\x80\x00\x00'):
+            with self.subTest(message=message):
+                with self.assertRaises(binary_input.InvalidPositionError):
+                    binary_input.parse_mouse_event(message)
+
+    def test_rejects_invalid_wheel_value(self):
+        for message in (b'\x00\x00\x00\x00\x00\x02\x00',
+                        b'\x00\x00\x00\x00\x00\x00\xfe'):
+            with self.subTest(message=message):
+                with self.assertRaises(binary_input.InvalidWheelValueError):
+                    binary_input.parse_mouse_event(message)
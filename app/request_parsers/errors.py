@@ -44,3 +44,27 @@ class UnsupportedPastedCharacterError(Error):
 
 class InvalidUserRoleError(Error):
     pass
+
+
+class InvalidPastePacingError(Error):
+    pass
+
+
+class InvalidPasteJobIdError(Error):
+    pass
+
+
+class InvalidPasteWaitTimeError(Error):
+    pass
+
+
+class InvalidMacroNameError(Error):
+    pass
+
+
+class InvalidMacroIdError(Error):
+    pass
+
+
+class InvalidMacroSpeedError(Error):
+    pass
@@ -0,0 +1,96 @@
+import dataclasses
+
+from request_parsers import keystroke as keystroke_request
+from request_parsers import mouse_event as mouse_event_request
+
+# Arbitrary limit, but just to prevent anything crazy.
+_MAX_BATCH_SIZE = 256
+
+
+class Error(Exception):
+    pass
+
+
+class MalformedBatchError(Error):
+    pass
+
+
+class BatchTooLargeError(Error):
+    pass
+
+
+class MalformedItemError(Error):
+    pass
+
+
+class UnknownItemTypeError(Error):
+    pass
+
+
+@dataclasses.dataclass
+class KeyRelease:
+    """An event that releases all keys on the keyboard."""
+
+
+@dataclasses.dataclass
+class Batch:
+    # A list of (index, event) tuples of the valid items, in the order of the
+    # batch. The index refers to the item's position in the batch, and the event
+    # is either a `request_parsers.keystroke.Keystroke`, a `KeyRelease`, or a
+    # `request_parsers.mouse_event.MouseEvent` object.
+    events: list
+    # The positions of the invalid items in the batch.
+    invalid_indices: list
+
+
+def parse_hid_batch(message):
+    """Parses a batch of keyboard and mouse events.
+
+    An invalid item doesn't invalidate the entire batch. Instead, the returned
+    batch lists the positions of the invalid items, so that the caller can still
+    apply the valid ones.
+
+    Args:
+        message: A JSON list of dictionaries, each of which has a `type` field
+            with one of the following values:
+            - `keystroke`: The other fields are the same as in a `keystroke`
+                message (see `request_parsers.keystroke`).
+            - `keyRelease`: No other fields.
+            - `mouseEvent`: The other fields are the same as in a `mouse-event`
+                message (see `request_parsers.mouse_event`).
+
+    Returns:
+        A Batch object.
+
+    Raises:
+        MalformedBatchError: If the message is not a list.
+        BatchTooLargeError: If the message contains too many items.
+    """
+    if not isinstance(message, list):
+        raise MalformedBatchError('Batch is invalid, expecting a JSON list')
+    if len(message) > _MAX_BATCH_SIZE:
+        raise BatchTooLargeError(
+            f'Batch must not contain more than {_MAX_BATCH_SIZE} items')
+
+    events = []
+    invalid_indices = []
+    for index, item in enumerate(message):
+        try:
+            events.append((index, _parse_item(item)))
+        except (Error, keystroke_request.Error, mouse_event_request.Error):
+            invalid_indices.append(index)
+    return Batch(events=events, invalid_indices=invalid_indices)
+
+
+def _parse_item(item):
+    if not isinstance(item, dict):
+        raise MalformedItemError(
+            'Batch item is invalid, expecting a JSON dictionary')
+    item_type = item.get('type')
+    if item_type == 'keystroke':
+        return keystroke_request.parse_keystroke(item)
+    if item_type == 'keyRelease':
+        return KeyRelease()
+    if item_type == 'mouseEvent':
+        return mouse_event_request.parse_mouse_event(item)
+    raise UnknownItemTypeError(f'Unknown batch item type: {item_type}')
@@ -0,0 +1,90 @@
+import unittest
+
+from request_parsers import hid_batch
+from request_parsers import keystroke
+from request_parsers import mouse_event
+
+
+class HidBatchParserTest(unittest.TestCase):
+
+    def test_parses_valid_batch_in_order(self):
+        batch = hid_batch.parse_hid_batch([
+            {
+                'type': 'keystroke',
+                'shiftLeft': True,
+                'key': 'A',
+                'code': 'KeyA',
+            },
+            {
+                'type': 'keyRelease',
+            },
+            {
+                'type': 'mouseEvent',
+                'buttons': 1,
+                'relativeX': 0.5,
+                'relativeY': 0.75,
+                'verticalWheelDelta': 0,
+                'horizontalWheelDelta': 0,
+            },
+        ])
+        self.assertEqual([
+            (0,
+             keystroke.Keystroke(left_ctrl_modifier=False,
+                                 right_ctrl_modifier=False,
+                                 left_shift_modifier=True,
+                                 right_shift_modifier=False,
+                                 left_alt_modifier=False,
+                                 right_alt_modifier=False,
+                                 left_meta_modifier=False,
+                                 right_meta_modifier=False,
+                                 key='A',
+                                 code='KeyA')),
+            (1, hid_batch.KeyRelease()),
+            (2,
+             mouse_event.MouseEvent(buttons=1,
+                                    relative_x=0.5,
+                                    relative_y=0.75,
+                                    vertical_wheel_delta=0,
+                                    horizontal_wheel_delta=0)),
+        ], batch.events)
+        self.assertEqual([], batch.invalid_indices)
+
+    def test_parses_empty_batch(self):
+        self.assertEqual(hid_batch.Batch(events=[], invalid_indices=[]),
+                         hid_batch.parse_hid_batch([]))
+
+    def test_reports_invalid_items_and_keeps_valid_ones(self):
+        batch = hid_batch.parse_hid_batch([
+            'not a dictionary',
+            {
+                'type': 'keyRelease',
+            },
+            {
+                'type': 'keystroke',
+                'key': 'A',
+            },
+            {
+                'type': 'mouseEvent',
+                'buttons': 1,
+                'relativeX': 1.5,
+                'relativeY': 0.75,
+                'verticalWheelDelta': 0,
+                'horizontalWheelDelta': 0,
+            },
+            {
+                'type': 'gamepad',
+            },
+            {
+                'code': 'KeyA',
+            },
+        ])
+        self.assertEqual([(1, hid_batch.KeyRelease())], batch.events)
+        self.assertEqual([0, 2, 3, 4, 5], batch.invalid_indices)
+
+    def test_rejects_batch_that_is_not_a_list(self):
+        with self.assertRaises(hid_batch.MalformedBatchError):
+            hid_batch.parse_hid_batch({'type': 'keyRelease'})
+
+    def test_rejects_batch_with_too_many_items(self):
+        with self.assertRaises(hid_batch.BatchTooLargeError):
+            hid_batch.parse_hid_batch([{'type': 'keyRelease'}] * 257)
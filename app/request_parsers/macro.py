@@ -0,0 +1,86 @@
+import math
+
+import macro_player
+from request_parsers import errors
+from request_parsers import json
+
+_MAX_NAME_LENGTH = 100
+
+
+def parse_macro_name(message):
+    """Parses the name under which to save a recorded macro.
+
+    Args:
+        message: A dictionary from a Socket.IO message, with the following
+            fields:
+            (str) name
+
+    Returns:
+        The name as string, without surrounding whitespace.
+
+    Raises:
+        MalformedRequestError: If the message isn't a dictionary.
+        InvalidMacroNameError: If the name is invalid.
+    """
+    if not isinstance(message, dict):
+        raise errors.MalformedRequestError(
+            'Message is invalid, expecting a JSON dictionary')
+    name = message.get('name')
+    if not isinstance(name, str) or not name.strip():
+        raise errors.InvalidMacroNameError(
+            'The name must be a non-empty string')
+    name = name.strip()
+    if len(name) > _MAX_NAME_LENGTH:
+        raise errors.InvalidMacroNameError(
+            f'The name must not be longer than {_MAX_NAME_LENGTH} characters')
+    return name
+
+
+def parse_macro_id(request):
+    """Parses the ID of a macro from the request.
+
+    Args:
+        request: Flask request with the following fields in the JSON body:
+            (int) id
+
+    Returns:
+        The macro ID as int.
+
+    Raises:
+        InvalidMacroIdError: If the macro ID is not an integer.
+    """
+    # pylint: disable=unbalanced-tuple-unpacking
+    (macro_id,) = json.parse_json_body(request, required_fields=['id'])
+    # Note: In Python, `bool` is a subclass of `int`.
+    if not isinstance(macro_id, int) or isinstance(macro_id, bool):
+        raise errors.InvalidMacroIdError('The macro ID must be an integer')
+    return macro_id
+
+
+def parse_speed(request):
+    """Parses the playback speed of a macro from the request.
+
+    Args:
+        request: Flask request with the following optional fields in the JSON
+            body:
+            (int|float) speed: The factor by which to speed up the recorded
+                delays. Defaults to 1.
+
+    Returns:
+        The speed as int or float.
+
+    Raises:
+        InvalidMacroSpeedError: If the speed is invalid.
+    """
+    json_body = request.get_json()
+    if not isinstance(json_body, dict):
+        raise errors.MalformedRequestError(
+            'Request is invalid, expecting a JSON dictionary')
+    speed = json_body.get('speed', 1)
+    if (not isinstance(speed, (int, float)) or isinstance(speed, bool) or
+            not math.isfinite(speed) or
+            not macro_player.MIN_SPEED <= speed <= macro_player.MAX_SPEED):
+        raise errors.InvalidMacroSpeedError(
+            f'The speed must be a number between {macro_player.MIN_SPEED} and'
+            f' {macro_player.MAX_SPEED}')
+    return speed
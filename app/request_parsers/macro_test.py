@@ -0,0 +1,59 @@
+import unittest
+from unittest import mock
+
+from request_parsers import errors
+from request_parsers import macro
+
+
+def make_mock_request(json_data):
+    mock_request = mock.Mock()
+    mock_request.get_json.return_value = json_data
+    return mock_request
+
+
+class MacroNameParserTest(unittest.TestCase):
+
+    def test_accepts_name_and_strips_whitespace(self):
+        self.assertEqual('Boot menu',
+                         macro.parse_macro_name({'name': ' Boot menu  '}))
+
+    def test_rejects_invalid_name(self):
+        for name in (None, '', '   ', 5, 'a' * 101):
+            with self.subTest(name=name):
+                with self.assertRaises(errors.InvalidMacroNameError):
+                    macro.parse_macro_name({'name': name})
+
+    def test_rejects_non_dictionary_message(self):
+        with self.assertRaises(errors.MalformedRequestError):
+            macro.parse_macro_name('Boot menu')
+
+
+class MacroIdParserTest(unittest.TestCase):
+
+    def test_accepts_integer(self):
+        self.assertEqual(3, macro.parse_macro_id(make_mock_request({'id': 3})))
+
+    def test_rejects_non_integer(self):
+        for macro_id in ('3', 3.0, True, None):
+            with self.subTest(macro_id=macro_id):
+                with self.assertRaises(errors.InvalidMacroIdError):
+                    macro.parse_macro_id(make_mock_request({'id': macro_id}))
+
+
+class SpeedParserTest(unittest.TestCase):
+
+    def test_defaults_to_recorded_speed(self):
+        self.assertEqual(1, macro.parse_speed(make_mock_request({'id': 3})))
+
+    def test_accepts_speed_in_range(self):
+        for speed in (0.1, 2, 100):
+            with self.subTest(speed=speed):
+                self.assertEqual(
+                    speed,
+                    macro.parse_speed(make_mock_request({'speed': speed})))
+
+    def test_rejects_invalid_speed(self):
+        for speed in (0, 0.05, 101, float('nan'), float('inf'), '2', True):
+            with self.subTest(speed=speed):
+                with self.assertRaises(errors.InvalidMacroSpeedError):
+                    macro.parse_speed(make_mock_request({'speed': speed}))
@@ -1,7 +1,20 @@
+import math
+
+import paste_engine
 import text_to_hid
 from request_parsers import errors
 from request_parsers import json
 
+# The maximum time that a client may wait for a paste job to finish in a single
+# request.
+_MAX_WAIT_SECONDS = 60
+
+# The range of explicit paces. Below the minimum, a single job would occupy the
+# paste queue for an excessive time, and above the maximum, the pace would
+# hardly differ from not pacing at all.
+_MIN_REPORTS_PER_SECOND = 1
+_MAX_REPORTS_PER_SECOND = 1000
+
 
 def parse_keystrokes(request):
     """Parses HID keystrokes from the request.
@@ -22,22 +35,106 @@ def parse_keystrokes(request):
     (text,
      language) = json.parse_json_body(request,
                                       required_fields=['text', 'language'])
-    keystrokes = []
-    # Preserve the ordering of any unsupported characters found.
-    unsupported_chars_found = {}
-    for char in text:
-        try:
-            keystroke = text_to_hid.convert(char, language)
-        except text_to_hid.UnsupportedCharacterError:
-            unsupported_chars_found[char] = True
-            continue
-        # Skip ignored characters.
-        if keystroke is None:
-            continue
-        keystrokes.append(keystroke)
-    if unsupported_chars_found:
+    try:
+        return text_to_hid.convert_text(text, language)
+    except text_to_hid.UnsupportedCharactersError as e:
         raise errors.UnsupportedPastedCharacterError(
             f'These characters are not supported: '
-            f'{", ".join(map(repr, unsupported_chars_found.keys()))}')
+            f'{", ".join(map(repr, e.chars))}') from e
+
+
+def parse_reports_per_second(request):
+    """Parses the pace at which to paste the text from the request.
+
+    Args:
+        request: Flask request with the following optional fields in the JSON
+            body:
+            (str) pacing: The name of a pacing profile (see
+                `paste_engine.PACING_PROFILES`). Defaults to `default`.
+            (int|float) reportsPerSecond: An explicit pace between 1 and
+                1000, which takes precedence over the pacing profile.
+
+    Returns:
+        The maximum number of reports per second as int or float, or `None`
+        if the reports shouldn't be paced.
+
+    Raises:
+        InvalidPastePacingError: If the pace is invalid.
+    """
+    json_body = request.get_json()
+    if not isinstance(json_body, dict):
+        raise errors.MalformedRequestError(
+            'Request is invalid, expecting a JSON dictionary')
+
+    reports_per_second = json_body.get('reportsPerSecond')
+    if reports_per_second is not None:
+        # Note: In Python, `bool` is a subclass of `int`.
+        if (not isinstance(reports_per_second, (int, float)) or
+                isinstance(reports_per_second, bool) or
+                not math.isfinite(reports_per_second) or
+                not _MIN_REPORTS_PER_SECOND <= reports_per_second <=
+                _MAX_REPORTS_PER_SECOND):
+            raise errors.InvalidPastePacingError(
+                'The reportsPerSecond value must be a number between'
+                f' {_MIN_REPORTS_PER_SECOND} and {_MAX_REPORTS_PER_SECOND}')
+        return reports_per_second
+
+    pacing = json_body.get('pacing', 'default')
+    profiles = paste_engine.PACING_PROFILES
+    if not isinstance(pacing, str) or pacing not in profiles:
+        raise errors.InvalidPastePacingError(f'The pacing must be one of: '
+                                             f'{", ".join(profiles)}')
+    return profiles[pacing]
+
+
+def parse_job_id(request):
+    """Parses the ID of a paste job from the request.
+
+    Args:
+        request: Flask request with the following fields in the JSON body:
+            (str) id
+
+    Returns:
+        The job ID as string.
+
+    Raises:
+        InvalidPasteJobIdError: If the job ID is not a string.
+    """
+    # pylint: disable=unbalanced-tuple-unpacking
+    (job_id,) = json.parse_json_body(request, required_fields=['id'])
+    if not isinstance(job_id, str):
+        raise errors.InvalidPasteJobIdError('The job ID must be a string')
+    return job_id
+
+
+def parse_job_query(request):
+    """Parses a query for a paste job from the request's URL parameters.
+
+    Args:
+        request: Flask request with the following URL parameters:
+            (str) id
+            (str) waitSeconds: Optional. The maximum time to wait for the job
+                to finish, as number between 0 and 60. Defaults to 0.
+
+    Returns:
+        A tuple of the job ID (as string) and the maximum time to wait (as
+        float).
+
+    Raises:
+        MissingFieldError: If the job ID is missing.
+        InvalidPasteWaitTimeError: If the wait time is invalid.
+    """
+    job_id = request.args.get('id')
+    if not job_id:
+        raise errors.MissingFieldError('Missing required parameter: id')
 
-    return keystrokes
+    raw_wait_seconds = request.args.get('waitSeconds', '0')
+    try:
+        wait_seconds = float(raw_wait_seconds)
+    except ValueError as e:
+        raise errors.InvalidPasteWaitTimeError(
+            'The waitSeconds value must be a number') from e
+    if not 0 <= wait_seconds <= _MAX_WAIT_SECONDS:
+        raise errors.InvalidPasteWaitTimeError(
+            f'The waitSeconds value must be between 0 and {_MAX_WAIT_SECONDS}')
+    return job_id, wait_seconds
@@ -59,3 +59,121 @@ class KeystrokesParserTest(unittest.TestCase):
                                  'text': '12\r\n3',
                                  'language': 'en-US'
                              })))
+
+
+class ReportsPerSecondParserTest(unittest.TestCase):
+
+    def test_defaults_to_unpaced(self):
+        self.assertIsNone(
+            paste.parse_reports_per_second(
+                make_mock_request({
+                    'text': 'abc',
+                    'language': 'en-US'
+                })))
+
+    def test_accepts_pacing_profile(self):
+        self.assertEqual(
+            30,
+            paste.parse_reports_per_second(
+                make_mock_request({
+                    'text': 'abc',
+                    'language': 'en-US',
+                    'pacing': 'bios'
+                })))
+
+    def test_accepts_explicit_pace(self):
+        self.assertEqual(
+            12.5,
+            paste.parse_reports_per_second(
+                make_mock_request({
+                    'text': 'abc',
+                    'language': 'en-US',
+                    'pacing': 'bios',
+                    'reportsPerSecond': 12.5
+                })))
+
+    def test_rejects_unknown_pacing_profile(self):
+        with self.assertRaises(errors.InvalidPastePacingError):
+            paste.parse_reports_per_second(
+                make_mock_request({
+                    'text': 'abc',
+                    'language': 'en-US',
+                    'pacing': 'amiga'
+                }))
+
+    def test_accepts_explicit_pace_within_limits(self):
+        for reports_per_second in [1, 1000]:
+            with self.subTest(reports_per_second=reports_per_second):
+                self.assertEqual(
+                    reports_per_second,
+                    paste.parse_reports_per_second(
+                        make_mock_request({
+                            'text': 'abc',
+                            'language': 'en-US',
+                            'reportsPerSecond': reports_per_second
+                        })))
+
+    def test_rejects_invalid_pace(self):
+        for reports_per_second in [
+                0, -5, 1e-9, 0.99, 1000.5, '100', True,
+                float('nan')
+        ]:
+            with self.subTest(reports_per_second=reports_per_second):
+                with self.assertRaises(errors.InvalidPastePacingError):
+                    paste.parse_reports_per_second(
+                        make_mock_request({
+                            'text': 'abc',
+                            'language': 'en-US',
+                            'reportsPerSecond': reports_per_second
+                        }))
+
+
+class JobIdParserTest(unittest.TestCase):
+
+    def test_accepts_job_id(self):
+        self.assertEqual(
+            'abc123', paste.parse_job_id(make_mock_request({'id': 'abc123'})))
+
+    def test_rejects_missing_job_id(self):
+        with self.assertRaises(errors.MissingFieldError):
+            paste.parse_job_id(make_mock_request({}))
+
+    def test_rejects_non_string_job_id(self):
+        with self.assertRaises(errors.InvalidPasteJobIdError):
+            paste.parse_job_id(make_mock_request({'id': 123}))
+
+
+def make_mock_query_request(args):
+    mock_request = mock.Mock()
+    mock_request.args = args
+    return mock_request
+
+
+class JobQueryParserTest(unittest.TestCase):
+
+    def test_accepts_job_id_without_wait_time(self):
+        self.assertEqual(
+            ('abc123', 0.0),
+            paste.parse_job_query(make_mock_query_request({'id': 'abc123'})))
+
+    def test_accepts_job_id_with_wait_time(self):
+        self.assertEqual(('abc123', 2.5),
+                         paste.parse_job_query(
+                             make_mock_query_request({
+                                 'id': 'abc123',
+                                 'waitSeconds': '2.5'
+                             })))
+
+    def test_rejects_missing_job_id(self):
+        with self.assertRaises(errors.MissingFieldError):
+            paste.parse_job_query(make_mock_query_request({}))
+
+    def test_rejects_invalid_wait_time(self):
+        for wait_seconds in ['soon', '-1', '61', 'nan']:
+            with self.subTest(wait_seconds=wait_seconds):
+                with self.assertRaises(errors.InvalidPasteWaitTimeError):
+                    paste.parse_job_query(
+                        make_mock_query_request({
+                            'id': 'abc123',
+                            'waitSeconds': wait_seconds
+                        }))
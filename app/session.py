@@ -45,7 +45,7 @@ def login(username):
     logger.info_sensitive('Started session for user %s', username)
 
 
-def is_auth_valid(satisfies_role=None):
+def is_auth_valid(satisfies_role=None, session_data=None):
     """Checks whether a session’s auth state is valid.
 
     This method effectively performs a combined authentication and
@@ -74,6 +74,9 @@ def is_auth_valid(satisfies_role=None):
 
     Args:
         satisfies_role: (auth.Role) Optional.
+        session_data: (dict) Optional. The session data to check instead of
+            the current Flask session (e.g., as decoded from a session cookie
+            outside of a Flask request).
 
     Returns:
         Bool
@@ -87,8 +90,8 @@ def is_auth_valid(satisfies_role=None):
 
     # If the session does not contain any user information, it means the user
     # didn’t authenticate albeit they are required to. We deny access.
-    username = get_username()
-    credentials_last_changed = _get_credentials_last_changed()
+    username = get_username(session_data)
+    credentials_last_changed = _get_credentials_last_changed(session_data)
     if not username or not credentials_last_changed:
         return False
 
@@ -136,19 +139,27 @@ def logout():
         del flask.session['credentials_last_changed']
 
 
-def _get_credentials_last_changed():
+def _get_credentials_last_changed(session_data=None):
     """Returns a timestamp or None if there is no logged-in user."""
-    if 'credentials_last_changed' not in flask.session:
+    if session_data is None:
+        session_data = flask.session
+    if 'credentials_last_changed' not in session_data:
         return None
 
     return datetime.datetime.fromisoformat(
-        flask.session['credentials_last_changed'])
+        session_data['credentials_last_changed'])
 
 
-def get_username():
+def get_username(session_data=None):
     """Returns the username of the currently logged-in user.
 
+    Args:
+        session_data: (dict) Optional. The session data to read instead of the
+            current Flask session.
+
     Returns:
         A username as a string or None if there is no logged-in user.
     """
-    return flask.session.get('username')
+    if session_data is None:
+        session_data = flask.session
+    return session_data.get('username')
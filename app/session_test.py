@@ -15,6 +15,15 @@ def do_nothing():
 
 class CheckAuthTest(unittest.TestCase):
 
+    def setUp(self):
+        # Every test has its own database, so the accounts of a previous test
+        # must not be cached anymore.
+        # pylint: disable=protected-access
+        patcher = mock.patch.object(auth, '_account_cache',
+                                    auth._AccountCache())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
     @mock.patch.object(video_service, 'restart', do_nothing)
     @mock.patch.object(session, '_get_credentials_last_changed')
     @mock.patch.object(session, 'get_username')
@@ -242,3 +251,29 @@ class CheckAuthTest(unittest.TestCase):
                 session.is_auth_valid(satisfies_role=auth.Role.ADMIN))
             self.assertFalse(
                 session.is_auth_valid(satisfies_role=auth.Role.OPERATOR))
+
+    @mock.patch.object(video_service, 'restart', do_nothing)
+    @mock.patch.object(db.users.db_connection, 'get')
+    def test_checks_given_session_data(self, mock_get_db):
+        with tempfile.NamedTemporaryFile() as temp_file:
+            db_conn = db.store.create_or_open(temp_file.name)
+            mock_get_db.return_value = db_conn
+            self.addCleanup(db_conn.close)
+            auth.register('admin', 'p4ssw0rd', auth.Role.ADMIN)
+            admin = auth.get_account('admin')
+            session_data = {
+                'username':
+                    'admin',
+                'credentials_last_changed':
+                    admin.credentials_last_changed.isoformat(),
+            }
+
+            self.assertTrue(
+                session.is_auth_valid(satisfies_role=auth.Role.ADMIN,
+                                      session_data=session_data))
+            self.assertFalse(session.is_auth_valid(session_data={}))
+
+            auth.change_password('admin', 'pa55word')
+            self.assertFalse(
+                session.is_auth_valid(satisfies_role=auth.Role.ADMIN,
+                                      session_data=session_data))
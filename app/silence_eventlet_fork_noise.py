@@ -19,8 +19,8 @@ eventlet's `_make_thread_handle`. Anything else, unrelated
 
 The exception is left to fire and the threading state in the child
 ends up partially broken (`_after_fork` aborts at the assertion).
-That's accepted: tinypilot's child processes only run a single HID
-write and exit; nothing introspects threading. Compared to a monkey
+That's accepted: tinypilot's child processes only perform HID writes;
+nothing introspects threading. Compared to a monkey
 patch of `_make_thread_handle` itself, this approach is simpler and
 doesn't depend on eventlet's internals.
 
@@ -1,20 +1,31 @@
-import datetime
 import functools
+import inspect
 import logging
 
 import flask
 import flask_socketio
 
 import auth
+import db.macros
 import env
+import input_sequence
 import js_to_hid
+import key_state
+import macros
+import mouse_pipeline
 import session
 import update_logs
 import utc
 from hid import keyboard as fake_keyboard
+from hid import link_monitor as hid_link_monitor
 from hid import mouse as fake_mouse
+from hid import reports as hid_reports
 from hid import write as hid_write
+from request_parsers import binary_input as binary_input_request
+from request_parsers import errors as request_errors
+from request_parsers import hid_batch as hid_batch_request
 from request_parsers import keystroke as keystroke_request
+from request_parsers import macro as macro_request
 from request_parsers import mouse_event as mouse_event_request
 
 logger = logging.getLogger(__name__)
@@ -22,104 +33,501 @@ logger = logging.getLogger(__name__)
 socketio = flask_socketio.SocketIO()
 socketio.on_namespace(update_logs.Namespace('/updateLogs'))
 
-# A mapping from socket id to timestamps, which is used by
-# `@monitor_auth`. The timestamp is when the next authentication check is due
-# for the respective socket connection.
-_auth_expiry_timestamps = {}
+# A mapping from socket id to the username of the session that the respective
+# socket connection belongs to, for all sockets that passed the auth check. The
+# username is `None` if the system doesn't require authentication.
+_usernames_by_sid = {}
 
+# The reverse of `_usernames_by_sid`: A mapping from username (or `None`) to the
+# set of socket ids of the respective user's sessions.
+_sids_by_username = {}
 
-def monitor_auth(handler):
-    """Decorator that monitors the session’s auth state of the socket.
+# A mapping from socket id to the `mouse_pipeline.MousePipeline` that forwards
+# the mouse events of the respective socket connection.
+_mouse_pipelines = {}
+
+# The socket ids of the clients that send input events in the binary wire format
+# (see `request_parsers.binary_input`).
+_binary_input_sids = set()
+
+# A mapping from socket id to the `key_state.KeyState` of the respective socket
+# connection, for clients that use key-down/key-up mode.
+_key_states = {}
+
+# A mapping from socket id to the `input_sequence.SequenceTracker` of the
+# respective socket connection, for clients that send unacknowledged events.
+_sequence_trackers = {}
+
+# A mapping from socket id to the `macros.Recorder` of the respective socket
+# connection, for clients that are currently recording a macro.
+_macro_recorders = {}
+
+# The minimum time between two `input-status` events to a client.
+_INPUT_STATUS_INTERVAL_SECONDS = 0.25
+
+# The paths to the HID interfaces that input events get written to.
+_keyboard_path = env.KEYBOARD_PATH
+_mouse_path = env.MOUSE_PATH
+
+
+def set_hid_paths(keyboard_path, mouse_path):
+    """Redirects input events to other HID interfaces, e.g., of a fake gadget.
+
+    Clients that are connected already might keep writing to the previous
+    interfaces.
+
+    Args:
+        keyboard_path: The path to the keyboard interface file.
+        mouse_path: The path to the mouse interface file.
+    """
+    # pylint: disable=global-statement
+    global _keyboard_path, _mouse_path
+    _keyboard_path = keyboard_path
+    _mouse_path = mouse_path
 
-    When socket events come in, it checks whether the session still satisfies
-    the auth requirement by making calls to `session.is_auth_valid()`. If the
-    session’s auth state has become invalid, it disconnects the client.
 
-    It doesn’t carry out the check for every incoming socket event, but it
-    caches the result for a short amount of time, before triggering a fresh
-    check. The reason is that a call to `session.is_auth_valid()` might take
-    several milliseconds, and we don’t want to add that latency on every single
-    incoming socket event. So the periodic caching behaviour is a tradeoff
-    between security and performance.
+def monitor_auth(handler):
+    """Decorator that rejects events from sockets whose session was revoked.
+
+    The session's auth state gets checked when the socket connects. Afterwards,
+    credential changes revoke the affected sessions right away (see
+    `_revoke_sessions`), so the decorator only has to check whether the socket
+    is still registered, which doesn't require any database queries. That
+    check catches events that were already underway while the socket got
+    disconnected.
 
     Example of usage:
         @monitor_auth
         def on_socket_event():
             ...
     """
-    cache_ttl_seconds = 10
 
     @functools.wraps(handler)
     def handler_with_auth_check(*args, **kwargs):
-        next_check_due = _auth_expiry_timestamps.get(flask.request.sid, None)
+        if flask.request.sid not in _usernames_by_sid:
+            flask_socketio.disconnect()
+            return None
+        return handler(*args, **kwargs)
 
-        if (not next_check_due) or (utc.now() > next_check_due):
-            if not session.is_auth_valid(satisfies_role=auth.Role.OPERATOR):
-                flask_socketio.disconnect()
-                return None
+    return handler_with_auth_check
 
-            _auth_expiry_timestamps[flask.request.sid] = utc.now(
-            ) + datetime.timedelta(seconds=cache_ttl_seconds)
 
-        return handler(*args, **kwargs)
+def track_sequence(handler):
+    """Decorator that lets clients send input events without acknowledgement.
 
-    return handler_with_auth_check
+    Instead of requesting an acknowledgement, the client passes a sequence
+    number as additional argument after the regular arguments of the event.
+    The outcome of the event is then reported in the next `input-status` event
+    to the client (see `input_sequence`). Events without sequence number are
+    acknowledged as usual.
+
+    The handler must return a dictionary with a `success` field.
+
+    Example of usage:
+        @track_sequence
+        def on_socket_event(message):
+            ...
+    """
+    arg_count = len(inspect.signature(handler).parameters)
+
+    @functools.wraps(handler)
+    def handler_with_sequence_tracking(*args):
+        if len(args) <= arg_count:
+            return handler(*args)
+        seq = args[arg_count]
+        tracker = _get_sequence_tracker()
+        try:
+            tracker.receive(seq)
+        except input_sequence.InvalidSequenceNumberError as e:
+            logger.error_sensitive('Ignoring input event: %s', e)
+            return None
+        result = handler(*args[:arg_count])
+        tracker.complete(seq, is_success=bool(result and result['success']))
+        return None
+
+    return handler_with_sequence_tracking
 
 
 @socketio.on('keystroke')
 @monitor_auth
+@track_sequence
 def on_keystroke(message):
     logger.debug_sensitive('received keystroke message: %s', message)
-    try:
-        keystroke = keystroke_request.parse_keystroke(message)
-    except keystroke_request.Error as e:
-        logger.error_sensitive('Failed to parse keystroke request: %s', e)
+    hid_keystroke = _parse_hid_keystroke(message)
+    if hid_keystroke is None:
         return {'success': False}
+    return {'success': _send_hid_keystroke(hid_keystroke)}
+
+
+@socketio.on('key-down')
+@monitor_auth
+@track_sequence
+def on_key_down(message):
+    """Presses a key until a corresponding `key-up` event arrives.
+
+    Unlike a `keystroke` event, it doesn't release the key right away. Clients
+    opt into this key-down/key-up mode just by sending these events. Clients
+    have to keep sending events while keys are pressed, because otherwise a
+    watchdog releases all keys (see `key_state`).
+
+    Args:
+        message: A keystroke, in the same format as for a `keystroke` event.
+
+    Returns:
+        A dictionary with a `success` field (bool).
+    """
+    logger.debug_sensitive('received key-down message: %s', message)
+    hid_keystroke = _parse_hid_keystroke(message)
+    if hid_keystroke is None:
+        return {'success': False}
+    current_key_state = _get_key_state()
     try:
-        hid_keystroke = js_to_hid.convert(keystroke)
-    except js_to_hid.UnrecognizedKeyCodeError:
-        logger.warning_sensitive('Unrecognized key: %s (keycode=%s)',
-                                 keystroke.key, keystroke.code)
+        current_key_state.press(hid_keystroke)
+    except key_state.TooManyKeysError as e:
+        logger.warning_sensitive('Failed to press key: %s. %s', hid_keystroke,
+                                 e)
+        return {'success': False}
+    except hid_write.WriteError as e:
+        logger.error_sensitive('Failed to write key: %s. %s', hid_keystroke, e)
+        return {'success': False}
+    _record_report(macros.Interface.KEYBOARD, current_key_state.report)
+    return {'success': True}
+
+
+@socketio.on('key-up')
+@monitor_auth
+@track_sequence
+def on_key_up(message):
+    """Releases a key that was pressed with a `key-down` event.
+
+    Args:
+        message: A keystroke, in the same format as for a `keystroke` event.
+
+    Returns:
+        A dictionary with a `success` field (bool).
+    """
+    logger.debug_sensitive('received key-up message: %s', message)
+    hid_keystroke = _parse_hid_keystroke(message)
+    if hid_keystroke is None:
         return {'success': False}
-    keyboard_path = env.KEYBOARD_PATH
+    current_key_state = _get_key_state()
     try:
-        fake_keyboard.send_keystroke(keyboard_path, hid_keystroke)
+        current_key_state.release(hid_keystroke)
     except hid_write.WriteError as e:
-        logger.error_sensitive('Failed to write key: %s (keycode=%s). %s',
-                               keystroke.key, keystroke.code, e)
+        logger.error_sensitive('Failed to release key: %s. %s', hid_keystroke,
+                               e)
         return {'success': False}
+    _record_report(macros.Interface.KEYBOARD, current_key_state.report)
     return {'success': True}
 
 
 @socketio.on('mouse-event')
 @monitor_auth
+@track_sequence
 def on_mouse_event(message):
     try:
-        mouse_move_event = mouse_event_request.parse_mouse_event(message)
-    except mouse_event_request.Error as e:
+        if _is_binary_input(message):
+            mouse_move_event = binary_input_request.parse_mouse_event(message)
+        else:
+            mouse_move_event = mouse_event_request.parse_mouse_event(message)
+    except (binary_input_request.Error, mouse_event_request.Error) as e:
         logger.error_sensitive('Failed to parse mouse event request: %s', e)
         return {'success': False}
-    mouse_path = env.MOUSE_PATH
-    try:
-        fake_mouse.send_mouse_event(mouse_path, mouse_move_event.buttons,
-                                    mouse_move_event.relative_x,
-                                    mouse_move_event.relative_y,
-                                    mouse_move_event.vertical_wheel_delta,
-                                    mouse_move_event.horizontal_wheel_delta)
-    except hid_write.WriteError as e:
-        logger.error_sensitive('Failed to forward mouse event: %s', e)
-        return {'success': False}
-    return {'success': True}
+    # Wait until the event has actually been written (or superseded by a newer
+    # one), so that the client can adapt its rate to the HID write latency.
+    is_success = _submit_mouse_event(mouse_move_event).wait()
+    return {'success': is_success}
 
 
 @socketio.on('keyRelease')
 @monitor_auth
+@track_sequence
 def on_key_release():
-    keyboard_path = env.KEYBOARD_PATH
+    return {'success': _release_keys()}
+
+
+@socketio.on('hid-batch')
+@monitor_auth
+def on_hid_batch(message):
+    """Applies a batch of keyboard and mouse events in order.
+
+    Sending many events in one message saves the overhead that each message
+    incurs (e.g., framing, auth check, and acknowledgement).
+
+    Returns:
+        A dictionary with the following fields:
+            (bool) success: Whether all events were applied successfully.
+            (list) failed: The positions of the events in the batch that were
+                invalid or failed to be applied, in ascending order.
+    """
+    try:
+        batch = hid_batch_request.parse_hid_batch(message)
+    except hid_batch_request.Error as e:
+        logger.error_sensitive('Failed to parse HID batch request: %s', e)
+        return {'success': False, 'failed': []}
+
+    failed_indices = list(batch.invalid_indices)
+    # Consecutive mouse events are submitted without waiting in between, so
+    # that the mouse pipeline can coalesce them. But they have to be written
+    # before any subsequent keyboard event, to preserve the order of events.
+    pending_mouse_events = []
+    for index, event in batch.events:
+        if isinstance(event, mouse_event_request.MouseEvent):
+            pending_mouse_events.append((index, _submit_mouse_event(event)))
+            continue
+        failed_indices += _wait_for_mouse_events(pending_mouse_events)
+        pending_mouse_events = []
+        if isinstance(event, hid_batch_request.KeyRelease):
+            is_success = _release_keys()
+        else:
+            is_success = _send_keystroke(event)
+        if not is_success:
+            failed_indices.append(index)
+    failed_indices += _wait_for_mouse_events(pending_mouse_events)
+
+    failed_indices.sort()
+    return {'success': not failed_indices, 'failed': failed_indices}
+
+
+@socketio.on('macro-record-start')
+@monitor_auth
+def on_macro_record_start():
+    """Starts recording the input events of the client as a macro.
+
+    From then on, the HID reports that result from the client's keyboard and
+    mouse events get recorded, along with the time between them, until the
+    client sends a `macro-record-stop` or `macro-record-cancel` event. If the
+    client was already recording, the previous recording gets discarded.
+
+    Returns:
+        A dictionary with a `success` field (bool).
+    """
+    _macro_recorders[flask.request.sid] = macros.Recorder()
+    return {'success': True}
+
+
+@socketio.on('macro-record-stop')
+@monitor_auth
+def on_macro_record_stop(message):
+    """Stops recording and saves the recorded macro.
+
+    Args:
+        message: A dictionary with a `name` field (string) under which to save
+            the macro.
+
+    Returns:
+        A dictionary with the following fields:
+            (bool) success
+            (int) id: The ID of the saved macro, if successful.
+            (str) error: The reason of the failure, if unsuccessful.
+    """
+    sid = flask.request.sid
+    if sid not in _macro_recorders:
+        return {'success': False, 'error': 'No macro is being recorded'}
     try:
-        fake_keyboard.release_keys(keyboard_path)
+        name = macro_request.parse_macro_name(message)
+    except request_errors.Error as e:
+        # Keep recording, so that the client can retry with a valid name.
+        return {'success': False, 'error': str(e)}
+    macro = _macro_recorders[sid].finish()
+    try:
+        macro_id = db.macros.Macros().add(name, utc.now(), macro)
+    except db.macros.MacroAlreadyExistsError as e:
+        # Keep recording, so that the client can retry with another name.
+        return {'success': False, 'error': str(e)}
+    del _macro_recorders[sid]
+    logger.info('Saved macro %d with %d reports', macro_id, macro.report_count)
+    return {'success': True, 'id': macro_id}
+
+
+@socketio.on('macro-record-cancel')
+@monitor_auth
+def on_macro_record_cancel():
+    """Stops recording and discards the recorded macro."""
+    _macro_recorders.pop(flask.request.sid, None)
+    return {'success': True}
+
+
+def _parse_hid_keystroke(message):
+    """Parses a keystroke message in either the JSON or binary wire format.
+
+    Returns:
+        A HID Keystroke object, or None if the message is invalid.
+    """
+    if _is_binary_input(message):
+        try:
+            return binary_input_request.parse_keystroke(message)
+        except binary_input_request.Error as e:
+            logger.error_sensitive('Failed to parse keystroke request: %s', e)
+            return None
+    try:
+        keystroke = keystroke_request.parse_keystroke(message)
+    except keystroke_request.Error as e:
+        logger.error_sensitive('Failed to parse keystroke request: %s', e)
+        return None
+    return _convert_keystroke(keystroke)
+
+
+def _convert_keystroke(keystroke):
+    try:
+        return js_to_hid.convert(keystroke)
+    except js_to_hid.UnrecognizedKeyCodeError:
+        logger.warning_sensitive('Unrecognized key: %s (keycode=%s)',
+                                 keystroke.key, keystroke.code)
+        return None
+
+
+def _send_keystroke(keystroke):
+    hid_keystroke = _convert_keystroke(keystroke)
+    if hid_keystroke is None:
+        return False
+    return _send_hid_keystroke(hid_keystroke)
+
+
+def _send_hid_keystroke(hid_keystroke):
+    # In key-down/key-up mode, the keystroke must not release the keys that
+    # the client holds down, so it has to go through the key state.
+    current_key_state = _key_states.get(flask.request.sid)
+    if current_key_state is not None:
+        return _tap_key(current_key_state, hid_keystroke)
+    keyboard_path = _keyboard_path
+    try:
+        fake_keyboard.send_keystroke(keyboard_path, hid_keystroke)
+    except hid_write.WriteError as e:
+        logger.error_sensitive('Failed to write key: %s. %s', hid_keystroke, e)
+        return False
+    for report in fake_keyboard.keystroke_reports(hid_keystroke):
+        _record_report(macros.Interface.KEYBOARD, report)
+    return True
+
+
+def _tap_key(current_key_state, hid_keystroke):
+    try:
+        tapped_reports = current_key_state.tap(hid_keystroke)
+    except key_state.TooManyKeysError as e:
+        logger.warning_sensitive('Failed to press key: %s. %s', hid_keystroke,
+                                 e)
+        return False
+    except hid_write.WriteError as e:
+        logger.error_sensitive('Failed to write key: %s. %s', hid_keystroke, e)
+        return False
+    for report in tapped_reports:
+        _record_report(macros.Interface.KEYBOARD, report)
+    return True
+
+
+def _is_binary_input(message):
+    """Checks whether a message is an input event in the binary wire format.
+
+    Binary messages are only accepted from clients that opted into the binary
+    wire format, because the key code IDs are only meaningful to clients that
+    received the list of key codes.
+    """
+    return (isinstance(message, bytes) and
+            flask.request.sid in _binary_input_sids)
+
+
+def _release_keys():
+    keyboard_path = _keyboard_path
+    try:
+        # In key-down/key-up mode, the key state has to reflect the release.
+        current_key_state = _key_states.get(flask.request.sid)
+        if current_key_state is not None:
+            current_key_state.release_all()
+        else:
+            fake_keyboard.release_keys(keyboard_path)
     except hid_write.WriteError as e:
         logger.error_sensitive('Failed to release keys: %s', e)
+        return False
+    _record_report(macros.Interface.KEYBOARD,
+                   hid_reports.KEYBOARD_RELEASE_REPORT)
+    return True
+
+
+def _get_key_state():
+    """Returns the key state of the current client."""
+    current_key_state = _key_states.get(flask.request.sid)
+    if current_key_state is None:
+        current_key_state = key_state.KeyState(_keyboard_path,
+                                               env.KEY_WATCHDOG_SECONDS)
+        _key_states[flask.request.sid] = current_key_state
+    return current_key_state
+
+
+def _get_sequence_tracker():
+    """Returns the sequence tracker of the current client."""
+    sid = flask.request.sid
+    tracker = _sequence_trackers.get(sid)
+    if tracker is None:
+        tracker = input_sequence.SequenceTracker(
+            functools.partial(_emit_input_status, sid),
+            _INPUT_STATUS_INTERVAL_SECONDS)
+        _sequence_trackers[sid] = tracker
+    return tracker
+
+
+def _emit_input_status(sid, status):
+    socketio.emit('input-status', status, to=sid)
+
+
+def _submit_mouse_event(mouse_event):
+    """Submits a mouse event to the mouse pipeline of the current client.
+
+    Returns:
+        An `eventlet.event.Event` (see `mouse_pipeline.MousePipeline.submit`).
+    """
+    # Mouse activity shows that the client is still there, so keys that it
+    # holds down should stay pressed.
+    current_key_state = _key_states.get(flask.request.sid)
+    if current_key_state is not None:
+        current_key_state.keep_alive()
+    # Record the event when it arrives rather than when it gets written, because
+    # the pipeline might merge it into a subsequent event.
+    _record_report(
+        macros.Interface.MOUSE,
+        fake_mouse.mouse_event_report(mouse_event.buttons,
+                                      mouse_event.relative_x,
+                                      mouse_event.relative_y,
+                                      mouse_event.vertical_wheel_delta,
+                                      mouse_event.horizontal_wheel_delta))
+    sid = flask.request.sid
+    pipeline = _mouse_pipelines.get(sid)
+    if pipeline is None:
+        pipeline = mouse_pipeline.MousePipeline(
+            _mouse_path, functools.partial(_emit_input_backpressure, sid))
+        _mouse_pipelines[sid] = pipeline
+    return pipeline.submit(mouse_event)
+
+
+def _emit_input_backpressure(sid, queue_depth, drain_rate):
+    backpressure = {'queueDepth': queue_depth, 'drainRate': drain_rate}
+    socketio.emit('input-backpressure', backpressure, to=sid)
+
+
+def _record_report(interface, report):
+    """Appends a report to the macro that the current client is recording."""
+    recorder = _macro_recorders.get(flask.request.sid)
+    if recorder is None:
+        return
+    try:
+        recorder.record(interface, report)
+    except macros.MacroTooLongError as e:
+        logger.warning('Failed to record report: %s', e)
+
+
+def _wait_for_mouse_events(pending_mouse_events):
+    """Waits until submitted mouse events have been written.
+
+    Args:
+        pending_mouse_events: A list of (index, waiter) tuples, where waiter is
+            the `eventlet.event.Event` of a submitted mouse event.
+
+    Returns:
+        A list of the indices of the mouse events that failed.
+    """
+    return [
+        index for index, waiter in pending_mouse_events if not waiter.wait()
+    ]
 
 
 @socketio.on('connect')
@@ -127,11 +535,97 @@ def on_connect():
     if not session.is_auth_valid(satisfies_role=auth.Role.OPERATOR):
         return False
     logger.info('Client %s connected', flask.request.sid)
+    # Without authentication, the cookie might still carry the username of a
+    # deleted account. File such sockets as anonymous, so that they get
+    # revoked once authentication becomes required.
+    username = None
+    if auth.is_authentication_required():
+        username = session.get_username()
+    _register_session(flask.request.sid, username)
+    # Clients opt into the binary wire format via the connection's query string
+    # (e.g., `/socket.io/?wireFormat=binary`). Clients that don't, or that
+    # predate the binary wire format, keep sending JSON.
+    if flask.request.args.get('wireFormat') == 'binary':
+        _binary_input_sids.add(flask.request.sid)
+        flask_socketio.emit('wire-format', {
+            'format': 'binary',
+            'keyCodes': list(js_to_hid.KEY_CODES),
+        })
+    else:
+        flask_socketio.emit('wire-format', {'format': 'json'})
+    # Subsequent changes get pushed to all clients by `_emit_usb_link_state`.
+    flask_socketio.emit(
+        'usb-link-state',
+        _usb_link_state_to_dict(hid_link_monitor.get_link_state()))
     return True
 
 
 @socketio.on('disconnect')
 def on_disconnect():
-    if flask.request.sid in _auth_expiry_timestamps:
-        del _auth_expiry_timestamps[flask.request.sid]
+    _unregister_session(flask.request.sid)
+    _binary_input_sids.discard(flask.request.sid)
+    # Don't leave any keys pressed on the target system.
+    current_key_state = _key_states.pop(flask.request.sid, None)
+    if current_key_state is not None:
+        current_key_state.close()
+    _macro_recorders.pop(flask.request.sid, None)
+    tracker = _sequence_trackers.pop(flask.request.sid, None)
+    if tracker is not None:
+        tracker.close()
+    pipeline = _mouse_pipelines.pop(flask.request.sid, None)
+    if pipeline is not None:
+        logger.info('Mouse events of client %s: %s', flask.request.sid,
+                    pipeline.stats)
     logger.info('Client %s disconnected', flask.request.sid)
+
+
+def _register_session(sid, username):
+    _usernames_by_sid[sid] = username
+    _sids_by_username.setdefault(username, set()).add(sid)
+
+
+def _unregister_session(sid):
+    if sid not in _usernames_by_sid:
+        return
+    username = _usernames_by_sid.pop(sid)
+    sids = _sids_by_username[username]
+    sids.discard(sid)
+    if not sids:
+        del _sids_by_username[username]
+
+
+def _revoke_sessions(username):
+    """Disconnects the sockets whose sessions a credential change invalidated.
+
+    Args:
+        username: The username of the account that has changed, or `None` if
+            all accounts have changed.
+    """
+    if username is None:
+        sids = [sid for sid, name in _usernames_by_sid.items() if name]
+    else:
+        sids = list(_sids_by_username.get(username, ()))
+    # Once the first account exists, sockets without a logged-in user aren't
+    # allowed anymore.
+    if auth.is_authentication_required():
+        sids += _sids_by_username.get(None, ())
+    for sid in sids:
+        logger.info('Revoking session of client %s', sid)
+        # Unregister the socket first, so that `monitor_auth` rejects events
+        # that are already underway.
+        _unregister_session(sid)
+        socketio.server.disconnect(sid, namespace='/')
+
+
+auth.add_credentials_listener(_revoke_sessions)
+
+
+def _usb_link_state_to_dict(link_state):
+    return {'state': link_state.value}
+
+
+def _emit_usb_link_state(link_state):
+    socketio.emit('usb-link-state', _usb_link_state_to_dict(link_state))
+
+
+hid_link_monitor.add_listener(_emit_usb_link_state)
@@ -3,6 +3,7 @@ import { KeyboardState } from "./keyboardstate.js";
 import { sendKeystroke } from "./keystrokes.js";
 import * as settings from "./settings.js";
 import { OverlayTracker } from "./overlays.js";
+import { BinaryWireFormat } from "./wireformat.js";
 import { logout } from "./controllers.js";
 
 // Suppress ESLint warnings about undefined variables.
@@ -10,8 +11,22 @@ import { logout } from "./controllers.js";
 // page.
 /* global io */
 
-const socket = io();
+// Ask the server to accept input events in the compact binary wire format,
+// unless the user has disabled it. The server confirms the wire format with a
+// "wire-format" event. Until then, or if the server doesn't confirm it, input
+// events are sent as JSON messages.
+const socket = io(
+  settings.isBinaryWireFormatEnabled()
+    ? { query: { wireFormat: "binary" } }
+    : {},
+);
 let connectedToServer = false;
+// The state of the USB link to the target system, as pushed by the server:
+// "connected", "disconnected", or "unknown".
+let usbLinkState = "unknown";
+// The `BinaryWireFormat` for encoding input events, or null if the server
+// expects JSON messages.
+let wireFormat = null;
 
 const keyboardState = new KeyboardState();
 
@@ -59,6 +74,36 @@ function recalculateMouseEventThrottle(
   return Math.min(newThrottle, maxThrottleInMilliseconds);
 }
 
+/**
+ * Calculates the mouse event throttle from the server's backpressure signal,
+ * so that the server's mouse event queue can drain.
+ *
+ * @param {number} currentThrottle - The current throttle in milliseconds.
+ * @param {number} queueDepth - The number of mouse events that are waiting to
+ *     be written on the server.
+ * @param {number|null} drainRate - The number of mouse events per second that
+ *     the server currently writes, or null if unknown.
+ * @returns {number} The new throttle in milliseconds.
+ */
+function recalculateMouseEventThrottleFromBackpressure(
+  currentThrottle,
+  queueDepth,
+  drainRate,
+) {
+  const maxThrottleInMilliseconds = 2000;
+  if (!drainRate) {
+    return Math.min(currentThrottle + 500, maxThrottleInMilliseconds);
+  }
+  // Don't send events faster than the server writes them, and leave it enough
+  // time to work off the events that are already waiting.
+  const millisecondsPerWrite = 1000 / drainRate;
+  const newThrottle = Math.max(
+    currentThrottle,
+    millisecondsPerWrite * (queueDepth + 1),
+  );
+  return Math.min(newThrottle, maxThrottleInMilliseconds);
+}
+
 function unixTime() {
   return new Date().getTime();
 }
@@ -74,7 +119,7 @@ function processKeystroke(keystroke) {
     return;
   }
   const keystrokeHistoryEvent = keystrokeHistory.push(keystroke.key);
-  const result = sendKeystroke(socket, keystroke);
+  const result = sendKeystroke(socket, keystroke, wireFormat);
   result
     .then(() => {
       keystrokeHistoryEvent.status = "succeeded";
@@ -98,12 +143,38 @@ function onSocketConnect() {
 function onSocketDisconnect() {
   setCursor("disabled", false);
   connectedToServer = false;
+  // The server that we reconnect to might not support the binary wire format
+  // (e.g., after a downgrade), so the wire format has to be negotiated again.
+  wireFormat = null;
   const connectionIndicator =
     document.getElementById("status-bar").connectionIndicator;
   connectionIndicator.connected = false;
   document.getElementById("app").focus();
 }
 
+function onWireFormat({ format, keyCodes }) {
+  // Without the list of key codes, keystrokes can't be encoded, so fall back
+  // to JSON messages.
+  wireFormat =
+    format === "binary" && Array.isArray(keyCodes)
+      ? new BinaryWireFormat(keyCodes)
+      : null;
+}
+
+function onInputBackpressure({ queueDepth, drainRate }) {
+  const remoteScreen = document.getElementById("remote-screen");
+  remoteScreen.millisecondsBetweenMouseEvents =
+    recalculateMouseEventThrottleFromBackpressure(
+      remoteScreen.millisecondsBetweenMouseEvents,
+      queueDepth,
+      drainRate,
+    );
+}
+
+function onUsbLinkState({ state }) {
+  usbLinkState = state;
+}
+
 /**
  * @param {KeyboardEvent} evt - https://developer.mozilla.org/en-US/docs/Web/API/KeyboardEvent
  */
@@ -169,17 +240,22 @@ function sendMouseEvent(
   if (!connectedToServer) {
     return;
   }
+  // The server would reject the event anyway, so don't bother sending it.
+  if (usbLinkState === "disconnected") {
+    return;
+  }
   const remoteScreen = document.getElementById("remote-screen");
+  const mouseEvent = {
+    buttons,
+    relativeX,
+    relativeY,
+    verticalWheelDelta,
+    horizontalWheelDelta,
+  };
   const requestStartTime = unixTime();
   socket.emit(
     "mouse-event",
-    {
-      buttons,
-      relativeX,
-      relativeY,
-      verticalWheelDelta,
-      horizontalWheelDelta,
-    },
+    wireFormat ? wireFormat.encodeMouseEvent(mouseEvent) : mouseEvent,
     (response) => {
       const requestEndTime = unixTime();
       const requestRtt = requestEndTime - requestStartTime;
@@ -486,6 +562,9 @@ shutdownDialog.addEventListener("shutdown-started", () => {
 
 socket.on("connect", onSocketConnect);
 socket.on("disconnect", onSocketDisconnect);
+socket.on("wire-format", onWireFormat);
+socket.on("usb-link-state", onUsbLinkState);
+socket.on("input-backpressure", onInputBackpressure);
 
 // Initialize the remote screen content; use MJPEG by default.
 document.getElementById("remote-screen").enableMjpeg();
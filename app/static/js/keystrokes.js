@@ -1,7 +1,10 @@
-// Send a keystroke message to the backend.
-export function sendKeystroke(socket, keystroke) {
+// Send a keystroke message to the backend. If the server offered the binary
+// wire format (a `BinaryWireFormat` object), the keystroke is sent in binary
+// form, otherwise as JSON.
+export function sendKeystroke(socket, keystroke, wireFormat = null) {
+  const message = wireFormat?.encodeKeystroke(keystroke) ?? keystroke;
   return new Promise((resolve, reject) => {
-    socket.emit("keystroke", keystroke, (result) => {
+    socket.emit("keystroke", message, (result) => {
       if ("success" in result && result.success) {
         resolve({});
       } else {
@@ -10,6 +10,10 @@ const defaults = {
   cursor: "default",
   isKeyboardVisible: true,
   isPasteAreaMasked: false,
+  // Whether to send input events in the compact binary wire format, if the
+  // server supports it. Setting it to false in the browser's local storage
+  // falls back to JSON messages.
+  isBinaryWireFormatEnabled: true,
 };
 
 // Initialize any undefined settings to their default values.
@@ -66,3 +70,7 @@ export function setPasteAreaMasked(isMasked) {
   settings["isPasteAreaMasked"] = isMasked;
   persistSettings();
 }
+
+export function isBinaryWireFormatEnabled() {
+  return settings["isBinaryWireFormatEnabled"];
+}
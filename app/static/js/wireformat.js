@@ -0,0 +1,66 @@
+// The modifier bits, in the same order as in HID keyboard reports.
+const MODIFIER_BITS = [
+  ["ctrlLeft", 1 << 0],
+  ["shiftLeft", 1 << 1],
+  ["altLeft", 1 << 2],
+  ["metaLeft", 1 << 3],
+  ["ctrlRight", 1 << 4],
+  ["shiftRight", 1 << 5],
+  ["altRight", 1 << 6],
+  ["metaRight", 1 << 7],
+];
+
+// The largest fixed-point mouse position, which corresponds to a relative
+// position of 1.0.
+const MAX_POSITION = 0x7fff;
+
+/**
+ * Encodes input events in the compact binary wire format, which the server
+ * offers as alternative to JSON messages. See
+ * `app/request_parsers/binary_input.py` for the format specification.
+ */
+export class BinaryWireFormat {
+  /**
+   * @param {string[]} keyCodes - The key codes that the server supports, as
+   *     sent by the server when the socket connects. A key code is encoded as
+   *     its position in this list.
+   */
+  constructor(keyCodes) {
+    this._keyCodeIds = new Map(keyCodes.map((code, id) => [code, id]));
+  }
+
+  /**
+   * @param {Object} keystroke - Keystroke object, as sent to the server in a
+   *     JSON keystroke message.
+   * @returns {Uint8Array|null} The encoded keystroke, or null if the server
+   *     doesn't support the key code.
+   */
+  encodeKeystroke(keystroke) {
+    const keyCodeId = this._keyCodeIds.get(keystroke.code);
+    if (keyCodeId === undefined) {
+      return null;
+    }
+    let modifier = 0;
+    for (const [field, bit] of MODIFIER_BITS) {
+      if (keystroke[field]) {
+        modifier |= bit;
+      }
+    }
+    return new Uint8Array([modifier, keyCodeId]);
+  }
+
+  /**
+   * @param {Object} mouseEvent - Mouse event object, as sent to the server in
+   *     a JSON mouse-event message.
+   * @returns {Uint8Array} The encoded mouse event.
+   */
+  encodeMouseEvent(mouseEvent) {
+    const view = new DataView(new ArrayBuffer(7));
+    view.setUint8(0, mouseEvent.buttons);
+    view.setUint16(1, Math.round(mouseEvent.relativeX * MAX_POSITION), true);
+    view.setUint16(3, Math.round(mouseEvent.relativeY * MAX_POSITION), true);
+    view.setInt8(5, mouseEvent.verticalWheelDelta);
+    view.setInt8(6, mouseEvent.horizontalWheelDelta);
+    return new Uint8Array(view.buffer);
+  }
+}
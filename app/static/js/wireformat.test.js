@@ -0,0 +1,46 @@
+import { describe, it } from "mocha";
+import assert from "assert";
+import { BinaryWireFormat } from "./wireformat.js";
+
+describe("BinaryWireFormat", () => {
+  const wireFormat = new BinaryWireFormat(["KeyA", "KeyB", "ShiftLeft"]);
+
+  it("encodes keystroke as modifier bitmask and key code ID", () => {
+    assert.deepStrictEqual(
+      wireFormat.encodeKeystroke({
+        ctrlLeft: true,
+        shiftRight: true,
+        key: "B",
+        code: "KeyB",
+      }),
+      new Uint8Array([0x21, 1]),
+    );
+  });
+
+  it("encodes keystroke without modifiers", () => {
+    assert.deepStrictEqual(
+      wireFormat.encodeKeystroke({ key: "a", code: "KeyA" }),
+      new Uint8Array([0, 0]),
+    );
+  });
+
+  it("returns null for unsupported key code", () => {
+    assert.strictEqual(
+      wireFormat.encodeKeystroke({ key: "?", code: "MadeUpCode" }),
+      null,
+    );
+  });
+
+  it("encodes mouse event with fixed-point positions", () => {
+    assert.deepStrictEqual(
+      wireFormat.encodeMouseEvent({
+        buttons: 1,
+        relativeX: 0.5,
+        relativeY: 1.0,
+        verticalWheelDelta: -1,
+        horizontalWheelDelta: 1,
+      }),
+      new Uint8Array([0x01, 0x00, 0x40, 0xff, 0x7f, 0xff, 0x01]),
+    );
+  });
+});
@@ -1,3 +1,5 @@
+import dataclasses
+
 from hid import keycodes as hid
 
 
@@ -9,6 +11,16 @@ class UnsupportedCharacterError(Error):
     pass
 
 
+class UnsupportedCharactersError(UnsupportedCharacterError):
+
+    def __init__(self, chars):
+        super().__init__(
+            f'Unsupported characters: {", ".join(map(repr, chars))}')
+        # The unsupported characters as list, without duplicates, in the order
+        # of their first occurrence.
+        self.chars = chars
+
+
 # Mappings of characters to codes that are shared among different keyboard
 # layouts.
 _COMMON_CHAR_TO_HID_MAP = {
@@ -368,6 +380,47 @@ _DE_CHAR_TO_HID_MAP = _COMMON_CHAR_TO_HID_MAP | {
                       modifier=hid.MODIFIER_LEFT_SHIFT),
 }
 
+# Marks a character in a `_Layout` that has no keystroke in the layout. We can't
+# use `None` for that, because `None` means that the character gets ignored.
+_UNSUPPORTED = object()
+
+# The number of code points that a `_Layout` covers with its lookup table. With
+# 256 code points, the table spans ASCII and Latin-1, which contain nearly all
+# characters of the supported layouts.
+_TABLE_SIZE = 256
+
+
+@dataclasses.dataclass(frozen=True)
+class _Layout:
+    """A keyboard layout, compiled for fast character lookups."""
+    # A tuple of keystrokes, indexed by the code point of the character.
+    table: tuple
+    # A mapping of characters beyond the table to keystrokes.
+    overflow: dict
+
+
+def _compile_layout(char_to_hid_map):
+    table = [_UNSUPPORTED] * _TABLE_SIZE
+    overflow = {}
+    for char, keystroke in char_to_hid_map.items():
+        if ord(char) < _TABLE_SIZE:
+            table[ord(char)] = keystroke
+        else:
+            overflow[char] = keystroke
+    return _Layout(table=tuple(table), overflow=overflow)
+
+
+_LAYOUTS = {
+    'en-GB': _compile_layout(_GB_CHAR_TO_HID_MAP),
+    'en-US': _compile_layout(_US_CHAR_TO_HID_MAP),
+    'de-DE': _compile_layout(_DE_CHAR_TO_HID_MAP),
+}
+
+
+def _get_layout(language):
+    # Default to en-US if no other language matches.
+    return _LAYOUTS.get(language) or _LAYOUTS['en-US']
+
 
 def convert(char, language):
     """Converts a language character into a HID Keystroke object.
@@ -377,24 +430,57 @@ def convert(char, language):
         language: An IETF language tag as a string.
 
     Returns:
-        A HID Keystroke object.
+        A HID Keystroke object, or `None` if the character should be ignored.
 
     Raises:
         UnsupportedCharacterError: If the character is not supported.
     """
-    try:
-        language_map = {
-            'en-GB': _GB_CHAR_TO_HID_MAP,
-            'en-US': _US_CHAR_TO_HID_MAP,
-            'de-DE': _DE_CHAR_TO_HID_MAP,
-        }[language]
-    except KeyError:
-        # Default to en-US if no other language matches.
-        language_map = _US_CHAR_TO_HID_MAP
-
-    try:
-        hid_keystroke = language_map[char]
-    except KeyError as e:
-        raise UnsupportedCharacterError(f'Unsupported character {char}') from e
-
+    layout = _get_layout(language)
+    if ord(char) < _TABLE_SIZE:
+        hid_keystroke = layout.table[ord(char)]
+    else:
+        hid_keystroke = layout.overflow.get(char, _UNSUPPORTED)
+    if hid_keystroke is _UNSUPPORTED:
+        raise UnsupportedCharacterError(f'Unsupported character {char}')
     return hid_keystroke
+
+
+def convert_text(text, language):
+    """Converts a text into a list of HID Keystroke objects.
+
+    Characters that should be ignored (e.g., carriage returns) are skipped.
+
+    Args:
+        text: The text to convert as a string.
+        language: An IETF language tag as a string.
+
+    Returns:
+        A list of HID Keystroke objects.
+
+    Raises:
+        UnsupportedCharactersError: If the text contains characters that are
+            not supported. The error lists all of them.
+    """
+    layout = _get_layout(language)
+    # Bind the lookup structures to local names, which are faster to access in
+    # the loop.
+    table = layout.table
+    overflow = layout.overflow
+    keystrokes = []
+    # Preserve the ordering of any unsupported characters found.
+    unsupported_chars = {}
+    for char in text:
+        code_point = ord(char)
+        if code_point < _TABLE_SIZE:
+            hid_keystroke = table[code_point]
+        else:
+            hid_keystroke = overflow.get(char, _UNSUPPORTED)
+        if hid_keystroke is None:
+            continue
+        if hid_keystroke is _UNSUPPORTED:
+            unsupported_chars[char] = True
+            continue
+        keystrokes.append(hid_keystroke)
+    if unsupported_chars:
+        raise UnsupportedCharactersError(list(unsupported_chars))
+    return keystrokes
@@ -0,0 +1,82 @@
+"""Compares the cost of converting text to keystrokes with the old approach.
+
+Previously, every character was converted on its own, and each conversion
+rebuilt the mapping of languages to keyboard layouts before looking up the
+character. This benchmark measures the time for converting a multi-kilobyte
+text, both with the previous approach and with the current one.
+
+To run the benchmark:
+
+    cd app && python -m text_to_hid_benchmark
+"""
+import timeit
+
+import text_to_hid
+
+_ITERATIONS = 200
+
+# A text with a typical mix of letters, digits, punctuation, and line breaks.
+_TEXT = ('The quick brown fox jumps over the lazy dog.\n'
+         'Pack my box with five dozen liquor jugs! (1234567890)\n') * 64
+
+
+def _legacy_convert(char, language):
+    # pylint: disable=protected-access
+    try:
+        language_map = {
+            'en-GB': text_to_hid._GB_CHAR_TO_HID_MAP,
+            'en-US': text_to_hid._US_CHAR_TO_HID_MAP,
+            'de-DE': text_to_hid._DE_CHAR_TO_HID_MAP,
+        }[language]
+    except KeyError:
+        language_map = text_to_hid._US_CHAR_TO_HID_MAP
+
+    try:
+        hid_keystroke = language_map[char]
+    except KeyError as e:
+        raise text_to_hid.UnsupportedCharacterError(
+            f'Unsupported character {char}') from e
+
+    return hid_keystroke
+
+
+def _legacy_convert_text(text, language):
+    keystrokes = []
+    unsupported_chars_found = {}
+    for char in text:
+        try:
+            keystroke = _legacy_convert(char, language)
+        except text_to_hid.UnsupportedCharacterError:
+            unsupported_chars_found[char] = True
+            continue
+        if keystroke is None:
+            continue
+        keystrokes.append(keystroke)
+    return keystrokes
+
+
+def _per_char_convert_text(text, language):
+    keystrokes = []
+    for char in text:
+        keystroke = text_to_hid.convert(char, language)
+        if keystroke is not None:
+            keystrokes.append(keystroke)
+    return keystrokes
+
+
+def _microseconds_per_call(function):
+    seconds = timeit.timeit(lambda: function(_TEXT, 'en-US'),
+                            number=_ITERATIONS)
+    return seconds / _ITERATIONS * 1e6
+
+
+def main():
+    print(f'Converting {len(_TEXT)} characters')
+    for name, function in (('previous', _legacy_convert_text),
+                           ('per-char', _per_char_convert_text),
+                           ('bulk', text_to_hid.convert_text)):
+        print(f'  {name:<9}{_microseconds_per_call(function):10.1f} us/call')
+
+
+if __name__ == '__main__':
+    main()
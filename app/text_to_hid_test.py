@@ -37,3 +37,49 @@ class ConvertTextToHidTest(unittest.TestCase):
 
     def test_ignored_character(self):
         self.assertEqual(None, text_to_hid.convert('\r', 'en-US'))
+
+    def test_character_beyond_lookup_table(self):
+        self.assertEqual(hid.Keystroke(hid.KEYCODE_E, hid.MODIFIER_ALT_GR),
+                         text_to_hid.convert('€', 'de-DE'))
+        with self.assertRaises(text_to_hid.UnsupportedCharacterError):
+            text_to_hid.convert('€', 'en-US')
+        with self.assertRaises(text_to_hid.UnsupportedCharacterError):
+            text_to_hid.convert('😀', 'en-US')
+
+
+class ConvertTextToHidListTest(unittest.TestCase):
+
+    def test_converts_text(self):
+        self.assertEqual([
+            hid.Keystroke(keycode=hid.KEYCODE_A,
+                          modifier=hid.MODIFIER_LEFT_SHIFT),
+            hid.Keystroke(keycode=hid.KEYCODE_B),
+            hid.Keystroke(keycode=hid.KEYCODE_SPACEBAR),
+            hid.Keystroke(keycode=hid.KEYCODE_E, modifier=hid.MODIFIER_ALT_GR),
+        ], text_to_hid.convert_text('Ab €', 'de-DE'))
+
+    def test_converts_empty_text(self):
+        self.assertEqual([], text_to_hid.convert_text('', 'en-US'))
+
+    def test_skips_ignored_characters(self):
+        self.assertEqual([
+            hid.Keystroke(keycode=hid.KEYCODE_NUMBER_1),
+            hid.Keystroke(keycode=hid.KEYCODE_ENTER),
+        ], text_to_hid.convert_text('1\r\n', 'en-US'))
+
+    def test_defaults_to_us_english_language_mapping(self):
+        self.assertEqual([
+            hid.Keystroke(hid.KEYCODE_NUMBER_2, hid.MODIFIER_LEFT_SHIFT),
+        ], text_to_hid.convert_text('@', 'fake-language'))
+
+    def test_matches_conversion_of_individual_characters(self):
+        text = 'The quick brown fox jumps over the lazy dog! (§1, 100€)'
+        self.assertEqual([text_to_hid.convert(char, 'de-DE') for char in text],
+                         text_to_hid.convert_text(text, 'de-DE'))
+
+    def test_reports_all_unsupported_characters_in_order(self):
+        with self.assertRaises(text_to_hid.UnsupportedCharactersError) as ctx:
+            text_to_hid.convert_text('“Hello” — 😀 “World”', 'en-US')
+        self.assertEqual(['“', '”', '—', '😀'], ctx.exception.chars)
+        self.assertEqual("Unsupported characters: '“', '”', '—', '😀'",
+                         str(ctx.exception))
@@ -1,6 +1,7 @@
 import logging
 import subprocess
 
+import update.pid_file
 import update.result_store
 import update.status
 
@@ -35,5 +36,9 @@ def start_async():
 
     # Ignore pylint since we're not managing the child process.
     # pylint: disable=consider-using-with
-    subprocess.Popen(
+    process = subprocess.Popen(
         ('/usr/bin/sudo', '/usr/sbin/service', 'tinypilot-updater', 'start'))
+
+    # The update service replaces the pid file once it's up. Until then, the
+    # launching process stands in for it.
+    update.pid_file.write(process.pid)
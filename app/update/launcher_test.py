@@ -10,6 +10,11 @@ from update import launcher
 
 class LauncherTest(unittest.TestCase):
 
+    def setUp(self):
+        patcher = mock.patch.object(launcher.update.pid_file, 'write')
+        self.mock_write_pid_file = patcher.start()
+        self.addCleanup(patcher.stop)
+
     @mock.patch.object(launcher.subprocess, 'Popen')
     @mock.patch.object(launcher.update.result_store, 'clear')
     @mock.patch.object(launcher.update.status, 'get')
@@ -53,6 +58,18 @@ class LauncherTest(unittest.TestCase):
             ('/usr/bin/sudo', '/usr/sbin/service', 'tinypilot-updater',
              'start'))
 
+    @mock.patch.object(launcher.subprocess, 'Popen')
+    @mock.patch.object(launcher.update.result_store, 'clear')
+    @mock.patch.object(launcher.update.status, 'get')
+    def test_records_launching_process_in_pid_file(self, mock_status_get, _,
+                                                   mock_popen):
+        mock_status_get.return_value = (update_status.Status.NOT_RUNNING, '')
+        mock_popen.return_value.pid = 1234
+
+        launcher.start_async()
+
+        self.mock_write_pid_file.assert_called_once_with(1234)
+
     @mock.patch.object(launcher.subprocess, 'Popen')
     @mock.patch.object(launcher.update.result_store, 'clear')
     @mock.patch.object(launcher.update.status, 'get')
@@ -65,3 +82,4 @@ class LauncherTest(unittest.TestCase):
 
         mock_clear.assert_not_called()
         mock_popen.assert_not_called()
+        self.mock_write_pid_file.assert_not_called()
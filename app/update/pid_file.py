@@ -0,0 +1,184 @@
+"""Keeps track of the process that performs a TinyPilot update.
+
+While an update is running, the pid file in the ~/logs directory identifies the
+process that performs it. The flow is as follows:
+
+1. When the server launches the update service, it writes the ID of the
+   launching process to the pid file, so that the update counts as in progress
+   before the update service is up.
+2. The update service overwrites the pid file with its own process ID.
+3. Once the update service has written the update result (see
+   `update.result_store`), it removes the pid file.
+
+The update service might get killed before it can remove the pid file (e.g.,
+on a timeout or a power loss), so an update only counts as in progress while
+the process in the pid file is alive. Process IDs get reused, so the pid file
+also records the start time of the process and the ID of the current boot, and
+the process only counts as the same one if both still match.
+
+The server checks the update status frequently while an update is running, so
+it caches the contents of the pid file, and only reads the file again when the
+file changes.
+"""
+
+import dataclasses
+import logging
+import os
+import threading
+
+import atomic_file
+import env
+
+logger = logging.getLogger(__name__)
+
+_PID_FILE_PATH = env.abs_path_in_home_dir('logs/update.pid')
+
+# The file that contains a random ID, which the kernel generates on every boot.
+_BOOT_ID_PATH = '/proc/sys/kernel/random/boot_id'
+
+
+@dataclasses.dataclass(frozen=True)
+class _FileSignature:
+    inode: int
+    size: int
+    modified_ns: int
+
+
+@dataclasses.dataclass(frozen=True)
+class _ProcessStat:
+    # The state code of the process, e.g., `R` (running) or `Z` (zombie).
+    state: str
+    # The time the process started after system boot, in clock ticks.
+    start_time: int
+
+
+@dataclasses.dataclass(frozen=True)
+class _PidFileContents:
+    pid: int
+    start_time: int
+    boot_id: str
+
+
+class _PidFileCache:
+    """Caches the contents of the pid file until the file changes.
+
+    A changed file results in a different `os.stat` signature, which is much
+    cheaper to check than reading and parsing the file.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._signature = None
+        self._contents = None
+
+    def get(self, pid_file_path):
+        """Retrieves the contents of the pid file.
+
+        Args:
+            pid_file_path: The path to the pid file.
+
+        Returns:
+            A `_PidFileContents` object, or None if the pid file doesn't exist
+            or is invalid.
+        """
+        try:
+            stat = os.stat(pid_file_path)
+        except FileNotFoundError:
+            return None
+        signature = _FileSignature(inode=stat.st_ino,
+                                   size=stat.st_size,
+                                   modified_ns=stat.st_mtime_ns)
+        with self._lock:
+            if signature != self._signature:
+                self._contents = _read_pid_file(pid_file_path)
+                self._signature = signature
+            return self._contents
+
+
+_pid_file_cache = _PidFileCache()
+
+
+def is_update_process_running():
+    """Checks whether the process in the pid file is running.
+
+    Returns:
+        True if the pid file exists and the process it refers to is alive.
+    """
+    contents = _pid_file_cache.get(_PID_FILE_PATH)
+    if contents is None:
+        return False
+    # After a reboot, the process ID might refer to an unrelated process.
+    if contents.boot_id != _read_boot_id():
+        return False
+    process_stat = _read_process_stat(contents.pid)
+    if process_stat is None:
+        return False
+    # The launching process becomes a zombie once it exits, because nobody
+    # reaps it, so zombies count as dead.
+    return (process_stat.start_time == contents.start_time and
+            process_stat.state not in ('Z', 'X'))
+
+
+def write(pid):
+    """Writes a process ID to the pid file, replacing any previous one.
+
+    Noop if the process has exited already.
+
+    Args:
+        pid: The process ID (int) of the process that performs the update.
+
+    Raises:
+        OSError if disk operations fail.
+    """
+    process_stat = _read_process_stat(pid)
+    if process_stat is None:
+        logger.warning('Process %d exited before writing the pid file', pid)
+        return
+    os.makedirs(os.path.dirname(_PID_FILE_PATH), exist_ok=True)
+    with atomic_file.create(_PID_FILE_PATH, chmod_mode=0o644) as file:
+        file.write(
+            f'{pid} {process_stat.start_time} {_read_boot_id()}\n'.encode(
+                'utf-8'))
+
+
+def remove():
+    """Removes the pid file. Noop if it doesn't exist."""
+    try:
+        os.remove(_PID_FILE_PATH)
+    except FileNotFoundError:
+        pass
+
+
+def _read_pid_file(pid_file_path):
+    try:
+        with open(pid_file_path, encoding='utf-8') as file:
+            pid, start_time, boot_id = file.read().split()
+        return _PidFileContents(pid=int(pid),
+                                start_time=int(start_time),
+                                boot_id=boot_id)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        logger.warning('Ignoring invalid pid file: %s', pid_file_path)
+        return None
+
+
+def _read_boot_id():
+    with open(_BOOT_ID_PATH, encoding='utf-8') as file:
+        return file.read().strip()
+
+
+def _read_process_stat(pid):
+    # Reading the process status from procfs works regardless of which user
+    # owns the process (e.g., the `sudo` process that launches the update
+    # service belongs to root).
+    try:
+        with open(f'/proc/{pid}/stat', encoding='utf-8') as file:
+            stat = file.read()
+    except (FileNotFoundError, ProcessLookupError):
+        return None
+    # Skip the command name, which is in parentheses and might contain spaces
+    # or parentheses itself. The remaining fields start with the state (field
+    # 3), and include the start time (field 22, see `man 5 proc`).
+    fields = stat[stat.rindex(')') + 2:].split()
+    return _ProcessStat(state=fields[0], start_time=int(fields[19]))
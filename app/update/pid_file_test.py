@@ -0,0 +1,122 @@
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+import update.pid_file
+
+
+class PidFileTest(unittest.TestCase):
+
+    def setUp(self):
+        # Ignore pylint because we perform a tear down.
+        # pylint: disable=consider-using-with
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.pid_file_path = os.path.join(self.temp_dir.name, 'logs',
+                                          'update.pid')
+        # pylint: disable=protected-access
+        for patcher in [
+                mock.patch.object(update.pid_file, '_PID_FILE_PATH',
+                                  self.pid_file_path),
+                mock.patch.object(update.pid_file, '_pid_file_cache',
+                                  update.pid_file._PidFileCache()),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def make_dead_pid(self):
+        with subprocess.Popen(('/bin/true',)) as process:  # noqa: S603
+            pass
+        return process.pid
+
+    def write_pid_file_of_exited_process(self):
+        with subprocess.Popen(('/bin/sleep', '10')) as process:  # noqa: S603
+            update.pid_file.write(process.pid)
+            process.kill()
+
+    def test_no_process_is_running_if_pid_file_does_not_exist(self):
+        self.assertFalse(update.pid_file.is_update_process_running())
+
+    def test_process_is_running_if_pid_file_refers_to_live_process(self):
+        update.pid_file.write(os.getpid())
+
+        self.assertTrue(update.pid_file.is_update_process_running())
+
+    def test_no_process_is_running_if_pid_file_refers_to_dead_process(self):
+        self.write_pid_file_of_exited_process()
+
+        self.assertFalse(update.pid_file.is_update_process_running())
+
+    def test_no_process_is_running_if_pid_file_refers_to_zombie(self):
+        # Ignore pylint because the test needs the process to stay unreaped.
+        # pylint: disable=consider-using-with
+        process = subprocess.Popen(('/bin/true',))  # noqa: S603
+        self.addCleanup(process.wait)
+        os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+        update.pid_file.write(process.pid)
+
+        self.assertFalse(update.pid_file.is_update_process_running())
+
+    def test_no_process_is_running_if_pid_file_is_invalid(self):
+        os.makedirs(os.path.dirname(self.pid_file_path))
+        with open(self.pid_file_path, 'w', encoding='utf-8') as file:
+            file.write('not a pid')
+
+        self.assertFalse(update.pid_file.is_update_process_running())
+
+    def test_no_process_is_running_after_removing_pid_file(self):
+        update.pid_file.write(os.getpid())
+
+        update.pid_file.remove()
+
+        self.assertFalse(update.pid_file.is_update_process_running())
+
+    def test_removing_nonexistent_pid_file_is_noop(self):
+        update.pid_file.remove()
+
+        self.assertFalse(os.path.exists(self.pid_file_path))
+
+    def test_rereads_pid_file_when_it_changes(self):
+        self.write_pid_file_of_exited_process()
+        self.assertFalse(update.pid_file.is_update_process_running())
+
+        update.pid_file.write(os.getpid())
+
+        self.assertTrue(update.pid_file.is_update_process_running())
+
+    def test_reads_unchanged_pid_file_only_once(self):
+        update.pid_file.write(os.getpid())
+
+        # pylint: disable=protected-access
+        with mock.patch.object(
+                update.pid_file,
+                '_read_pid_file',
+                wraps=update.pid_file._read_pid_file) as mock_read_pid_file:
+            update.pid_file.is_update_process_running()
+            update.pid_file.is_update_process_running()
+
+        mock_read_pid_file.assert_called_once()
+
+    def test_no_process_is_running_if_pid_was_reused(self):
+        update.pid_file.write(os.getpid())
+        with open(self.pid_file_path, encoding='utf-8') as file:
+            pid, start_time, boot_id = file.read().split()
+        with open(self.pid_file_path, 'w', encoding='utf-8') as file:
+            file.write(f'{pid} {int(start_time) - 1} {boot_id}\n')
+
+        self.assertFalse(update.pid_file.is_update_process_running())
+
+    def test_no_process_is_running_if_pid_file_is_from_previous_boot(self):
+        update.pid_file.write(os.getpid())
+
+        with mock.patch.object(update.pid_file,
+                               '_read_boot_id',
+                               return_value='previous-boot-id'):
+            self.assertFalse(update.pid_file.is_update_process_running())
+
+    def test_does_not_write_pid_file_for_exited_process(self):
+        update.pid_file.write(self.make_dead_pid())
+
+        self.assertFalse(os.path.exists(self.pid_file_path))
@@ -10,7 +10,8 @@ The flow of an update is as follows:
 2. Server clears result files of all previous updates.
 3. Server initiates the update process.
 4. User queries for update status and the server reports an update is in
-    progress because it can see the update process running.
+    progress because it can see the update process running (see
+    `update.pid_file`).
 5. User repeats (4) for a few minutes until the update completes.
 6. At the end of the update, the update process writes an update result file.
 7. The next time the user queries for update status, the server reads the
@@ -2,6 +2,7 @@ import enum
 import subprocess
 
 import update.launcher
+import update.pid_file
 import update.result_store
 
 
@@ -25,17 +26,22 @@ def get():
         string containing the error associated with a recently completed update
         job. If the job completed successfully, the second value is None.
     """
-    if _is_update_process_running():
+    if update.pid_file.is_update_process_running():
         return Status.IN_PROGRESS, None
 
     recent_result = update.result_store.read()
     if not recent_result:
+        if _is_legacy_update_process_running():
+            return Status.IN_PROGRESS, None
         return Status.NOT_RUNNING, None
 
     return Status.DONE, recent_result.error
 
 
-def _is_update_process_running():
+def _is_legacy_update_process_running():
+    # Update services prior to the pid file don't write one, so the update to
+    # this version only shows up in the process list. Once that update has
+    # finished, there is a result file, so we skip the expensive process scan.
     lines = subprocess.check_output(
         ('/usr/bin/ps', '-auxwe')).decode('utf-8').splitlines()
     for line in lines:
@@ -4,85 +4,87 @@ from unittest import mock
 import update.result
 import update.status
 
-
-class StatusTest(unittest.TestCase):
-
-    @mock.patch.object(update.status.subprocess, 'check_output')
-    @mock.patch.object(update.status.update.result_store, 'read')
-    def test_returns_not_running_when_there_is_no_process_nor_result_file(
-            self, mock_read_update_result, mock_check_output):
-        mock_check_output.return_value = """
+_PROCESS_LIST_WITHOUT_UPDATE = """
 USER       PID %CPU %MEM    VSZ   RSS TTY      STAT START   TIME COMMAND
 root         1  0.0  0.0 224928  8612 ?        Ss   Apr03   0:01 /sbin/dummy-a
 root        51  0.0  0.0 103152 21264 ?        Ss   Apr03   0:00 /lib/dummy-b
 """.lstrip().encode('utf-8')
-        mock_read_update_result.return_value = None
 
-        status_actual, error_actual = update.status.get()
-        self.assertEqual(update.status.Status.NOT_RUNNING, status_actual)
-        self.assertIsNone(error_actual)
-
-    @mock.patch.object(update.status.subprocess, 'check_output')
-    @mock.patch.object(update.status.update.result_store, 'read')
-    def test_returns_in_progress_when_update_process_is_running(
-            self, mock_read_update_result, mock_check_output):
-        mock_check_output.return_value = """
+_PROCESS_LIST_WITH_UPDATE = """
 USER       PID %CPU %MEM    VSZ   RSS TTY      STAT START   TIME COMMAND
 root         1  0.0  0.0 224928  8612 ?        Ss   Apr03   0:01 /sbin/dummy-a
 root        51  0.0  0.0 103152 21264 ?        Ss   Apr03   0:00 /opt/tinypilot-privileged/scripts/update
 """.lstrip().encode('utf-8')
-        mock_read_update_result.return_value = None
+
+
+class StatusTest(unittest.TestCase):
+
+    def setUp(self):
+        patchers = {
+            'is_update_process_running':
+                mock.patch.object(update.status.update.pid_file,
+                                  'is_update_process_running'),
+            'read_update_result':
+                mock.patch.object(update.status.update.result_store, 'read'),
+            'check_output':
+                mock.patch.object(update.status.subprocess, 'check_output'),
+        }
+        self.mocks = {}
+        for name, patcher in patchers.items():
+            self.mocks[name] = patcher.start()
+            self.addCleanup(patcher.stop)
+        self.mocks['is_update_process_running'].return_value = False
+        self.mocks['check_output'].return_value = _PROCESS_LIST_WITHOUT_UPDATE
+
+    def test_returns_not_running_when_there_is_no_process_nor_result_file(self):
+        self.mocks['read_update_result'].return_value = None
+
+        status_actual, error_actual = update.status.get()
+        self.assertEqual(update.status.Status.NOT_RUNNING, status_actual)
+        self.assertIsNone(error_actual)
+
+    def test_returns_in_progress_when_update_process_is_running(self):
+        self.mocks['is_update_process_running'].return_value = True
+        self.mocks['read_update_result'].return_value = None
 
         status_actual, error_actual = update.status.get()
         self.assertEqual(update.status.Status.IN_PROGRESS, status_actual)
         self.assertIsNone(error_actual)
+        self.mocks['check_output'].assert_not_called()
 
-    @mock.patch.object(update.status.subprocess, 'check_output')
-    @mock.patch.object(update.status.update.result_store, 'read')
-    def test_ignores_update_result_if_update_is_running(self,
-                                                        mock_read_update_result,
-                                                        mock_check_output):
+    def test_returns_in_progress_when_legacy_update_process_is_running(self):
+        self.mocks['check_output'].return_value = _PROCESS_LIST_WITH_UPDATE
+        self.mocks['read_update_result'].return_value = None
+
+        status_actual, error_actual = update.status.get()
+        self.assertEqual(update.status.Status.IN_PROGRESS, status_actual)
+        self.assertIsNone(error_actual)
+
+    def test_ignores_update_result_if_update_is_running(self):
         """If update is running, last update result does not matter."""
-        mock_check_output.return_value = """
-USER       PID %CPU %MEM    VSZ   RSS TTY      STAT START   TIME COMMAND
-root         1  0.0  0.0 224928  8612 ?        Ss   Apr03   0:01 /sbin/dummy-a
-root        51  0.0  0.0 103152 21264 ?        Ss   Apr03   0:00 /opt/tinypilot-privileged/scripts/update
-""".lstrip().encode('utf-8')
+        self.mocks['is_update_process_running'].return_value = True
         # get should ignore this result because an update process
         # is currently running, which takes priority over the previous result.
-        mock_read_update_result.return_value = update.result.Result(
+        self.mocks['read_update_result'].return_value = update.result.Result(
             error=None, timestamp='2021-02-10T085735Z')
 
         status_actual, error_actual = update.status.get()
         self.assertEqual(update.status.Status.IN_PROGRESS, status_actual)
         self.assertIsNone(error_actual)
 
-    @mock.patch.object(update.status.subprocess, 'check_output')
-    @mock.patch.object(update.status.update.result_store, 'read')
     def test_returns_success_when_no_process_is_running_and_last_run_was_ok(
-            self, mock_read_update_result, mock_check_output):
-        mock_check_output.return_value = """
-USER       PID %CPU %MEM    VSZ   RSS TTY      STAT START   TIME COMMAND
-root         1  0.0  0.0 224928  8612 ?        Ss   Apr03   0:01 /sbin/dummy-a
-root        51  0.0  0.0 103152 21264 ?        Ss   Apr03   0:00 /lib/dummy-b
-""".lstrip().encode('utf-8')
-        mock_read_update_result.return_value = update.result.Result(
+            self):
+        self.mocks['read_update_result'].return_value = update.result.Result(
             error=None, timestamp='2021-02-10T085735Z')
 
         status_actual, error_actual = update.status.get()
         self.assertEqual(update.status.Status.DONE, status_actual)
         self.assertIsNone(error_actual)
+        self.mocks['check_output'].assert_not_called()
 
-    @mock.patch.object(update.status.subprocess, 'check_output')
-    @mock.patch.object(update.status.update.result_store, 'read')
     def test_returns_error_when_no_process_is_running_and_last_run_had_error(
-            self, mock_read_update_result, mock_check_output):
-        mock_check_output.return_value = """
-USER       PID %CPU %MEM    VSZ   RSS TTY      STAT START   TIME COMMAND
-root         1  0.0  0.0 224928  8612 ?        Ss   Apr03   0:01 /sbin/dummy-a
-root        51  0.0  0.0 103152 21264 ?        Ss   Apr03   0:00 /lib/dummy-b
-""".lstrip().encode('utf-8')
-        mock_read_update_result.return_value = update.result.Result(
+            self):
+        self.mocks['read_update_result'].return_value = update.result.Result(
             error='dummy update error', timestamp='2021-02-10T085735Z')
 
         status_actual, error_actual = update.status.get()